@@ -1,25 +1,42 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
+
+from .prompt_window import select_history
+from .resilience import ProviderError, TRANSPORT_ERRORS, raise_for_status
+from .streaming import iter_sse_events
+from network.http_transport import http_transport
 
 logger = logging.getLogger(__name__)
 
+PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+
+# Model families that accept cache_control breakpoints
+_PROMPT_CACHING_MODELS = ('claude-3-5', 'claude-3-7', 'claude-3-haiku', 'claude-3-opus', 'claude-sonnet-4', 'claude-opus-4')
+
+SYSTEM_PROMPT = (
+    "You are an AI assistant that helps users with various tasks. "
+    "You can control applications, search the web, manage files, and automate workflows. "
+    "Be helpful, concise, and natural; if you're performing an action, mention it clearly."
+)
+
 class AnthropicClient:
     def __init__(self):
         self.api_key = None
         self.base_url = "https://api.anthropic.com/v1"
-        self.session = None
+        self.transport = http_transport
+        self.model = 'claude-2.1'
         self.is_configured = False
         
     async def initialize(self):
         """Initialize the client"""
-        import aiohttp
-        self.session = aiohttp.ClientSession()
+        await self.transport.initialize()
         
-    async def configure(self, api_key: Optional[str] = None, **kwargs) -> bool:
+    async def configure(self, api_key: Optional[str] = None, model: Optional[str] = None, **kwargs) -> bool:
         """Configure the Anthropic client"""
         try:
             if api_key:
                 self.api_key = api_key
+                self.model = model or self.model
                 self.is_configured = True
                 logger.info("✅ Anthropic client configured successfully")
                 return True
@@ -41,45 +58,31 @@ class AnthropicClient:
             }
         
         try:
-            headers = {
-                'x-api-key': self.api_key,
-                'Content-Type': 'application/json',
-                'anthropic-version': '2023-06-01'
-            }
-            
-            data = {
-                'model': 'claude-2.1',
-                'max_tokens': 2000,
-                'temperature': 0.7,
-                'messages': [{'role': 'user', 'content': prompt}]
-            }
-            
-            async with self.session.post(
+            async with self.transport.post(
+                'anthropic',
                 f"{self.base_url}/messages",
-                headers=headers,
-                json=data
+                headers=self._headers(),
+                json=self._build_payload(prompt, context or {}, stream=False)
             ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    content = result['content'][0]['text']
+                await raise_for_status('anthropic', response)
+                
+                result = await response.json()
+                content = result['content'][0]['text']
                     
-                    return {
-                        'text': content,
-                        'action_required': False,
-                        'confidence': 0.95,
-                        'metadata': {
-                            'model': 'claude-2.1'
-                        }
-                    }
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Anthropic API error: {response.status} - {error_text}")
-                    return {
-                        'text': 'Sorry, I encountered an error with the AI service.',
-                        'action_required': False,
-                        'confidence': 0.0
-                    }
+                return {
+                    'text': content,
+                    'action_required': False,
+                    'confidence': 0.95,
+                    'metadata': {
+                        'model': self.model
+                    },
+                    'usage': result.get('usage', {})
+                }
                     
+        except ProviderError:
+            raise
+        except TRANSPORT_ERRORS as e:
+            raise ProviderError('anthropic', None, str(e) or type(e).__name__)
         except Exception as e:
             logger.error(f"Error calling Anthropic API: {e}")
             return {
@@ -88,14 +91,104 @@ class AnthropicClient:
                 'confidence': 0.0
             }
     
+    async def process_command(self, command: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Process command (ModelManager entry point)"""
+        return await self.process(command, context)
+    
+    async def stream_command(self, command: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the completion for a command as text deltas"""
+        if not self.is_configured:
+            raise ValueError("Anthropic client is not configured")
+        
+        async with self.transport.post(
+            'anthropic',
+            f"{self.base_url}/messages",
+            headers=self._headers(),
+            json=self._build_payload(command, context, stream=True)
+        ) as response:
+            await raise_for_status('anthropic', response)
+            
+            async for event in iter_sse_events(response):
+                if event.get('type') == 'content_block_delta':
+                    delta = event.get('delta', {}).get('text')
+                    if delta:
+                        yield delta
+                elif event.get('type') == 'message_stop':
+                    return
+    
+    @property
+    def supports_prompt_caching(self) -> bool:
+        return self.model.startswith(_PROMPT_CACHING_MODELS)
+    
+    def _headers(self) -> Dict[str, str]:
+        """Build request headers"""
+        headers = {
+            'x-api-key': self.api_key,
+            'Content-Type': 'application/json',
+            'anthropic-version': '2023-06-01'
+        }
+        if self.supports_prompt_caching:
+            headers['anthropic-beta'] = PROMPT_CACHING_BETA
+        return headers
+    
+    def _build_payload(self, prompt: str, context: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        """
+        Build messages request body.
+        
+        With prompt caching, breakpoints after the system prompt and after
+        the conversation history let each turn be billed and prefilled
+        mostly for its new message.
+        """
+        messages = self._build_messages(prompt, context)
+        system: Any = SYSTEM_PROMPT
+        prefs = context.get('preferences') or {}
+        if prefs.get('language'):
+            system += f"\nUser's preferred language: {prefs['language']}"
+        if context.get('conversation_summary'):
+            system += f"\nEarlier in this conversation:\n{context['conversation_summary']}"
+        
+        if self.supports_prompt_caching:
+            system = [{'type': 'text', 'text': system, 'cache_control': {'type': 'ephemeral'}}]
+            if len(messages) > 1:
+                last_history = messages[-2]
+                last_history['content'] = [{
+                    'type': 'text',
+                    'text': last_history['content'],
+                    'cache_control': {'type': 'ephemeral'}
+                }]
+        
+        return {
+            'model': self.model,
+            'max_tokens': 2000,
+            'temperature': 0.7,
+            'system': system,
+            'messages': messages,
+            'stream': stream
+        }
+    
+    def _build_messages(self, prompt: str, context: Dict[str, Any]) -> list:
+        """History plus the prompt as alternating user/assistant turns"""
+        messages = []
+        for msg in select_history(context, 10):
+            role = 'user' if msg.get('type') == 'user' else 'assistant'
+            if messages and messages[-1]['role'] == role:
+                messages[-1]['content'] += "\n" + msg.get('content', '')
+            elif messages or role == 'user':
+                messages.append({'role': role, 'content': msg.get('content', '')})
+        
+        if messages and messages[-1]['role'] == 'user':
+            messages[-1]['content'] += "\n" + prompt
+        else:
+            messages.append({'role': 'user', 'content': prompt})
+        return messages
+    
     async def test_connection(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Test connection to Anthropic API"""
         try:
-            return {'success': True, 'response_time': 0, 'model': 'claude-2.1'}
+            return {'success': True, 'response_time': 0, 'model': self.model}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     async def cleanup(self):
-        """Cleanup resources"""
-        if self.session:
-            await self.session.close()
+        """Cleanup resources (the shared transport is closed by its owner)"""
+        pass
@@ -1,9 +1,16 @@
 """
 DeepSeek AI Client Implementation
 """
-import aiohttp
 import json
-from typing import Dict, Any, Optional
+import logging
+from typing import Dict, Any, Optional, AsyncIterator
+
+from .prompt_window import select_history
+from .resilience import ProviderError, TRANSPORT_ERRORS, raise_for_status
+from .streaming import iter_sse_events
+from network.http_transport import http_transport
+
+logger = logging.getLogger(__name__)
 
 class DeepSeekClient:
     """Client for DeepSeek AI API"""
@@ -11,19 +18,16 @@ class DeepSeekClient:
     def __init__(self):
         self.base_url = "https://api.deepseek.com/v1"
         self.api_key = None
-        self.session = None
+        self.transport = http_transport
         self.model = "deepseek-chat"
         
     async def initialize(self):
-        """Initialize HTTP session"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30)
-        )
+        """Initialize HTTP transport"""
+        await self.transport.initialize()
     
     async def shutdown(self):
-        """Close HTTP session"""
-        if self.session:
-            await self.session.close()
+        """Release resources (the shared transport is closed by its owner)"""
+        pass
     
     async def test_connection(self, config: Dict[str, Any]) -> bool:
         """Test API connection"""
@@ -38,7 +42,7 @@ class DeepSeekClient:
                 "Content-Type": "application/json"
             }
             
-            async with self.session.get(f"{self.base_url}/models", headers=headers) as response:
+            async with self.transport.get('deepseek', f"{self.base_url}/models", headers=headers) as response:
                 return response.status == 200
         except Exception as e:
             logger.error(f"DeepSeek connection test failed: {e}")
@@ -54,32 +58,24 @@ class DeepSeekClient:
             messages = self._build_messages(command, context)
             
             # API request
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 2000,
-                "stream": False
-            }
+            payload = self._build_payload(messages, stream=False)
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            async with self.session.post(
+            async with self.transport.post(
+                'deepseek',
                 f"{self.base_url}/chat/completions",
                 json=payload,
-                headers=headers
+                headers=self._headers()
             ) as response:
                 
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"API error {response.status}: {error_text}")
+                await raise_for_status('deepseek', response)
                 
                 data = await response.json()
                 return self._parse_response(data, command)
                 
+        except ProviderError:
+            raise
+        except TRANSPORT_ERRORS as e:
+            raise ProviderError('deepseek', None, str(e) or type(e).__name__)
         except Exception as e:
             logger.error(f"DeepSeek API error: {e}")
             return {
@@ -87,6 +83,45 @@ class DeepSeekClient:
                 "confidence": 0.0
             }
     
+    async def stream_command(self, command: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the completion for a command as text deltas"""
+        if not self.api_key:
+            raise ValueError("DeepSeek API key not configured")
+        
+        messages = self._build_messages(command, context)
+        payload = self._build_payload(messages, stream=True)
+        
+        async with self.transport.post(
+            'deepseek',
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=self._headers()
+        ) as response:
+            await raise_for_status('deepseek', response)
+            
+            async for event in iter_sse_events(response):
+                choices = event.get('choices') or [{}]
+                delta = choices[0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+    
+    def _headers(self) -> Dict[str, str]:
+        """Build request headers"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _build_payload(self, messages: list, stream: bool) -> Dict[str, Any]:
+        """Build chat completion request body"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 2000,
+            "stream": stream
+        }
+    
     def _build_messages(self, command: str, context: Dict[str, Any]) -> list:
         """Build conversation messages for API"""
         messages = [
@@ -96,9 +131,9 @@ class DeepSeekClient:
             }
         ]
         
-        # Add conversation history
-        history = context.get('conversation_history', [])
-        for msg in history[-10:]:  # Last 10 messages for context
+        # Add conversation history; the window start moves in steps so
+        # consecutive requests share a prefix for DeepSeek's context cache
+        for msg in select_history(context, 10):
             messages.append({
                 "role": "user" if msg['type'] == 'user' else "assistant",
                 "content": msg['content']
@@ -137,6 +172,10 @@ class DeepSeekClient:
         if prefs.get('language'):
             base_prompt += f"\nUser's preferred language: {prefs['language']}"
         
+        # Older turns folded away by the context manager
+        if context.get('conversation_summary'):
+            base_prompt += f"\nEarlier in this conversation:\n{context['conversation_summary']}"
+        
         return base_prompt
     
     def _parse_response(self, data: Dict[str, Any], original_command: str) -> Dict[str, Any]:
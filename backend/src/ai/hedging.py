@@ -0,0 +1,142 @@
+"""
+Request hedging - race a second provider when the first is slow to respond
+"""
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Callable, AsyncIterator, Tuple
+
+from .provider_stats import ProviderStats
+
+logger = logging.getLogger(__name__)
+
+StreamFactory = Callable[[], AsyncIterator[str]]
+
+class HedgeBudget:
+    """
+    Caps hedges to a fraction of requests.
+
+    Every hedge-eligible request earns ``ratio`` credits (up to ``burst``)
+    and a hedge spends one, so over time at most ``ratio`` of requests are
+    sent twice.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5):
+        self.ratio = ratio
+        self.burst = burst
+        self.credits = burst
+
+    def record_request(self):
+        self.credits = min(self.burst, self.credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.credits >= 1:
+            self.credits -= 1
+            return True
+        return False
+
+class RequestHedger:
+    """
+    Starts the primary stream and, if no token has arrived after the
+    provider's ``percentile`` time-to-first-token, starts the alternate too.
+    Whichever produces a first token first wins; the other is cancelled.
+    """
+
+    def __init__(self, stats: Optional[ProviderStats] = None, enabled: bool = False,
+                 percentile: float = 95.0, min_samples: int = 20, default_delay: float = 1.5,
+                 budget_ratio: float = 0.1, budget_burst: float = 5):
+        self.stats = stats or ProviderStats()
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.skipped_for_budget = 0
+
+    def is_enabled_for(self, context: Dict[str, Any]) -> bool:
+        prefs = context.get('preferences') or {}
+        return prefs.get('hedge_requests', self.enabled)
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait for the primary's first token before hedging"""
+        if self.stats.sample_count(provider) < self.min_samples:
+            return self.default_delay
+        return self.stats.first_token_percentile(provider, self.percentile)
+
+    async def race(self, primary: str, open_primary: StreamFactory,
+                   alternate: Optional[str] = None,
+                   open_alternate: Optional[StreamFactory] = None) -> Tuple[str, str]:
+        """Return ``(text, provider)`` from whichever stream answers first"""
+        self.requests += 1
+        self.budget.record_request()
+
+        loop = asyncio.get_running_loop()
+        first_token = loop.create_future()
+        tasks = {primary: asyncio.create_task(self._collect(primary, open_primary, first_token))}
+        hedge_deadline = self.hedge_delay(primary) if alternate else None
+        winner = None
+        last_error = None
+
+        try:
+            while tasks and winner is None:
+                waiters = set(tasks.values())
+                if not first_token.done():
+                    waiters.add(first_token)
+                await asyncio.wait(waiters, timeout=hedge_deadline, return_when=asyncio.FIRST_COMPLETED)
+
+                if first_token.done():
+                    winner = first_token.result()
+                    break
+
+                for name, task in list(tasks.items()):
+                    if task.done():
+                        if task.exception() is None:
+                            winner = name  # finished without producing a token
+                            break
+                        last_error = task.exception()
+                        del tasks[name]
+
+                if winner is None and hedge_deadline is not None:
+                    # Primary is slow or failed before its first token
+                    hedge_deadline = None
+                    if self.budget.try_spend():
+                        self.hedges += 1
+                        logger.info(f"Hedging {primary} with {alternate}")
+                        tasks[alternate] = asyncio.create_task(
+                            self._collect(alternate, open_alternate, first_token)
+                        )
+                    else:
+                        self.skipped_for_budget += 1
+
+            if winner is None:
+                raise last_error
+
+            if winner != primary:
+                self.hedge_wins += 1
+            text = await tasks[winner]
+            return text, winner
+        finally:
+            for name, task in tasks.items():
+                if name != winner or not task.done():
+                    task.cancel()
+
+    async def _collect(self, provider: str, open_stream: StreamFactory, first_token: asyncio.Future) -> str:
+        chunks = []
+        async for delta in open_stream():
+            if not chunks and not first_token.done():
+                first_token.set_result(provider)
+            chunks.append(delta)
+        return ''.join(chunks)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'skipped_for_budget': self.skipped_for_budget,
+            'hedge_rate': self.hedges / self.requests if self.requests else 0.0
+        }
@@ -1,23 +1,65 @@
+import asyncio
 import logging
 import os
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, AsyncIterator, List, Tuple
+
+from .local_scheduler import ContinuousBatchScheduler, LlamaCppBackend
+from .prompt_window import select_history
 
 logger = logging.getLogger(__name__)
 
+_DONE = object()
+
 class LocalLlama:
-    def __init__(self):
+    """
+    In-process GGUF inference through llama.cpp (llama-cpp-python).
+    
+    The model is loaded once with mmap so its weights stay in the page
+    cache. Generation goes through a continuous batching scheduler whose
+    worker thread owns the llama.cpp context, so concurrent requests share
+    decode steps instead of queueing behind each other. If the batch API is
+    unavailable, requests run one at a time on a dedicated worker thread.
+    Tokens are handed back to the event loop as they are sampled.
+    """
+    
+    def __init__(self, model_path: Optional[str] = None, n_threads: Optional[int] = None,
+                 n_ctx: int = 4096, max_tokens: int = 512, temperature: float = 0.7,
+                 max_batch_tokens: int = 512, max_sequences: int = 8,
+                 kv_cache_tokens: Optional[int] = None, cached_sessions: int = 8):
         self.model = None
-        self.model_path = None
+        self.model_path = model_path
+        self.n_threads = n_threads or max(1, (os.cpu_count() or 2) // 2)
+        self.n_ctx = n_ctx
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.max_batch_tokens = max_batch_tokens
+        self.max_sequences = max_sequences
+        self.kv_cache_tokens = kv_cache_tokens
+        self.cached_sessions = cached_sessions
         self.is_configured = False
-        
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.scheduler: Optional[ContinuousBatchScheduler] = None
+    
     async def initialize(self):
-        """Initialize the local model"""
-        logger.info("Local Llama client initialized (would load model here)")
-        
+        """Load the configured model, if any, and warm it up"""
+        if self.model_path and os.path.exists(self.model_path):
+            await self.configure(self.model_path)
+        else:
+            logger.info("Local Llama client initialized (no model configured)")
+    
     async def configure(self, model_path: Optional[str] = None, **kwargs) -> bool:
         """Configure the local Llama model"""
         try:
             if model_path and os.path.exists(model_path):
+                self.n_threads = kwargs.get('n_threads') or self.n_threads
+                self.n_ctx = kwargs.get('n_ctx', self.n_ctx)
+                
+                if self.model is None or model_path != self.model_path:
+                    await self._run(self._load, model_path)
+                    await self._pin_system_prompt()
+                
                 self.model_path = model_path
                 self.is_configured = True
                 logger.info("✅ Local Llama client configured successfully")
@@ -25,7 +67,10 @@ class LocalLlama:
             else:
                 logger.warning("No valid model path provided for Local Llama")
                 return False
-                
+        
+        except ImportError:
+            logger.warning("llama-cpp-python not available - local model disabled")
+            return False
         except Exception as e:
             logger.error(f"Error configuring Local Llama: {e}")
             return False
@@ -40,20 +85,21 @@ class LocalLlama:
             }
         
         try:
-            # In a real implementation, this would load and run the local model
-            # For now, return a simulated response
-            simulated_response = f"I received your message: '{prompt}'. This is a simulated response from the local Llama model running at {self.model_path}."
+            outcome = {}
+            chunks = [delta async for delta in self._stream(prompt, context or {}, outcome)]
             
             return {
-                'text': simulated_response,
+                'text': ''.join(chunks).strip(),
                 'action_required': False,
                 'confidence': 0.9,
                 'metadata': {
                     'model': 'local-llama',
-                    'model_path': self.model_path
+                    'model_path': self.model_path,
+                    # 'length' means the output was cut off (max_tokens or context)
+                    'finish_reason': outcome.get('finish_reason')
                 }
             }
-            
+        
         except Exception as e:
             logger.error(f"Error processing with Local Llama: {e}")
             return {
@@ -62,11 +108,88 @@ class LocalLlama:
                 'confidence': 0.0
             }
     
+    async def process_command(self, command: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Process command (ModelManager entry point)"""
+        return await self.process(command, context)
+    
+    async def stream_command(self, command: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the local model's response as text deltas"""
+        async for delta in self._stream(command, context, {}):
+            yield delta
+    
+    async def _stream(self, command: str, context: Dict[str, Any],
+                      outcome: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream text deltas, setting ``outcome['finish_reason']`` when done"""
+        if not self.is_configured:
+            raise ValueError("Local Llama model is not configured")
+        
+        messages = self._build_messages(command, context)
+        if self.scheduler:
+            prompt, stop = self._format_prompt(messages)
+            async for delta in self.scheduler.generate(
+                await self._run(self._tokenize, prompt),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stop=stop,
+                session=self._session_key(context),
+                outcome=outcome
+            ):
+                yield delta
+            return
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        
+        def emit(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                cancelled.set()  # event loop is gone
+        
+        def generate():
+            try:
+                for chunk in self.model.create_chat_completion(
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    stream=True
+                ):
+                    if cancelled.is_set():
+                        break
+                    choice = chunk['choices'][0]
+                    delta = choice['delta'].get('content')
+                    if delta:
+                        emit(delta)
+                    if choice.get('finish_reason'):
+                        outcome['finish_reason'] = choice['finish_reason']
+            except Exception as e:
+                emit(e)
+            finally:
+                emit(_DONE)
+        
+        loop.run_in_executor(self.executor, generate)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stops sampling if the consumer went away mid-stream
+            cancelled.set()
+    
+    def get_scheduler_stats(self) -> Optional[Dict[str, Any]]:
+        return self.scheduler.stats() if self.scheduler else None
+    
     async def test_connection(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Test local model connection"""
         try:
             model_path = config.get('model_path')
-            if model_path and os.path.exists(model_path):
+            # Like the API clients, a passing test leaves the client ready to use
+            if model_path and os.path.exists(model_path) and await self.configure(**config):
                 return {
                     'success': True,
                     'response_time': 0,
@@ -75,13 +198,117 @@ class LocalLlama:
             else:
                 return {
                     'success': False,
-                    'error': 'Model path does not exist'
+                    'error': 'Model path does not exist or failed to load'
                 }
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     async def cleanup(self):
         """Cleanup resources"""
-        if self.model:
-            # Clean up model resources
-            pass
+        if self.executor:
+            if self.model:
+                await self._run(self._unload)
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        self.is_configured = False
+    
+    async def _run(self, fn, *args):
+        """Run on the model's worker thread"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-llama")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+    
+    def _load(self, model_path: str):
+        from llama_cpp import Llama
+        
+        self._unload()
+        logger.info(f"Loading local model {model_path} ({self.n_threads} threads, ctx {self.n_ctx})")
+        self.model = Llama(
+            model_path=model_path,
+            n_ctx=self.n_ctx,
+            n_threads=self.n_threads,
+            n_batch=self.max_batch_tokens,
+            use_mmap=True,
+            verbose=False
+        )
+        
+        # One token through the graph pages in the weights and sets up buffers
+        self.model.create_completion("Hello", max_tokens=1)
+        
+        try:
+            backend = LlamaCppBackend(self.model, self.max_batch_tokens)
+        except Exception as e:
+            logger.warning(f"Continuous batching unavailable ({e}); serving local requests one at a time")
+            return
+        self.scheduler = ContinuousBatchScheduler(
+            backend,
+            max_batch_tokens=self.max_batch_tokens,
+            max_kv_tokens=self.kv_cache_tokens,
+            max_sequences=self.max_sequences,
+            max_cached_prefixes=self.cached_sessions
+        )
+        self.scheduler.start()
+    
+    def _tokenize(self, prompt: str) -> List[int]:
+        # Long prompts take milliseconds to tokenize; kept off the event loop
+        return self.model.tokenize(prompt.encode('utf-8'), add_bos=True, special=True)
+    
+    def _unload(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler.backend.close()
+            self.scheduler = None
+        if self.model is not None:
+            close = getattr(self.model, 'close', None)
+            if close:
+                close()
+            self.model = None
+    
+    async def _pin_system_prompt(self):
+        """Keep the shared system prompt's KV state resident for every session"""
+        if not self.scheduler:
+            return
+        prompt, _ = self._format_prompt(self._build_messages("", {})[:1])
+        await self.scheduler.pin_prefix('pin:system', await self._run(self._tokenize, prompt))
+    
+    @staticmethod
+    def _session_key(context: Dict[str, Any]) -> Optional[str]:
+        """Scheduler prefix key for the caller's conversation; never collides with pinned keys"""
+        user_id = context.get('user_id')
+        session_id = context.get('session_id')
+        if session_id:
+            return f"session:{user_id}:{session_id}"
+        return f"session:{user_id}" if user_id else None
+    
+    def _format_prompt(self, messages: List[Dict[str, str]]) -> Tuple[str, List[str]]:
+        """Render messages with the model's chat format, returning prompt and stop strings"""
+        try:
+            from llama_cpp import llama_chat_format
+            formatter = llama_chat_format.get_chat_format(self.model.chat_format or 'llama-2')
+            result = formatter(messages=messages)
+            stop = result.stop or []
+            return result.prompt, [stop] if isinstance(stop, str) else list(stop)
+        except Exception:
+            prompt = "".join(f"{m['role']}: {m['content']}\n" for m in messages)
+            return prompt + "assistant:", ["\nuser:"]
+    
+    def _build_messages(self, command: str, context: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build chat messages for the model's chat template"""
+        system_prompt = (
+            "You are a private AI assistant running entirely on the user's device. "
+            "Be helpful, concise, and natural."
+        )
+        prefs = context.get('preferences') or {}
+        if prefs.get('language'):
+            system_prompt += f"\nUser's preferred language: {prefs['language']}"
+        if context.get('conversation_summary'):
+            system_prompt += f"\nEarlier in this conversation:\n{context['conversation_summary']}"
+        
+        messages = [{'role': 'system', 'content': system_prompt}]
+        for msg in select_history(context, 10):
+            messages.append({
+                'role': 'user' if msg.get('type') == 'user' else 'assistant',
+                'content': msg.get('content', '')
+            })
+        messages.append({'role': 'user', 'content': command})
+        return messages
@@ -0,0 +1,561 @@
+"""
+Continuous batching scheduler for local llama.cpp inference
+
+One worker thread owns the llama.cpp context and runs decode steps. Between
+steps it admits waiting requests into the batch, so a new request starts
+prefilling while others are mid-generation instead of waiting for them to
+finish. Each step is bounded by ``max_batch_tokens``; the KV cache is shared
+by every sequence and bounded by ``max_kv_tokens``. When decoding would
+overflow it, the most recently admitted sequence is preempted: its cache
+cells are freed and it is re-queued to recompute its prompt plus the tokens
+it already generated. A sequence that runs alone and still doesn't fit is
+finished instead, since recomputing it would overflow again; its finish
+reason is ``'length'``, as when it reaches ``max_tokens``.
+
+Finished sequences leave their KV cells behind as reusable prefixes, one per
+session plus pinned ones such as the system prompt. A new request copies the
+cells of the cached prefix sharing the most leading tokens with its prompt
+(llama_kv_cache_seq_cp shares cells rather than duplicating them) and only
+prefills the rest, so a follow-up turn costs roughly its new tokens.
+"""
+import asyncio
+import codecs
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, Sequence as SequenceType
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class KVCacheFullError(Exception):
+    """llama.cpp found no free KV slot for a batch"""
+
+    def __init__(self, message: str = "Local model KV cache is full"):
+        super().__init__(message)
+
+class LlamaCppBackend:
+    """Thin wrapper over the llama.cpp batch API for one loaded model"""
+
+    def __init__(self, llama, max_batch_tokens: int):
+        import llama_cpp
+
+        self._lib = llama_cpp
+        self.llama = llama
+        self.ctx = getattr(llama, 'ctx', None) or llama._ctx.ctx
+        self.n_ctx = llama.n_ctx()
+        self.n_vocab = llama.n_vocab()
+        self.eos_token = llama.token_eos()
+        self.max_batch_tokens = max_batch_tokens
+        self.batch = llama_cpp.llama_batch_init(max_batch_tokens, 0, 1)
+
+        # The scheduler assigns sequence ids itself; drop anything the
+        # high-level API left in the cache (e.g. the warm-up prompt)
+        llama_cpp.llama_kv_cache_clear(self.ctx)
+
+    def tokenize(self, text: str) -> List[int]:
+        return self.llama.tokenize(text.encode('utf-8'), add_bos=True, special=True)
+
+    def detokenize(self, token: int) -> bytes:
+        return self.llama.detokenize([token])
+
+    def decode(self, entries: List[Tuple[int, int, int, bool]]) -> Dict[int, np.ndarray]:
+        """
+        Evaluate ``(token, position, seq_id, want_logits)`` entries in one
+        llama_decode call; returns logits keyed by entry index.
+        """
+        batch = self.batch
+        batch.n_tokens = len(entries)
+        for i, (token, pos, seq_id, want_logits) in enumerate(entries):
+            batch.token[i] = token
+            batch.pos[i] = pos
+            batch.n_seq_id[i] = 1
+            batch.seq_id[i][0] = seq_id
+            batch.logits[i] = want_logits
+
+        result = self._lib.llama_decode(self.ctx, batch)
+        if result == 1:
+            raise KVCacheFullError()
+        if result != 0:
+            raise RuntimeError(f"llama_decode failed with {result}")
+
+        logits = {}
+        for i, (_, _, _, want_logits) in enumerate(entries):
+            if want_logits:
+                pointer = self._lib.llama_get_logits_ith(self.ctx, i)
+                logits[i] = np.ctypeslib.as_array(pointer, shape=(self.n_vocab,)).copy()
+        return logits
+
+    def copy_sequence(self, src_seq_id: int, dst_seq_id: int, length: int):
+        """Make the first ``length`` cached tokens of one sequence part of another"""
+        self._lib.llama_kv_cache_seq_cp(self.ctx, src_seq_id, dst_seq_id, 0, length)
+
+    def remove_sequence(self, seq_id: int):
+        self._lib.llama_kv_cache_seq_rm(self.ctx, seq_id, -1, -1)
+
+    def close(self):
+        if self.batch is not None:
+            self._lib.llama_batch_free(self.batch)
+            self.batch = None
+
+@dataclass
+class _Prefix:
+    """KV cells kept after a sequence finished, reusable by later prompts"""
+    key: str
+    seq_id: int
+    tokens: List[int]
+    pinned: bool = False
+
+@dataclass
+class _Sequence:
+    """One generation request as seen by the worker thread"""
+    request_id: int
+    prompt_tokens: List[int]
+    max_tokens: int
+    temperature: float
+    stop: Tuple[str, ...]
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    session: Optional[str] = None
+    pin: bool = False
+    admitted_at: float = 0.0
+    seq_id: Optional[int] = None
+    n_past: int = 0
+    pending: List[int] = field(default_factory=list)
+    generated: List[int] = field(default_factory=list)
+    text: str = ""
+    emitted_chars: int = 0
+    cancelled: bool = False
+    finish_reason: str = 'stop'
+    prefix: Optional[_Prefix] = None
+    shared_tokens: int = 0
+    decoder: Any = field(default_factory=lambda: codecs.getincrementaldecoder('utf-8')(errors='replace'))
+
+    def emit(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            self.cancelled = True  # caller's event loop is gone
+
+class ContinuousBatchScheduler:
+    """Serves many concurrent generation requests from one model"""
+
+    def __init__(self, backend, max_batch_tokens: int = 512, max_kv_tokens: Optional[int] = None,
+                 max_sequences: int = 8, max_cached_prefixes: int = 8, min_prefix_tokens: int = 16,
+                 top_k: int = 40):
+        self.backend = backend
+        self.max_batch_tokens = max_batch_tokens
+        self.max_kv_tokens = min(max_kv_tokens or backend.n_ctx, backend.n_ctx)
+        self.max_sequences = max_sequences
+        self.max_cached_prefixes = max_cached_prefixes
+        self.min_prefix_tokens = min_prefix_tokens
+        self.top_k = top_k
+
+        self._waiting: deque = deque()
+        self._running: List[_Sequence] = []
+        self._prefixes: "OrderedDict[str, _Prefix]" = OrderedDict()
+        # Pinned prefixes get ids of their own on top of the running and per-session ones
+        self._free_seq_ids = list(range(max_sequences + max_cached_prefixes + 2))
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Worker-owned state copied under the lock for stats() on other threads
+        self._published = {'running': 0, 'cached_prefixes': 0, 'kv_tokens_in_use': 0}
+        self._ids = itertools.count()
+        self._rng = np.random.default_rng()
+
+        self.steps = 0
+        self.batched_tokens = 0
+        self.generated_tokens = 0
+        self.preemptions = 0
+        self.prefill_tokens = 0
+        self.reused_prefix_tokens = 0
+        self.truncations = 0
+        self.started_at = 0.0
+
+    def start(self):
+        self._stopping = False
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="local-llama-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    async def generate(self, prompt_tokens: List[int], max_tokens: int = 512, temperature: float = 0.7,
+                       stop: SequenceType[str] = (), session: Optional[str] = None,
+                       outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Queue a prompt and stream its completion as text deltas.
+
+        With a ``session`` the finished sequence's KV cells are kept so the
+        session's next prompt only prefills what it adds. When the stream
+        ends, ``outcome['finish_reason']`` is set to ``'stop'`` (end of
+        sequence or a stop string) or ``'length'`` (``max_tokens`` reached or
+        the context ran out, so the text is truncated).
+        """
+        sequence = _Sequence(
+            request_id=next(self._ids),
+            prompt_tokens=list(prompt_tokens),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=tuple(stop),
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(),
+            session=session
+        )
+        sequence.pending = list(sequence.prompt_tokens)
+        self._enqueue(sequence)
+
+        try:
+            while True:
+                item = await sequence.queue.get()
+                if item is _DONE:
+                    if outcome is not None:
+                        outcome['finish_reason'] = sequence.finish_reason
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # The worker frees the sequence's slot on its next step
+            sequence.cancelled = True
+
+    async def pin_prefix(self, key: str, prompt_tokens: List[int]):
+        """Prefill tokens (e.g. the system prompt) and keep their KV cells until stopped"""
+        sequence = _Sequence(
+            request_id=next(self._ids),
+            prompt_tokens=list(prompt_tokens),
+            max_tokens=0,
+            temperature=0.0,
+            stop=(),
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(),
+            session=key,
+            pin=True
+        )
+        sequence.pending = list(sequence.prompt_tokens)
+        self._enqueue(sequence)
+
+        while True:
+            item = await sequence.queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+
+    def _enqueue(self, sequence: _Sequence):
+        with self._condition:
+            self._waiting.append(sequence)
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        with self._condition:
+            published = dict(self._published)
+            waiting = len(self._waiting)
+        return {
+            'running': published['running'],
+            'waiting': waiting,
+            'steps': self.steps,
+            'average_batch_tokens': self.batched_tokens / self.steps if self.steps else 0.0,
+            'generated_tokens': self.generated_tokens,
+            'tokens_per_second': self.generated_tokens / elapsed if elapsed else 0.0,
+            'preemptions': self.preemptions,
+            'prefill_tokens': self.prefill_tokens,
+            'reused_prefix_tokens': self.reused_prefix_tokens,
+            'truncations': self.truncations,
+            'cached_prefixes': published['cached_prefixes'],
+            'kv_tokens_in_use': published['kv_tokens_in_use']
+        }
+
+    # Worker thread
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and not self._waiting and not self._running:
+                    self._condition.wait()
+                if self._stopping:
+                    break
+                self._admit()
+
+            try:
+                self._step()
+            except Exception as e:
+                logger.error(f"Local inference step failed: {e}")
+                for sequence in list(self._running):
+                    self._finish(sequence, e)
+            self._publish()
+
+        with self._condition:
+            abandoned = list(self._running) + list(self._waiting)
+            self._running.clear()
+            self._waiting.clear()
+        for sequence in abandoned:
+            sequence.emit(RuntimeError("Local model scheduler stopped"))
+            sequence.emit(_DONE)
+        for prefix in list(self._prefixes.values()):
+            self._evict_prefix(prefix)
+        self._publish()
+
+    def _publish(self):
+        """Copy the state stats() reports while the worker is between steps"""
+        with self._condition:
+            self._published = {
+                'running': len(self._running),
+                'cached_prefixes': len(self._prefixes),
+                'kv_tokens_in_use': self._kv_in_use()
+            }
+
+    def _pinned_tokens(self) -> int:
+        """KV cells held by pinned prefixes, which are never evicted"""
+        return sum(len(prefix.tokens) for prefix in self._prefixes.values() if prefix.pinned)
+
+    def _kv_in_use(self) -> int:
+        """KV cells held by cached prefixes plus those owned by running sequences"""
+        cached = sum(len(prefix.tokens) for prefix in self._prefixes.values())
+        return cached + sum(s.n_past - s.shared_tokens for s in self._running)
+
+    def _admit(self):
+        """Move waiting sequences into the batch while slots and KV space allow"""
+        while self._waiting and len(self._running) < self.max_sequences:
+            sequence = self._waiting[0]
+            if sequence.cancelled:
+                self._waiting.popleft()
+                sequence.emit(_DONE)
+                continue
+
+            prefix, reuse = self._best_prefix(sequence.pending)
+            # Pinned cells stay in the cache; only those the prompt shares are free
+            shared_pinned = reuse if prefix is not None and prefix.pinned else 0
+            if len(sequence.pending) - shared_pinned + 1 > self.max_kv_tokens - self._pinned_tokens():
+                self._waiting.popleft()
+                sequence.emit(ValueError("Prompt is longer than the local model's context"))
+                sequence.emit(_DONE)
+                continue
+            needed = len(sequence.pending) - reuse + 1
+            reserved = self._kv_in_use() + sum(len(s.pending) for s in self._running)
+            while reserved + needed > self.max_kv_tokens and self._evict_lru(keep=prefix):
+                reserved = self._kv_in_use() + sum(len(s.pending) for s in self._running)
+            if self._running and reserved + needed > self.max_kv_tokens:
+                break
+            if not self._free_seq_ids and not self._evict_lru(keep=prefix):
+                break
+
+            self._waiting.popleft()
+            sequence.seq_id = self._free_seq_ids.pop()
+            sequence.admitted_at = time.monotonic()
+            if prefix is not None:
+                self.backend.copy_sequence(prefix.seq_id, sequence.seq_id, reuse)
+                self._prefixes.move_to_end(prefix.key)
+                sequence.prefix = prefix
+                sequence.shared_tokens = reuse
+                sequence.n_past = reuse
+                sequence.pending = sequence.pending[reuse:]
+                self.reused_prefix_tokens += reuse
+            self._running.append(sequence)
+
+    def _best_prefix(self, tokens: List[int]) -> Tuple[Optional[_Prefix], int]:
+        """Cached prefix sharing the most leading tokens with a prompt"""
+        best, best_length = None, 0
+        for prefix in self._prefixes.values():
+            length = len(os.path.commonprefix([prefix.tokens, tokens]))
+            if length > best_length:
+                best, best_length = prefix, length
+
+        # At least one token must be decoded to get logits for the next one
+        best_length = min(best_length, len(tokens) - 1)
+        if best_length < self.min_prefix_tokens:
+            return None, 0
+        return best, best_length
+
+    def _retain(self, sequence: _Sequence) -> bool:
+        """Keep a finished sequence's KV cells as its session's prefix; False if not kept"""
+        old = self._prefixes.get(sequence.session)
+        if old is not None and old.pinned and not sequence.pin:
+            # Sessions never displace pinned prefixes such as the system prompt
+            logger.warning(f"Not caching session {sequence.session!r} over a pinned prefix")
+            return False
+        if old is not None:
+            self._evict_prefix(old)
+
+        tokens = (sequence.prompt_tokens + sequence.generated)[:sequence.n_past]
+        self._prefixes[sequence.session] = _Prefix(sequence.session, sequence.seq_id, tokens, sequence.pin)
+
+        while sum(not p.pinned for p in self._prefixes.values()) > self.max_cached_prefixes:
+            self._evict_lru()
+        return True
+
+    def _evict_lru(self, keep: Optional[_Prefix] = None) -> bool:
+        for prefix in self._prefixes.values():
+            if not prefix.pinned and prefix is not keep:
+                self._evict_prefix(prefix)
+                return True
+        return False
+
+    def _evict_prefix(self, prefix: _Prefix):
+        self._prefixes.pop(prefix.key, None)
+        self.backend.remove_sequence(prefix.seq_id)
+        self._free_seq_ids.append(prefix.seq_id)
+        for sequence in self._running:
+            if sequence.prefix is prefix:
+                # Cells copied from it now belong to the sequence alone
+                sequence.prefix = None
+                sequence.shared_tokens = 0
+
+    def _step(self):
+        for sequence in [s for s in self._running if s.cancelled]:
+            self._finish(sequence)
+        if not self._running:
+            return
+
+        self._make_kv_room()
+        if not self._running:
+            return
+
+        # Decoding sequences take one token each; prefills share what is left
+        entries = []
+        owners = []
+        budget = self.max_batch_tokens
+        for sequence in sorted(self._running, key=lambda s: len(s.pending) > 1):
+            if budget <= 0:
+                break
+            take = min(len(sequence.pending), budget)
+            for offset, token in enumerate(sequence.pending[:take]):
+                want_logits = take == len(sequence.pending) and offset == take - 1
+                entries.append((token, sequence.n_past + offset, sequence.seq_id, want_logits))
+            owners.append((sequence, take, len(entries) - 1))
+            budget -= take
+
+        try:
+            logits = self.backend.decode(entries)
+        except KVCacheFullError as e:
+            if len(self._running) > 1:
+                # Fragmented cache; give back space and retry next step
+                self._preempt_latest()
+            else:
+                # Recomputing a lone sequence would fail the same way
+                self._finish(self._running[0], e)
+            return
+
+        self.steps += 1
+        self.batched_tokens += len(entries)
+        self.prefill_tokens += sum(take for sequence, take, _ in owners if len(sequence.pending) > 1)
+
+        for sequence, take, last_index in owners:
+            sequence.n_past += take
+            sequence.pending = sequence.pending[take:]
+            if last_index in logits:
+                self._advance(sequence, logits[last_index])
+
+    def _make_kv_room(self):
+        """Drop cached prefixes, then preempt sequences, until this step's tokens fit"""
+        while self._running:
+            step_tokens = sum(min(len(s.pending), self.max_batch_tokens) for s in self._running)
+            if self._kv_in_use() + step_tokens <= self.max_kv_tokens:
+                return
+            if self._evict_lru():
+                continue
+            if len(self._running) > 1:
+                self._preempt_latest()
+                continue
+            # Alone next to the pinned prefixes and still out of room: the
+            # context is exhausted, and preempting would only recompute it
+            sequence = self._running[0]
+            self.truncations += 1
+            logger.warning(f"Local request {sequence.request_id} ran out of context after "
+                           f"{len(sequence.generated)} tokens; output is truncated")
+            self._finish(sequence, reason='length')
+            return
+
+    def _preempt_latest(self):
+        sequence = max(self._running, key=lambda s: s.admitted_at)
+        self.preemptions += 1
+        logger.debug(f"Preempting local request {sequence.request_id} ({sequence.n_past} KV tokens)")
+
+        self.backend.remove_sequence(sequence.seq_id)
+        self._running.remove(sequence)
+        self._free_seq_ids.append(sequence.seq_id)
+        sequence.seq_id = None
+        sequence.n_past = 0
+        sequence.prefix = None
+        sequence.shared_tokens = 0
+        # Recompute prompt and generated tokens when readmitted; already streamed text is kept
+        sequence.pending = sequence.prompt_tokens + sequence.generated
+
+        with self._condition:
+            self._waiting.appendleft(sequence)
+
+    def _advance(self, sequence: _Sequence, logits: np.ndarray):
+        if sequence.max_tokens <= 0:
+            self._finish(sequence)  # prefill only
+            return
+
+        token = self._sample(logits, sequence.temperature)
+        if token == self.backend.eos_token:
+            self._finish(sequence)
+            return
+
+        sequence.generated.append(token)
+        sequence.pending = [token]
+        self.generated_tokens += 1
+
+        sequence.text += sequence.decoder.decode(self.backend.detokenize(token))
+        stop_at = min((i for i in (sequence.text.find(s) for s in sequence.stop) if i >= 0), default=-1)
+        if stop_at >= 0:
+            sequence.text = sequence.text[:stop_at]
+            self._emit_text(sequence, final=True)
+            self._finish(sequence)
+            return
+
+        self._emit_text(sequence)
+        if len(sequence.generated) >= sequence.max_tokens:
+            self._finish(sequence, reason='length')
+
+    def _emit_text(self, sequence: _Sequence, final: bool = False):
+        # Hold back a possible partial stop string until it is resolved
+        holdback = 0 if final else max((len(s) - 1 for s in sequence.stop), default=0)
+        end = max(len(sequence.text) - holdback, sequence.emitted_chars)
+        if end > sequence.emitted_chars:
+            sequence.emit(sequence.text[sequence.emitted_chars:end])
+            sequence.emitted_chars = end
+
+    def _finish(self, sequence: _Sequence, error: Optional[Exception] = None, reason: str = 'stop'):
+        if sequence in self._running:
+            self._running.remove(sequence)
+            retained = sequence.session and error is None and sequence.n_past and self._retain(sequence)
+            if not retained:
+                self.backend.remove_sequence(sequence.seq_id)
+                self._free_seq_ids.append(sequence.seq_id)
+            sequence.prefix = None
+            sequence.shared_tokens = 0
+
+        sequence.finish_reason = reason
+        if error is None and not sequence.cancelled:
+            self._emit_text(sequence, final=True)
+        if error is not None:
+            sequence.emit(error)
+        sequence.emit(_DONE)
+
+    def _sample(self, logits: np.ndarray, temperature: float) -> int:
+        if temperature <= 0:
+            return int(np.argmax(logits))
+
+        top = np.argpartition(logits, -self.top_k)[-self.top_k:]
+        scaled = logits[top] / temperature
+        probabilities = np.exp(scaled - scaled.max())
+        probabilities /= probabilities.sum()
+        return int(self._rng.choice(top, p=probabilities))
@@ -2,8 +2,11 @@
 AI Model Manager - Handles multiple AI model integrations
 """
 import asyncio
+import hashlib
 import json
-from typing import Dict, Any, List, Optional
+import logging
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, Callable
 from dataclasses import dataclass
 from enum import Enum
 
@@ -11,6 +14,17 @@ from .deepseek_client import DeepSeekClient
 from .openai_client import OpenAIClient
 from .local_llama import LocalLlama
 from .anthropic_client import AnthropicClient
+from .response_cache import ResponseCache
+from .resilience import ProviderResilience, ProviderError, CircuitOpenError, TRANSPORT_ERRORS
+from .single_flight import SingleFlight
+from .provider_stats import ProviderStats
+from .hedging import RequestHedger
+from .router import ModelRouter, RoutingPolicy
+from observability import tracer
+
+logger = logging.getLogger(__name__)
+
+UNAVAILABLE_TEXT = "I apologize, but I'm having trouble processing your request right now."
 
 class ModelType(Enum):
     DEEPSEEK = "deepseek"
@@ -32,10 +46,25 @@ class ModelManager:
     Manages multiple AI models and routes requests appropriately
     """
     
-    def __init__(self):
+    def __init__(self, response_cache: Optional[ResponseCache] = None,
+                 resilience: Optional[ProviderResilience] = None,
+                 provider_stats: Optional[ProviderStats] = None,
+                 hedger: Optional[RequestHedger] = None,
+                 router: Optional[ModelRouter] = None,
+                 local_model_options: Optional[Dict[str, Any]] = None,
+                 context_packer: Optional[Callable[[str, Dict[str, Any], str], Dict[str, Any]]] = None):
         self.clients = {}
         self.active_models = {}
         self.default_model = None
+        self.response_cache = response_cache or ResponseCache()
+        self.single_flight = SingleFlight()
+        self.resilience = resilience or ProviderResilience()
+        self.provider_stats = provider_stats or ProviderStats()
+        self.hedger = hedger or RequestHedger(self.provider_stats)
+        self.router = router or ModelRouter(self.provider_stats)
+        self.local_model_options = local_model_options or {}
+        # Fits conversation history into each provider's token budget
+        self.context_packer = context_packer
         
     async def initialize(self):
         """Initialize model manager"""
@@ -45,20 +74,20 @@ class ModelManager:
         self.clients = {
             ModelType.DEEPSEEK: DeepSeekClient(),
             ModelType.OPENAI: OpenAIClient(),
-            ModelType.LOCAL_LLAMA: LocalLlama(),
+            ModelType.LOCAL_LLAMA: LocalLlama(**self.local_model_options),
             ModelType.ANTHROPIC: AnthropicClient()
         }
         
-        # Initialize each client
-        for client in self.clients.values():
-            await client.initialize()
+        # Initialize clients concurrently
+        await asyncio.gather(*(client.initialize() for client in self.clients.values()))
         
         logger.info("Model Manager initialized")
     
     async def shutdown(self):
         """Shutdown all model clients"""
         for client in self.clients.values():
-            await client.shutdown()
+            stop = getattr(client, 'shutdown', None) or client.cleanup
+            await stop()
     
     async def configure_model(self, user_id: str, model_config: Dict[str, Any]) -> bool:
         """
@@ -79,6 +108,9 @@ class ModelManager:
                     'client': client
                 }
                 
+                if model_config.get('routing_policy'):
+                    self.router.set_policy(user_id, RoutingPolicy.from_dict(model_config['routing_policy']))
+                
                 if not self.default_model:
                     self.default_model = user_id
                 
@@ -96,6 +128,273 @@ class ModelManager:
         """
         Process command using appropriate AI model
         """
+        _, model_type = self._resolve_client(command, context)
+        
+        # Keyed by the routed model and its packed context whichever provider answers
+        use_cache = self.response_cache.is_enabled_for(context)
+        if use_cache:
+            cache_model, cache_context = model_type, self._pack_context(command, context, model_type)
+            cached = await self.response_cache.get(command, cache_model.value, cache_context)
+            if cached is not None:
+                return cached
+        
+        if self.hedger.is_enabled_for(context):
+            response, model_type = await self.single_flight.do(
+                self._flight_key(command, context, model_type) + ':hedged',
+                lambda: self._call_hedged(command, context, model_type)
+            )
+        else:
+            response, model_type = await self._call_with_failover(command, context, model_type)
+        
+        ai_response = self._build_response(command, response, model_type)
+        if use_cache:
+            await self._cache_response(command, cache_model, cache_context, ai_response)
+        return ai_response
+    
+    async def summarize(self, prompt: str, context: Dict[str, Any]) -> Optional[str]:
+        """
+        Run an internal summarization prompt for a user.
+        
+        The user's preferences (language, routing policy) still apply; only
+        caching and hedging are turned off. Returns None when no usable model
+        satisfies the policy, e.g. a local-only user without a local model.
+        """
+        preferences = {**(context.get('preferences') or {}), 'cache_responses': False, 'hedge_requests': False}
+        context = {**context, 'preferences': preferences, 'conversation_history': []}
+        if not any(
+            self._is_usable(model_type, context) and self.router.permits(model_type.value, context)
+            for model_type in ModelType
+        ):
+            logger.debug(f"No model permitted for summarizing user {context.get('user_id')}'s conversation")
+            return None
+        
+        response = await self.process_command(prompt, context)
+        return response.text if response.confidence > 0.0 else None
+    
+    async def stream_command(self, command: str, context: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream command processing as events.
+        
+        Yields ``{'type': 'token', 'text': ...}`` for every text delta as it
+        arrives from the provider, then a single
+        ``{'type': 'done', 'response': AIResponse}`` with the assembled result.
+        """
+        _, model_type = self._resolve_client(command, context)
+        
+        use_cache = self.response_cache.is_enabled_for(context)
+        if use_cache:
+            cache_model, cache_context = model_type, self._pack_context(command, context, model_type)
+            cached = await self.response_cache.get(command, cache_model.value, cache_context)
+            if cached is not None:
+                yield {'type': 'token', 'text': cached.text}
+                yield {'type': 'done', 'response': cached}
+                return
+        
+        for candidate in self._failover_order(model_type, context):
+            chunks = []
+            try:
+                async for delta in self._provider_stream(candidate, command, context):
+                    chunks.append(delta)
+                    yield {'type': 'token', 'text': delta}
+            except CircuitOpenError:
+                continue
+            except (ProviderError, *TRANSPORT_ERRORS) as e:
+                if chunks:
+                    # Tokens already reached the caller; a different provider can't continue them
+                    raise
+                logger.warning(f"{candidate.value} stream failed before output: {e}; failing over")
+                continue
+            
+            model_type = candidate
+            response = {'text': ''.join(chunks)}
+            break
+        else:
+            response = {'text': UNAVAILABLE_TEXT, 'confidence': 0.0}
+            yield {'type': 'token', 'text': response['text']}
+        
+        ai_response = self._build_response(command, response, model_type)
+        if use_cache:
+            await self._cache_response(command, cache_model, cache_context, ai_response)
+        yield {'type': 'done', 'response': ai_response}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Response cache hit-rate and request coalescing metrics"""
+        return {
+            **self.response_cache.stats(),
+            'single_flight': self.single_flight.stats()
+        }
+    
+    def get_provider_health(self) -> Dict[str, Any]:
+        """Circuit breaker state, latency and hedging metrics per provider"""
+        return {
+            'circuits': self.resilience.stats(),
+            'latency': self.provider_stats.summary(),
+            'hedging': self.hedger.get_stats()
+        }
+    
+    def get_routing_decisions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent routing decisions with per-provider scores"""
+        return self.router.recent_decisions(limit)
+    
+    async def _provider_stream(self, model_type: ModelType, command: str,
+                               context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream from one provider under its rate limit and circuit breaker"""
+        client = self.clients[model_type]
+        provider = model_type.value
+        context = self._pack_context(command, context, model_type)
+        await self.resilience.acquire(provider, getattr(client, 'api_key', None))
+        
+        started = time.perf_counter()
+        first = True
+        streamed_chars = 0
+        try:
+            async for delta in client.stream_command(command, context):
+                if first:
+                    self.provider_stats.record_first_token(provider, time.perf_counter() - started)
+                    first = False
+                streamed_chars += len(delta)
+                yield delta
+        except (ProviderError, *TRANSPORT_ERRORS) as e:
+            self.resilience.record(provider, e)
+            self.provider_stats.record_request(provider, time.perf_counter() - started, False)
+            tracer.record(f'llm.{provider}', time.perf_counter() - started)
+            raise
+        except BaseException:
+            # Abandoned by the consumer (lost hedge race, closed stream)
+            self.resilience.release(provider)
+            raise
+        else:
+            self.resilience.record(provider)
+            elapsed = time.perf_counter() - started
+            tokens = (len(command) + streamed_chars) // 4
+            self.provider_stats.record_request(
+                provider, elapsed, True, self.router.estimate_cost(provider, tokens)
+            )
+            # Not a span: this generator is suspended at every yield
+            tracer.record(f'llm.{provider}', elapsed)
+    
+    async def _call_hedged(self, command: str, context: Dict[str, Any],
+                           model_type: ModelType) -> Tuple[Dict[str, Any], ModelType]:
+        """Race the selected provider against the next healthy one if it is slow"""
+        alternates = self._failover_order(model_type, context)[1:]
+        alternate = alternates[0] if alternates else None
+        
+        try:
+            text, winner = await self.hedger.race(
+                model_type.value,
+                lambda: self._provider_stream(model_type, command, context),
+                alternate.value if alternate else None,
+                (lambda: self._provider_stream(alternate, command, context)) if alternate else None
+            )
+            return {'text': text}, ModelType(winner)
+        except (ProviderError, CircuitOpenError, *TRANSPORT_ERRORS) as e:
+            logger.warning(f"Hedged request failed: {e}; falling back to sequential failover")
+            return await self._call_with_failover(command, context, model_type)
+    
+    async def _call_with_failover(self, command: str, context: Dict[str, Any],
+                                  model_type: ModelType) -> Tuple[Dict[str, Any], ModelType]:
+        """
+        Call the selected provider with retries, then each healthy alternative.
+        
+        Returns the raw response and the model that produced it; when every
+        provider fails the response is an apology with zero confidence.
+        """
+        for candidate in self._failover_order(model_type, context):
+            packed = self._pack_context(command, context, candidate)
+            try:
+                # Identical in-flight prompts share one upstream call, retries included
+                response = await self.single_flight.do(
+                    self._flight_key(command, packed, candidate),
+                    lambda: self._call_provider(candidate, command, packed)
+                )
+                return response, candidate
+            except (ProviderError, CircuitOpenError) as e:
+                logger.warning(f"{candidate.value} unavailable: {e}; failing over")
+        
+        logger.error("All AI providers failed")
+        return {'text': UNAVAILABLE_TEXT, 'confidence': 0.0}, model_type
+    
+    async def _call_provider(self, model_type: ModelType, command: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """One provider call with retries, recorded in the rolling stats"""
+        client = self.clients[model_type]
+        provider = model_type.value
+        started = time.perf_counter()
+        try:
+            with tracer.span(f'llm.{provider}'):
+                response = await self.resilience.call(
+                    provider,
+                    getattr(client, 'api_key', None),
+                    lambda: client.process_command(command, context)
+                )
+        except ProviderError:
+            self.provider_stats.record_request(provider, time.perf_counter() - started, False)
+            raise
+        
+        self.provider_stats.record_request(
+            provider,
+            time.perf_counter() - started,
+            response.get('confidence', 0.9) > 0.0,
+            self.router.estimate_cost(provider, self._usage_tokens(command, response))
+        )
+        return response
+    
+    @staticmethod
+    def _usage_tokens(command: str, response: Dict[str, Any]) -> int:
+        """Tokens billed for a call, estimated from text length when not reported"""
+        usage = response.get('usage') or {}
+        metadata = response.get('metadata') or {}
+        reported = usage.get('total_tokens') or metadata.get('tokens_used')
+        if reported:
+            return reported
+        return (len(command) + len(response.get('text', ''))) // 4
+    
+    def _failover_order(self, preferred: ModelType, context: Dict[str, Any]) -> List[ModelType]:
+        """The preferred model followed by every other usable, healthy one the policy permits"""
+        return [preferred] + [
+            model_type for model_type in ModelType
+            if model_type != preferred
+            and self._is_usable(model_type, context)
+            and self.resilience.is_available(model_type.value)
+            and self.router.permits(model_type.value, context)
+        ]
+    
+    def _is_usable(self, model_type: ModelType, context: Dict[str, Any]) -> bool:
+        """Whether a model is the user's own or has credentials of its own"""
+        model_info = self.active_models.get(context.get('user_id'))
+        if model_info and model_info['type'] == model_type:
+            return True
+        client = self.clients.get(model_type)
+        return bool(getattr(client, 'is_configured', False) or getattr(client, 'api_key', None))
+    
+    def _pack_context(self, command: str, context: Dict[str, Any], model_type: ModelType) -> Dict[str, Any]:
+        """Context as sent to one provider, with history packed into its budget"""
+        if self.context_packer is None:
+            return context
+        return self.context_packer(command, context, model_type.value)
+    
+    def _flight_key(self, command: str, context: Dict[str, Any], model_type: ModelType) -> str:
+        """Identity of an upstream request: model plus everything the client sends"""
+        prefs = context.get('preferences') or {}
+        material = {
+            'model': model_type.value,
+            'command': command,
+            'language': prefs.get('language'),
+            'summary': context.get('conversation_summary'),
+            'history': [
+                (msg.get('type'), msg.get('content'))
+                for msg in context.get('conversation_history') or []
+            ]
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+    
+    async def _cache_response(self, command: str, model_type: ModelType, context: Dict[str, Any],
+                              ai_response: AIResponse):
+        """Cache successful answers; failures and empty text are never cached"""
+        if ai_response.confidence > 0.0 and ai_response.text:
+            await self.response_cache.put(command, model_type.value, context, ai_response)
+    
+    def _resolve_client(self, command: str, context: Dict[str, Any]) -> Tuple[Any, ModelType]:
+        """Pick the client that should handle a command"""
         user_id = context.get('user_id')
         model_info = self.active_models.get(user_id)
         
@@ -106,15 +405,16 @@ class ModelManager:
         model_type = model_info['type']
         
         # Determine if we need to switch models based on task type
-        best_model_type = self._select_best_model(command, context, model_type)
+        with tracer.span('routing'):
+            best_model_type = self._select_best_model(command, context, model_type)
         
         if best_model_type != model_type:
             client = self.clients[best_model_type]
-            logger.info(f"Switched to {best_model_type.value} for specialized task")
-        
-        # Process command
-        response = await client.process_command(command, context)
         
+        return client, best_model_type
+    
+    def _build_response(self, command: str, response: Dict[str, Any], model_type: ModelType) -> AIResponse:
+        """Turn a raw client response into an AIResponse"""
         # Parse response for actions
         actions = self._extract_actions(response)
         needs_confirmation = self._check_confirmation_required(command, actions)
@@ -124,37 +424,16 @@ class ModelManager:
             actions=actions,
             needs_confirmation=needs_confirmation,
             confidence=response.get('confidence', 0.9),
-            model_used=best_model_type.value
+            model_used=model_type.value
         )
     
     def _select_best_model(self, command: str, context: Dict[str, Any], current_model: ModelType) -> ModelType:
         """
         Select the best model for the given command
         """
-        command_lower = command.lower()
-        
-        # Coding tasks - DeepSeek excels at coding
-        coding_keywords = ['code', 'program', 'function', 'algorithm', 'debug', 'python', 'javascript']
-        if any(keyword in command_lower for keyword in coding_keywords):
-            return ModelType.DEEPSEEK
-        
-        # Creative writing - GPT-4 is strong here
-        creative_keywords = ['write', 'create', 'story', 'poem', 'article', 'blog']
-        if any(keyword in command_lower for keyword in creative_keywords):
-            return ModelType.OPENAI
-        
-        # Privacy-sensitive tasks - use local model
-        privacy_keywords = ['private', 'confidential', 'personal', 'sensitive']
-        if any(keyword in command_lower for keyword in privacy_keywords):
-            return ModelType.LOCAL_LLAMA
-        
-        # Enterprise/business tasks - Claude is good here
-        business_keywords = ['business', 'enterprise', 'corporate', 'professional']
-        if any(keyword in command_lower for keyword in business_keywords):
-            return ModelType.ANTHROPIC
-        
-        # Default to current model
-        return current_model
+        candidates = [model_type.value for model_type in ModelType if self._is_usable(model_type, context)]
+        best = self.router.route(command, context, current_model.value, candidates, self.resilience.is_available)
+        return ModelType(best)
     
     def _extract_actions(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -1,5 +1,10 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
+
+from .prompt_window import select_history
+from .resilience import ProviderError, TRANSPORT_ERRORS, raise_for_status
+from .streaming import iter_sse_events
+from network.http_transport import http_transport
 
 logger = logging.getLogger(__name__)
 
@@ -7,13 +12,12 @@ class OpenAIClient:
     def __init__(self):
         self.api_key = None
         self.base_url = "https://api.openai.com/v1"
-        self.session = None
+        self.transport = http_transport
         self.is_configured = False
         
     async def initialize(self):
         """Initialize the client"""
-        import aiohttp
-        self.session = aiohttp.ClientSession()
+        await self.transport.initialize()
         
     async def configure(self, api_key: Optional[str] = None, **kwargs) -> bool:
         """Configure the OpenAI client"""
@@ -41,47 +45,31 @@ class OpenAIClient:
             }
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            messages = [{'role': 'user', 'content': prompt}]
-            
-            data = {
-                'model': 'gpt-4',
-                'messages': messages,
-                'temperature': 0.7,
-                'max_tokens': 2000
-            }
-            
-            async with self.session.post(
+            async with self.transport.post(
+                'openai',
                 f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data
+                headers=self._headers(),
+                json=self._build_payload(prompt, context or {}, stream=False)
             ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    content = result['choices'][0]['message']['content']
+                await raise_for_status('openai', response)
+                
+                result = await response.json()
+                content = result['choices'][0]['message']['content']
                     
-                    return {
-                        'text': content,
-                        'action_required': False,  # Simplified for demo
-                        'confidence': 0.95,
-                        'metadata': {
-                            'model': 'gpt-4',
-                            'tokens_used': result.get('usage', {}).get('total_tokens', 0)
-                        }
-                    }
-                else:
-                    error_text = await response.text()
-                    logger.error(f"OpenAI API error: {response.status} - {error_text}")
-                    return {
-                        'text': 'Sorry, I encountered an error with the AI service.',
-                        'action_required': False,
-                        'confidence': 0.0
+                return {
+                    'text': content,
+                    'action_required': False,  # Simplified for demo
+                    'confidence': 0.95,
+                    'metadata': {
+                        'model': 'gpt-4',
+                        'tokens_used': result.get('usage', {}).get('total_tokens', 0)
                     }
+                }
                     
+        except ProviderError:
+            raise
+        except TRANSPORT_ERRORS as e:
+            raise ProviderError('openai', None, str(e) or type(e).__name__)
         except Exception as e:
             logger.error(f"Error calling OpenAI API: {e}")
             return {
@@ -90,6 +78,59 @@ class OpenAIClient:
                 'confidence': 0.0
             }
     
+    async def process_command(self, command: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Process command (ModelManager entry point)"""
+        return await self.process(command, context)
+    
+    async def stream_command(self, command: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the completion for a command as text deltas"""
+        if not self.is_configured:
+            raise ValueError("OpenAI client is not configured")
+        
+        async with self.transport.post(
+            'openai',
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=self._build_payload(command, context, stream=True)
+        ) as response:
+            await raise_for_status('openai', response)
+            
+            async for event in iter_sse_events(response):
+                choices = event.get('choices') or [{}]
+                delta = choices[0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+    
+    def _headers(self) -> Dict[str, str]:
+        """Build request headers"""
+        return {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+    
+    def _build_payload(self, prompt: str, context: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        """Build chat completion request body"""
+        messages = []
+        if context.get('conversation_summary'):
+            messages.append({
+                'role': 'system',
+                'content': f"Earlier in this conversation:\n{context['conversation_summary']}"
+            })
+        for msg in select_history(context, 10):
+            messages.append({
+                'role': 'user' if msg.get('type') == 'user' else 'assistant',
+                'content': msg.get('content', '')
+            })
+        messages.append({'role': 'user', 'content': prompt})
+        
+        return {
+            'model': 'gpt-4',
+            'messages': messages,
+            'temperature': 0.7,
+            'max_tokens': 2000,
+            'stream': stream
+        }
+    
     async def test_connection(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Test connection to OpenAI API"""
         try:
@@ -99,6 +140,5 @@ class OpenAIClient:
             return {'success': False, 'error': str(e)}
     
     async def cleanup(self):
-        """Cleanup resources"""
-        if self.session:
-            await self.session.close()
+        """Cleanup resources (the shared transport is closed by its owner)"""
+        pass
@@ -0,0 +1,26 @@
+"""
+Prompt window - conversation history selection that keeps prompt prefixes stable
+"""
+from typing import List, Dict, Any
+
+def stable_history_window(history: List[Dict[str, Any]], window: int = 10) -> List[Dict[str, Any]]:
+    """
+    Return between ``window`` and ``2 * window`` recent messages.
+
+    A plain ``history[-window:]`` drops the oldest message every turn, so
+    consecutive prompts never share more than the system prompt and
+    provider-side prefix caches (and the local KV cache) miss. Here the start
+    of the window only moves in steps of ``window`` messages; between steps
+    each prompt extends the previous one.
+    """
+    if len(history) <= window:
+        return list(history)
+    start = (len(history) - window) // window * window
+    return history[start:]
+
+def select_history(context: Dict[str, Any], window: int = 10) -> List[Dict[str, Any]]:
+    """History to send: as packed by the context manager, else a stable window"""
+    history = context.get('conversation_history') or []
+    if context.get('history_packed'):
+        return list(history)
+    return stable_history_window(history, window)
@@ -0,0 +1,72 @@
+"""
+Provider statistics - rolling latency, error and cost samples per AI provider
+"""
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Tuple
+
+import numpy as np
+
+class ProviderStats:
+    """Keeps the last ``window`` request and time-to-first-token samples per provider"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._first_token: Dict[str, Deque[float]] = {}
+        self._requests: Dict[str, Deque[Tuple[float, bool, float]]] = {}
+
+    def record_request(self, provider: str, latency: float, success: bool, cost: float = 0.0):
+        """Record a completed request: total latency, outcome and estimated cost (USD)"""
+        if provider not in self._requests:
+            self._requests[provider] = deque(maxlen=self.window)
+        self._requests[provider].append((latency, success, cost))
+
+    def request_count(self, provider: str) -> int:
+        return len(self._requests.get(provider, ()))
+
+    def latency_percentile(self, provider: str, percentile: float) -> Optional[float]:
+        """Latency percentile over successful requests"""
+        latencies = [latency for latency, success, _ in self._requests.get(provider, ()) if success]
+        if not latencies:
+            return None
+        return float(np.percentile(latencies, percentile))
+
+    def error_rate(self, provider: str) -> float:
+        samples = self._requests.get(provider)
+        if not samples:
+            return 0.0
+        return sum(1 for _, success, _ in samples if not success) / len(samples)
+
+    def average_cost(self, provider: str) -> Optional[float]:
+        costs = [cost for _, success, cost in self._requests.get(provider, ()) if success]
+        if not costs:
+            return None
+        return sum(costs) / len(costs)
+
+    def record_first_token(self, provider: str, seconds: float):
+        if provider not in self._first_token:
+            self._first_token[provider] = deque(maxlen=self.window)
+        self._first_token[provider].append(seconds)
+
+    def sample_count(self, provider: str) -> int:
+        return len(self._first_token.get(provider, ()))
+
+    def first_token_percentile(self, provider: str, percentile: float) -> Optional[float]:
+        samples = self._first_token.get(provider)
+        if not samples:
+            return None
+        return float(np.percentile(samples, percentile))
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {}
+        for provider in set(self._first_token) | set(self._requests):
+            summary[provider] = {
+                'requests': self.request_count(provider),
+                'latency_p50': self.latency_percentile(provider, 50),
+                'latency_p95': self.latency_percentile(provider, 95),
+                'error_rate': self.error_rate(provider),
+                'average_cost': self.average_cost(provider),
+                'first_token_samples': self.sample_count(provider),
+                'first_token_p50': self.first_token_percentile(provider, 50),
+                'first_token_p95': self.first_token_percentile(provider, 95)
+            }
+        return summary
@@ -0,0 +1,234 @@
+"""
+Provider resilience - rate limiting, retries and circuit breakers for AI clients
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+class ProviderError(Exception):
+    """An upstream call failed; ``status`` is None for transport errors"""
+
+    def __init__(self, provider: str, status: Optional[int], message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{provider} error {status}: {message}")
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+# Failures below HTTP: connection resets, DNS errors, read timeouts
+TRANSPORT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+async def raise_for_status(provider: str, response):
+    """Raise ProviderError for a non-200 response"""
+    if response.status != 200:
+        error_text = await response.text()
+        raise ProviderError(
+            provider, response.status, error_text,
+            retry_after=parse_retry_after(response.headers.get('Retry-After'))
+        )
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is rejecting calls"""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit open for {provider}")
+        self.provider = provider
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures; after
+    ``recovery_timeout`` seconds one probe call is let through (half-open) and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected"""
+        if self.state == 'closed':
+            return False
+        if self.state == 'open':
+            return time.monotonic() - self.opened_at < self.recovery_timeout
+        return self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = 'half_open'
+            self._probe_in_flight = False
+        if self.state == 'half_open' and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release(self):
+        """A call ended without a verdict (e.g. cancelled); free the probe slot"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honoring Retry-After"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class ProviderResilience:
+    """Per-provider breakers and per-API-key rate limits around client calls"""
+
+    def __init__(self, rate_limits: Optional[Dict[str, Dict[str, float]]] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.rate_limits = rate_limits or {}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(provider, self.failure_threshold, self.recovery_timeout)
+        return self.breakers[provider]
+
+    def is_available(self, provider: str) -> bool:
+        return not self.breaker(provider).is_open
+
+    async def acquire(self, provider: str, api_key: Optional[str]):
+        """
+        Wait for rate-limit capacity, then check the breaker before a call.
+
+        The breaker is consulted last: in half-open state that takes the
+        single probe slot, which a call cancelled while waiting for capacity
+        could otherwise never give back.
+        """
+        breaker = self.breaker(provider)
+        if breaker.is_open:
+            raise CircuitOpenError(provider)
+
+        limits = self.rate_limits.get(provider)
+        if limits:
+            # Buckets are per key so users with their own keys don't share quota
+            key_id = hashlib.sha256((api_key or '').encode()).hexdigest()[:12]
+            bucket_key = f"{provider}:{key_id}"
+            if bucket_key not in self.buckets:
+                self.buckets[bucket_key] = TokenBucket(limits['rate'], limits.get('burst', limits['rate']))
+            await self.buckets[bucket_key].acquire()
+
+        # No await between taking the slot and the caller's try block
+        if not breaker.allow_request():
+            raise CircuitOpenError(provider)
+
+    def record(self, provider: str, error: Optional[Exception] = None):
+        """Feed a call outcome to the provider's breaker"""
+        breaker = self.breaker(provider)
+        if error is None or (isinstance(error, ProviderError) and not error.retryable):
+            # A 4xx caused by the request says nothing about provider health
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    def release(self, provider: str):
+        """A call was abandoned before it succeeded or failed"""
+        self.breaker(provider).release()
+
+    async def call(self, provider: str, api_key: Optional[str], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` with rate limiting, retries and circuit breaking"""
+        attempts = self.retry_policy.max_attempts
+        for attempt in range(attempts):
+            await self.acquire(provider, api_key)
+            try:
+                result = await fn()
+            except ProviderError as e:
+                self.record(provider, e)
+                if not e.retryable or attempt == attempts - 1:
+                    raise
+                delay = self.retry_policy.delay(attempt, e.retry_after)
+                logger.warning(f"{e}; retrying in {delay:.2f}s ({attempt + 1}/{attempts - 1})")
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled or failed without a verdict: free a half-open probe slot
+                self.release(provider)
+                raise
+            else:
+                self.record(provider)
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            provider: {'state': breaker.state, 'failures': breaker.failures}
+            for provider, breaker in self.breakers.items()
+        }
@@ -0,0 +1,203 @@
+"""
+Response cache for ModelManager - exact and semantic tiers
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+class ResponseCache:
+    """
+    Caches AI responses per (normalized command, model, context hash).
+
+    The context hash covers the user and everything the client sends along
+    with the command: language, rolling summary and the packed history. Pass
+    the context as packed for ``model``, and use the model the request was
+    routed to for both lookup and store, even if another provider answered.
+
+    The exact tier matches commands after normalization ("What's the
+    weather?" == "whats the weather"). The optional semantic tier embeds
+    commands with sentence-transformers and accepts a cached answer whose
+    command is within ``similarity_threshold`` cosine similarity, but only
+    among entries with the same model and context hash. Entries expire after
+    ``ttl_seconds`` and the least recently used are evicted beyond
+    ``max_entries``.
+
+    Users opt out with ``preferences['cache_responses'] = False``.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 600, semantic: bool = False,
+                 similarity_threshold: float = 0.92, embedding_model: str = "all-MiniLM-L6-v2"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.embedding_model = embedding_model
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._partitions: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+        self._encoder = None
+        self._encoder_lock = asyncio.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def normalize(command: str) -> str:
+        """Lowercase, strip punctuation and collapse whitespace"""
+        command = _PUNCTUATION.sub("", command.lower())
+        return _WHITESPACE.sub(" ", command).strip()
+
+    def context_hash(self, context: Dict[str, Any]) -> str:
+        """Hash of the context that can change the answer to the same command"""
+        prefs = context.get('preferences') or {}
+        material = {
+            # Answers may draw on a user's own history; never share them
+            'user_id': context.get('user_id'),
+            'language': prefs.get('language'),
+            'summary': context.get('conversation_summary'),
+            'history': [
+                (msg.get('type'), msg.get('content'))
+                for msg in context.get('conversation_history') or []
+            ]
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def is_enabled_for(self, context: Dict[str, Any]) -> bool:
+        prefs = context.get('preferences') or {}
+        if prefs.get('cache_responses', True):
+            return True
+        self.bypassed += 1
+        return False
+
+    async def get(self, command: str, model: str, context: Dict[str, Any]):
+        """Return a cached AIResponse or None"""
+        normalized = self.normalize(command)
+        ctx_hash = self.context_hash(context)
+        key = self._key(normalized, model, ctx_hash)
+
+        entry = self._entries.get(key)
+        if entry and not self._expired(entry):
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry['response']
+        if entry:
+            self._remove(key)
+
+        if self.semantic:
+            response = await self._semantic_lookup(normalized, model, ctx_hash)
+            if response is not None:
+                self.semantic_hits += 1
+                return response
+
+        self.misses += 1
+        return None
+
+    async def put(self, command: str, model: str, context: Dict[str, Any], response):
+        """Store a response"""
+        normalized = self.normalize(command)
+        ctx_hash = self.context_hash(context)
+        key = self._key(normalized, model, ctx_hash)
+
+        self._entries[key] = {
+            'response': response,
+            'expires_at': time.monotonic() + self.ttl_seconds,
+            'partition': (model, ctx_hash)
+        }
+        self._entries.move_to_end(key)
+
+        if self.semantic:
+            vector = await self._embed(normalized)
+            if vector is not None and key in self._entries:
+                self._partitions.setdefault((model, ctx_hash), {})[key] = vector
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+    async def _semantic_lookup(self, normalized: str, model: str, ctx_hash: str):
+        partition = self._partitions.get((model, ctx_hash))
+        if not partition:
+            return None
+
+        vector = await self._embed(normalized)
+        if vector is None:
+            return None
+
+        keys = list(partition)
+        similarities = np.stack([partition[k] for k in keys]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        key = keys[best]
+        entry = self._entries.get(key)
+        if not entry or self._expired(entry):
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry['response']
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        encoder = await self._get_encoder()
+        if encoder is None:
+            return None
+        vector = await asyncio.to_thread(encoder.encode, text, normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)
+
+    async def _get_encoder(self):
+        if self._encoder is not None or not self.semantic:
+            return self._encoder
+
+        async with self._encoder_lock:
+            if self._encoder is None and self.semantic:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._encoder = await asyncio.to_thread(SentenceTransformer, self.embedding_model)
+                    logger.info(f"Semantic response cache using {self.embedding_model}")
+                except Exception as e:
+                    logger.warning(f"Semantic response cache disabled: {e}")
+                    self.semantic = False
+        return self._encoder
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            partition = self._partitions.get(entry['partition'])
+            if partition:
+                partition.pop(key, None)
+                if not partition:
+                    del self._partitions[entry['partition']]
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return entry['expires_at'] < time.monotonic()
+
+    @staticmethod
+    def _key(normalized: str, model: str, ctx_hash: str) -> str:
+        return f"{model}:{ctx_hash}:{normalized}"
@@ -0,0 +1,191 @@
+"""
+Model router - picks a provider from intent, health, latency, cost and user policy
+"""
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional, Callable
+
+from .provider_stats import ProviderStats
+
+logger = logging.getLogger(__name__)
+
+# Checked in order; the first intent present in a command wins
+DEFAULT_INTENT_RULES = {
+    'coding': ('deepseek', ['code', 'program', 'function', 'algorithm', 'debug', 'python', 'javascript']),
+    'creative': ('openai', ['write', 'create', 'story', 'poem', 'article', 'blog']),
+    'privacy': ('llama', ['private', 'confidential', 'personal', 'sensitive']),
+    'business': ('anthropic', ['business', 'enterprise', 'corporate', 'professional'])
+}
+
+DEFAULT_COST_PER_1K_TOKENS = {
+    'deepseek': 0.002,
+    'openai': 0.06,
+    'anthropic': 0.024,
+    'llama': 0.0
+}
+
+@dataclass
+class RoutingPolicy:
+    """Per-user routing constraints"""
+    max_latency: Optional[float] = None  # seconds, compared with p95
+    max_cost: Optional[float] = None  # USD per request, compared with the average
+    privacy_requires_local: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RoutingPolicy':
+        return cls(
+            max_latency=data.get('max_latency'),
+            max_cost=data.get('max_cost'),
+            privacy_requires_local=bool(data.get('privacy_requires_local', False))
+        )
+
+@dataclass
+class RoutingDecision:
+    """Why a provider was chosen for one command"""
+    timestamp: float
+    user_id: Optional[str]
+    intent: Optional[str]
+    chosen: str
+    reason: str
+    scores: Dict[str, float] = field(default_factory=dict)
+    excluded: Dict[str, str] = field(default_factory=dict)
+
+class ModelRouter:
+    """
+    Scores candidate providers for a command.
+
+    Intent keywords are compiled into one regex with a named group per
+    intent, so classifying a command is a single scan. Each healthy candidate
+    that satisfies the user's policy is scored: matching the intent and being
+    the user's own model add to the score; rolling median latency, error rate
+    and average cost subtract from it. Recent decisions are kept for
+    inspection.
+    """
+
+    def __init__(self, stats: Optional[ProviderStats] = None,
+                 intent_rules: Optional[Dict[str, Any]] = None,
+                 cost_per_1k_tokens: Optional[Dict[str, float]] = None,
+                 local_provider: str = 'llama', min_samples: int = 5,
+                 intent_weight: float = 2.0, affinity_weight: float = 1.0,
+                 latency_weight: float = 0.5, error_weight: float = 3.0,
+                 cost_weight: float = 50.0, history_size: int = 200):
+        self.stats = stats or ProviderStats()
+        self.intent_rules = intent_rules or DEFAULT_INTENT_RULES
+        self.cost_per_1k_tokens = cost_per_1k_tokens or DEFAULT_COST_PER_1K_TOKENS
+        self.local_provider = local_provider
+        self.min_samples = min_samples
+        self.intent_weight = intent_weight
+        self.affinity_weight = affinity_weight
+        self.latency_weight = latency_weight
+        self.error_weight = error_weight
+        self.cost_weight = cost_weight
+
+        self.policies: Dict[str, RoutingPolicy] = {}
+        self.decisions = deque(maxlen=history_size)
+
+        self._intent_order = list(self.intent_rules)
+        self._matcher = re.compile(
+            "|".join(
+                f"(?P<{intent}>{'|'.join(re.escape(keyword) for keyword in keywords)})"
+                for intent, (_, keywords) in self.intent_rules.items()
+            ),
+            re.IGNORECASE
+        )
+
+    def set_policy(self, user_id: str, policy: RoutingPolicy):
+        self.policies[user_id] = policy
+
+    def policy_for(self, context: Dict[str, Any]) -> RoutingPolicy:
+        """Explicit policy for the user, else one from their preferences"""
+        policy = self.policies.get(context.get('user_id'))
+        if policy:
+            return policy
+        prefs = context.get('preferences') or {}
+        return RoutingPolicy.from_dict(prefs.get('routing') or {})
+
+    def classify(self, command: str) -> Optional[str]:
+        """Highest-priority intent whose keywords appear in the command"""
+        found = {match.lastgroup for match in self._matcher.finditer(command)}
+        for intent in self._intent_order:
+            if intent in found:
+                return intent
+        return None
+
+    def permits(self, provider: str, context: Dict[str, Any]) -> bool:
+        """Whether the user's policy allows sending the command to a provider"""
+        return not self.policy_for(context).privacy_requires_local or provider == self.local_provider
+
+    def route(self, command: str, context: Dict[str, Any], current: str,
+              candidates: List[str], is_available: Callable[[str], bool]) -> str:
+        """Pick a provider among ``candidates`` and log the decision"""
+        intent = self.classify(command)
+        policy = self.policy_for(context)
+        preferred = self.intent_rules[intent][0] if intent else current
+
+        scores: Dict[str, float] = {}
+        excluded: Dict[str, str] = {}
+        for provider in candidates:
+            reason = self._exclusion_reason(provider, policy, is_available)
+            if reason:
+                excluded[provider] = reason
+            else:
+                scores[provider] = self._score(provider, preferred, current)
+
+        if scores:
+            chosen = max(scores, key=scores.get)
+            reason = 'intent match' if chosen == preferred and intent else 'best score'
+        else:
+            # Nothing satisfies the policy; keep the least surprising choice
+            chosen = self.local_provider if policy.privacy_requires_local else preferred
+            reason = 'no candidate satisfied policy'
+
+        self.decisions.append(RoutingDecision(
+            timestamp=time.time(),
+            user_id=context.get('user_id'),
+            intent=intent,
+            chosen=chosen,
+            reason=reason,
+            scores={provider: round(score, 4) for provider, score in scores.items()},
+            excluded=excluded
+        ))
+        if chosen != current:
+            logger.info(f"Routed to {chosen} ({reason}, intent={intent})")
+        return chosen
+
+    def estimate_cost(self, provider: str, tokens: int) -> float:
+        return tokens / 1000 * self.cost_per_1k_tokens.get(provider, 0.0)
+
+    def recent_decisions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return [asdict(decision) for decision in list(self.decisions)[-limit:]]
+
+    def _exclusion_reason(self, provider: str, policy: RoutingPolicy,
+                          is_available: Callable[[str], bool]) -> Optional[str]:
+        if policy.privacy_requires_local and provider != self.local_provider:
+            return 'privacy requires local model'
+        if not is_available(provider):
+            return 'circuit open'
+
+        if self.stats.request_count(provider) >= self.min_samples:
+            p95 = self.stats.latency_percentile(provider, 95)
+            if policy.max_latency is not None and p95 is not None and p95 > policy.max_latency:
+                return f'p95 latency {p95:.2f}s over {policy.max_latency}s'
+            cost = self.stats.average_cost(provider)
+            if policy.max_cost is not None and cost is not None and cost > policy.max_cost:
+                return f'average cost ${cost:.4f} over ${policy.max_cost}'
+        return None
+
+    def _score(self, provider: str, preferred: str, current: str) -> float:
+        score = 0.0
+        if provider == preferred:
+            score += self.intent_weight
+        if provider == current:
+            score += self.affinity_weight
+
+        if self.stats.request_count(provider) >= self.min_samples:
+            score -= self.latency_weight * (self.stats.latency_percentile(provider, 50) or 0.0)
+            score -= self.error_weight * self.stats.error_rate(provider)
+            score -= self.cost_weight * (self.stats.average_cost(provider) or 0.0)
+        return score
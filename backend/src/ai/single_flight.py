@@ -0,0 +1,56 @@
+"""
+Single-flight request coalescing
+"""
+import asyncio
+import logging
+from typing import Dict, Any, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one upstream call.
+
+    The first caller for a key starts the call; callers that arrive while it
+    is in flight wait on the same task and receive the same result (or
+    exception). A waiter that is cancelled only stops waiting: the upstream
+    call keeps running for the others, and is cancelled only when every
+    waiter has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = {'task': asyncio.create_task(fn()), 'waiters': 0}
+            self._calls[key] = call
+            call['task'].add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.upstream_calls += 1
+        else:
+            self.coalesced_calls += 1
+
+        call['waiters'] += 1
+        try:
+            # Shield so one waiter's cancellation does not cancel the shared call
+            return await asyncio.shield(call['task'])
+        finally:
+            call['waiters'] -= 1
+            if call['waiters'] == 0 and not call['task'].done():
+                self._forget(key, call)
+                call['task'].cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': len(self._calls),
+            'upstream_calls': self.upstream_calls,
+            'coalesced_calls': self.coalesced_calls
+        }
+
+    def _forget(self, key: str, call: Dict[str, Any]):
+        # A newer call may already own the key after a cancellation
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,34 @@
+"""
+Streaming helpers shared by the AI clients
+"""
+import json
+import logging
+from typing import AsyncIterator, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+async def iter_sse_events(response) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Parse a server-sent events body into JSON payloads.
+
+    Yields the decoded ``data:`` payload of every event and stops at the
+    OpenAI-style ``[DONE]`` sentinel. Events whose payload is not JSON are
+    skipped.
+    """
+    buffer = b""
+    async for chunk in response.content.iter_any():
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            line = line.strip()
+            if not line or not line.startswith(b"data:"):
+                continue
+
+            payload = line[len(b"data:"):].strip()
+            if payload == b"[DONE]":
+                return
+
+            try:
+                yield json.loads(payload)
+            except json.JSONDecodeError:
+                logger.debug(f"Skipping non-JSON SSE payload: {payload[:80]!r}")
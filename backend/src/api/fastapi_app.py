@@ -1,13 +1,18 @@
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
+import asyncio
 import logging
 from typing import Dict, Any, List
 from datetime import datetime
 import json
+from dataclasses import asdict
 from datetime import datetime
 
 from core.assistant_core import AIAssistantCore
+from voice.streaming_stt import StreamingTranscriber
+from observability import metrics_registry
 
 logger = logging.getLogger(__name__)
 
@@ -117,11 +122,150 @@ def create_app(assistant_core: AIAssistantCore) -> FastAPI:
         try:
             while True:
                 data = await websocket.receive_text()
+                
+                try:
+                    message = json.loads(data)
+                except json.JSONDecodeError:
+                    message = None
+                
+                if isinstance(message, dict) and message.get('type') == 'stream_command':
+                    await stream_command(websocket, message)
+                    continue
+                
+                if isinstance(message, dict) and message.get('type') == 'voice_command':
+                    await stream_voice_command(websocket, message)
+                    continue
+                
                 # Handle real-time messages
                 await manager.send_personal_message(f"Message received: {data}", websocket)
         except WebSocketDisconnect:
             manager.disconnect(websocket)
     
+    async def send_json(websocket: WebSocket, payload: Dict[str, Any]):
+        """Send to the client; failing because it went away counts as a disconnect"""
+        try:
+            await websocket.send_json(payload)
+        except (RuntimeError, OSError) as e:
+            raise WebSocketDisconnect(code=1006) from e
+    
+    async def stream_command(websocket: WebSocket, message: Dict[str, Any]):
+        """Forward response tokens to the client as the model produces them"""
+        text = message.get('text')
+        request_id = message.get('request_id')
+        
+        if not text:
+            await send_json(websocket, {'type': 'error', 'request_id': request_id, 'error': 'Text is required'})
+            return
+        
+        events = assistant_core.stream_text_command(
+            text,
+            message.get('user_id', 'default'),
+            message.get('session_id', '')
+        )
+        # A disconnect (or failed send) must not leave the model stream running
+        try:
+            async for event in events:
+                if event['type'] == 'token':
+                    await send_json(websocket, {'type': 'token', 'request_id': request_id, 'text': event['text']})
+                elif event['type'] == 'action':
+                    await send_json(websocket, {
+                        'type': 'action',
+                        'request_id': request_id,
+                        'index': event['index'],
+                        'action': event['action'],
+                        'result': event['result']
+                    })
+                elif event['type'] == 'complete':
+                    await send_json(websocket, {'type': 'complete', 'request_id': request_id, 'result': asdict(event['result'])})
+        finally:
+            await events.aclose()
+    
+    async def stream_voice_command(websocket: WebSocket, message: Dict[str, Any]):
+        """Send transcript, tokens and per-sentence audio as each stage produces them"""
+        audio_hex = message.get('audio')
+        request_id = message.get('request_id')
+        
+        if not audio_hex:
+            await send_json(websocket, {'type': 'error', 'request_id': request_id, 'error': 'Audio data is required'})
+            return
+        
+        events = assistant_core.stream_voice_command(
+            bytes.fromhex(audio_hex),
+            message.get('user_id', 'default'),
+            message.get('session_id', '')
+        )
+        try:
+            async for event in events:
+                if event['type'] == 'audio':
+                    await send_json(websocket, {
+                        'type': 'audio',
+                        'request_id': request_id,
+                        'index': event['index'],
+                        'text': event['text'],
+                        'audio_data': event['audio'].hex() if event['audio'] else None
+                    })
+                elif event['type'] == 'action':
+                    await send_json(websocket, {
+                        'type': 'action',
+                        'request_id': request_id,
+                        'index': event['index'],
+                        'action': event['action'],
+                        'result': event['result']
+                    })
+                elif event['type'] == 'complete':
+                    await send_json(websocket, {'type': 'complete', 'request_id': request_id, 'result': asdict(event['result'])})
+                else:
+                    await send_json(websocket, {'type': event['type'], 'request_id': request_id, 'text': event['text']})
+        finally:
+            await events.aclose()
+    
+    @app.websocket("/ws/audio")
+    async def audio_stream_endpoint(websocket: WebSocket, user_id: str = "default", language: str = "english"):
+        """
+        Binary audio ingestion with live transcripts
+        
+        The client sends 16-bit mono PCM frames at ``voice.sample_rate`` as
+        binary messages and the text message ``end`` to flush the current
+        utterance. Partial and final transcripts are pushed back as JSON.
+        """
+        await websocket.accept()
+        
+        voice_config = assistant_core.config.voice
+        transcriber = StreamingTranscriber(
+            assistant_core.speech_to_text,
+            user_id,
+            language=language,
+            sample_rate=voice_config.sample_rate,
+            chunk_size=voice_config.chunk_size,
+            silence_threshold=voice_config.silence_threshold
+        )
+        
+        async def forward_transcripts():
+            try:
+                while True:
+                    event = await transcriber.events.get()
+                    await send_json(websocket, event)
+            except WebSocketDisconnect:
+                pass
+        
+        sender = asyncio.create_task(forward_transcripts())
+        try:
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                
+                if message.get('bytes'):
+                    await transcriber.feed(message['bytes'])
+                elif message.get('text') == 'end':
+                    await transcriber.finish()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            await transcriber.close()
+    
     @app.get("/api/system/info")
     async def get_system_info():
         """Get system information"""
@@ -131,6 +275,23 @@ def create_app(assistant_core: AIAssistantCore) -> FastAPI:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
+    @app.get("/api/ai/routing")
+    async def get_routing_info(limit: int = 50):
+        """Recent routing decisions and provider health"""
+        model_manager = assistant_core.model_manager
+        return {
+            'decisions': model_manager.get_routing_decisions(limit),
+            'providers': model_manager.get_provider_health()
+        }
+    
+    @app.get("/api/metrics", response_class=PlainTextResponse)
+    async def get_metrics():
+        """Per-stage latency metrics in Prometheus text format"""
+        return PlainTextResponse(
+            metrics_registry.render_prometheus(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    
     @app.post("/api/auth/wallet")
     async def wallet_auth(auth_data: Dict[str, Any]):
         """Wallet authentication"""
@@ -140,7 +301,8 @@ def create_app(assistant_core: AIAssistantCore) -> FastAPI:
             address = auth_data.get('address')
             
             # Authenticate wallet
-            result = await assistant_core.did_manager.wallet_integration.connect_wallet(
+            did_manager = await assistant_core.startup.ensure('did_manager')
+            result = await did_manager.wallet_integration.connect_wallet(
                 wallet_type, auth_data
             )
             return result
@@ -163,7 +325,8 @@ async def social_auth(auth_data: Dict[str, Any]):
         if not provider or not token:
             raise HTTPException(status_code=400, detail="Provider and token are required")
         
-        social_auth = assistant_core.did_manager.wallet_integration.social_auth
+        did_manager = await assistant_core.startup.ensure('did_manager')
+        social_auth = did_manager.wallet_integration.social_auth
         if provider == 'google':
             result = await social_auth.authenticate_google(token)
         elif provider == 'github':
@@ -280,20 +443,29 @@ async def train_wake_word(training_data: Dict[str, Any]):
     """Train custom wake word"""
     try:
         wake_word = training_data.get('wake_word')
-        audio_samples = training_data.get('audio_samples', [])
+        user_id = training_data.get('user_id', 'default')
+        # Samples are hex-encoded 16-bit mono PCM at voice.sample_rate
+        audio_samples = [bytes.fromhex(sample) for sample in training_data.get('audio_samples', [])]
         
         if not wake_word:
             raise HTTPException(status_code=400, detail="Wake word is required")
         
-        result = await assistant_core.speech_to_text.wake_word_detector.train_custom_wake_word(
-            audio_samples, wake_word
-        )
-        return {'success': result}
+        job_id = await assistant_core.train_wake_word(user_id, wake_word, audio_samples)
+        return {'success': True, 'job_id': job_id, 'status': 'pending'}
         
     except Exception as e:
         logger.error(f"Error training wake word: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/train-wake-word/{job_id}")
+async def get_wake_word_training_job(job_id: str):
+    """Get custom wake word training status"""
+    await assistant_core.startup.ensure('wake_word_detector')
+    job = assistant_core.get_wake_word_training_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return {'success': True, 'job': job}
+
 @app.post("/api/open-application")
 async def open_application(app_data: Dict[str, Any]):
     """Open application"""
@@ -401,7 +573,8 @@ async def create_did(did_data: Dict[str, Any]):
     try:
         user_data = did_data.get('user_data', {})
         
-        result = await assistant_core.did_manager.create_did(user_data)
+        did_manager = await assistant_core.startup.ensure('did_manager')
+        result = await did_manager.create_did(user_data)
         return result
         
     except Exception as e:
@@ -418,7 +591,8 @@ async def store_blockchain_data(storage_data: Dict[str, Any]):
         if not data:
             raise HTTPException(status_code=400, detail="Data is required")
         
-        result = await assistant_core.did_manager.decentralized_storage.store_data(data, storage_type)
+        did_manager = await assistant_core.startup.ensure('did_manager')
+        result = await did_manager.decentralized_storage.store_data(data, storage_type)
         return result
         
     except Exception as e:
@@ -460,7 +634,8 @@ async def complete_setup(setup_data: Dict[str, Any]):
 async def get_available_voices(language: str = "en"):
     """Get available TTS voices for language"""
     try:
-        voices = assistant_core.text_to_speech.get_available_voices()
+        text_to_speech = await assistant_core.startup.ensure('text_to_speech')
+        voices = text_to_speech.get_available_voices()
         
         # Filter voices by language if specified
         if language:
@@ -484,12 +659,14 @@ async def test_voice(voice_data: Dict[str, Any]):
         voice_id = voice_data.get('voice_id')
         language = voice_data.get('language', 'en')
         
+        text_to_speech = await assistant_core.startup.ensure('text_to_speech')
+        
         # Set voice if specified
         if voice_id:
-            assistant_core.text_to_speech.set_voice_properties(voice_id=voice_id)
+            text_to_speech.set_voice_properties(voice_id=voice_id)
         
         # Generate audio
-        audio_data = await assistant_core.text_to_speech.synthesize(text, language)
+        audio_data = await text_to_speech.synthesize(text, language)
         
         if audio_data:
             return {
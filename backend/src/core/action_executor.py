@@ -0,0 +1,169 @@
+"""
+Action executor - runs independent actions concurrently in dependency order
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Set, Tuple, AsyncIterator
+
+from observability import tracer
+
+logger = logging.getLogger(__name__)
+
+# Actions that don't touch shared state; anything not listed here or in
+# ``_resource`` (e.g. ``run_command``) runs alone, in list order
+READ_ONLY_ACTIONS = {'system_info'}
+
+class ActionExecutor:
+    """
+    Executes a response's actions as a dependency graph.
+
+    An action waits for the actions listed in its ``depends_on`` (indexes or
+    ``id`` values) and for earlier actions it conflicts with: the same
+    application, writes to the same file, file writes before a file search,
+    and anything before or after an arbitrary command. Everything else runs
+    concurrently, limited per user, and each action has its own timeout.
+    Results keep the ``{'action', 'result'}`` shape of sequential execution.
+    """
+
+    def __init__(self, automation_engine, max_concurrent_per_user: int = 4,
+                 default_timeout: float = 30.0, timeouts: Optional[Dict[str, float]] = None):
+        self.automation_engine = automation_engine
+        self.max_concurrent_per_user = max_concurrent_per_user
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def execute(self, actions: List[Dict[str, Any]], user_id: str) -> List[Dict[str, Any]]:
+        """Run all actions and return their results in list order"""
+        if not actions:
+            return []
+        results: List[Optional[Dict[str, Any]]] = [None] * len(actions)
+        with tracer.span('actions', count=len(actions)):
+            async for event in self.stream(actions, user_id):
+                results[event['index']] = {'action': event['action'], 'result': event['result']}
+        return results
+
+    async def stream(self, actions: List[Dict[str, Any]], user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{'index', 'action', 'result'}`` as each action finishes"""
+        if not actions:
+            return
+
+        dependencies, required = self.build_graph(actions)
+        finished = [asyncio.get_running_loop().create_future() for _ in actions]
+        completed: asyncio.Queue = asyncio.Queue()
+
+        async def run(index: int):
+            result = {'success': False, 'error': 'Action did not run'}
+            try:
+                results = [await finished[dep] for dep in sorted(dependencies[index])]
+                failed = [
+                    dep for dep, dep_result in zip(sorted(dependencies[index]), results)
+                    if dep in required[index] and not dep_result.get('success')
+                ]
+                if failed:
+                    result = {'success': False, 'error': f'Skipped: action {failed[0]} failed'}
+                else:
+                    result = await self._run_action(actions[index], user_id)
+            finally:
+                # Dependents and the consumer wait on this, whatever happened above
+                finished[index].set_result(result)
+                completed.put_nowait(index)
+
+        tasks = [asyncio.create_task(run(index)) for index in range(len(actions))]
+        try:
+            for _ in actions:
+                index = await completed.get()
+                yield {'index': index, 'action': actions[index], 'result': finished[index].result()}
+        finally:
+            # Abandoned by the consumer: don't start or finish anything else
+            for task in tasks:
+                task.cancel()
+
+    def build_graph(self, actions: List[Dict[str, Any]]) -> Tuple[List[Set[int]], List[Set[int]]]:
+        """
+        Dependencies of every action, and the subset declared explicitly.
+
+        Explicit dependencies must succeed for an action to run; ordering
+        from conflicts only serializes. A cyclic declaration falls back to
+        running the actions in list order.
+        """
+        ids = {action['id']: index for index, action in enumerate(actions) if action.get('id') is not None}
+        required: List[Set[int]] = []
+        for index, action in enumerate(actions):
+            deps = set()
+            for ref in action.get('depends_on') or []:
+                dep = ids.get(ref, ref if isinstance(ref, int) else None)
+                if dep is None or not 0 <= dep < len(actions) or dep == index:
+                    logger.warning(f"Ignoring unknown dependency {ref!r} of action {index}")
+                    continue
+                deps.add(dep)
+            required.append(deps)
+
+        dependencies = [set(deps) for deps in required]
+        for later in range(len(actions)):
+            for earlier in range(later):
+                if self._conflicts(actions[earlier], actions[later]):
+                    dependencies[later].add(earlier)
+
+        if self._has_cycle(dependencies):
+            logger.warning("Action dependencies contain a cycle; running actions in order")
+            return [set(range(index)) for index in range(len(actions))], [set() for _ in actions]
+        return dependencies, required
+
+    async def _run_action(self, action: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        timeout = action.get('timeout') or self.timeouts.get(action.get('type'), self.default_timeout)
+        async with self._semaphore(user_id):
+            try:
+                with tracer.span(f"action.{action.get('type')}"):
+                    return await asyncio.wait_for(
+                        self.automation_engine.execute_action(action, user_id), timeout
+                    )
+            except asyncio.TimeoutError:
+                logger.warning(f"Action {action.get('type')} timed out after {timeout}s")
+                return {'success': False, 'error': f'Timed out after {timeout}s'}
+            except Exception as e:
+                logger.error(f"Action {action.get('type')} failed: {e}")
+                return {'success': False, 'error': str(e)}
+
+    def _semaphore(self, user_id: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(user_id)
+        if semaphore is None:
+            semaphore = self._semaphores[user_id] = asyncio.Semaphore(self.max_concurrent_per_user)
+        return semaphore
+
+    @staticmethod
+    def _resource(action: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        params = action.get('parameters') or {}
+        action_type = action.get('type')
+        if action_type in ('open_app', 'close_app'):
+            return 'app', str(params.get('name', '')).lower()
+        if action_type in ('create_file', 'delete_file'):
+            return 'file', params.get('path')
+        if action_type == 'search_files':
+            return 'search', None
+        if action_type in READ_ONLY_ACTIONS:
+            return 'none', None
+        return 'barrier', None
+
+    @classmethod
+    def _conflicts(cls, first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+        first_resource, second_resource = cls._resource(first), cls._resource(second)
+        kinds = {first_resource[0], second_resource[0]}
+        if 'barrier' in kinds or kinds == {'file', 'search'}:
+            return True
+        return kinds <= {'app', 'file'} and first_resource == second_resource
+
+    @staticmethod
+    def _has_cycle(dependencies: List[Set[int]]) -> bool:
+        remaining = {index: set(deps) for index, deps in enumerate(dependencies)}
+        ready = [index for index, deps in remaining.items() if not deps]
+        resolved = 0
+        while ready:
+            done = ready.pop()
+            resolved += 1
+            for index, deps in remaining.items():
+                if done in deps:
+                    deps.discard(done)
+                    if not deps:
+                        ready.append(index)
+        return resolved != len(dependencies)
@@ -3,20 +3,37 @@ Core AI Assistant Logic - Main orchestrator
 """
 import asyncio
 import json
-from typing import Dict, Any, Optional
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, AsyncIterator
 from dataclasses import dataclass
 from pathlib import Path
 
 from ai.model_manager import ModelManager
+from ai.response_cache import ResponseCache
+from ai.resilience import ProviderResilience, RetryPolicy
+from ai.provider_stats import ProviderStats
+from ai.hedging import RequestHedger
+from ai.router import ModelRouter
 from voice.speech_to_text import SpeechToText
 from voice.text_to_speech import TextToSpeech
 from voice.wake_word_detector import WakeWordDetector
+from voice.sentence_splitter import SentenceSplitter
+from network.http_transport import http_transport
+from observability import tracer
+from .startup import ComponentStartup
+from .context_manager import ConversationContextManager
+from .action_executor import ActionExecutor
 from system.automation_engine import AutomationEngine
 from web.search_engine import SearchEngine
 from blockchain.did_manager import DIDManager
 from database.user_repository import UserRepository
+from database.models import db
+from database.conversation_log import ConversationLog
 from config.config_manager import ConfigManager
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class CommandResult:
     """Result of a processed command"""
@@ -25,6 +42,7 @@ class CommandResult:
     actions_executed: list = None
     needs_confirmation: bool = False
     confidence: float = 1.0
+    timings: Optional[Dict[str, float]] = None  # seconds per pipeline stage
 
 class AIAssistantCore:
     """
@@ -33,18 +51,122 @@ class AIAssistantCore:
     
     def __init__(self):
         self.config = ConfigManager()
-        self.model_manager = ModelManager()
-        self.speech_to_text = SpeechToText()
-        self.text_to_speech = TextToSpeech()
-        self.wake_word_detector = WakeWordDetector()
+        cache_config = self.config.ai.response_cache
+        resilience_config = self.config.ai.resilience
+        hedging_config = self.config.ai.hedging
+        context_config = self.config.ai.context
+        provider_stats = ProviderStats()
+        self.context_manager = ConversationContextManager(
+            budgets=context_config.budgets,
+            default_budget=context_config.default_budget,
+            recent_turns=context_config.recent_turns,
+            summarize_after=context_config.summarize_after,
+            relevance_threshold=context_config.relevance_threshold,
+            summary_share=context_config.summary_share,
+            summarizer=self._summarize_conversation
+        )
+        self.model_manager = ModelManager(
+            response_cache=ResponseCache(
+                max_entries=cache_config.max_entries,
+                ttl_seconds=cache_config.ttl_seconds,
+                semantic=cache_config.semantic,
+                similarity_threshold=cache_config.similarity_threshold
+            ),
+            resilience=ProviderResilience(
+                rate_limits=resilience_config.rate_limits,
+                retry_policy=RetryPolicy(
+                    max_attempts=resilience_config.max_attempts,
+                    base_delay=resilience_config.base_delay,
+                    max_delay=resilience_config.max_delay
+                ),
+                failure_threshold=resilience_config.failure_threshold,
+                recovery_timeout=resilience_config.recovery_timeout
+            ),
+            provider_stats=provider_stats,
+            hedger=RequestHedger(
+                provider_stats,
+                enabled=hedging_config.enabled,
+                percentile=hedging_config.percentile,
+                min_samples=hedging_config.min_samples,
+                default_delay=hedging_config.default_delay,
+                budget_ratio=hedging_config.budget_ratio,
+                budget_burst=hedging_config.budget_burst
+            ),
+            router=ModelRouter(
+                provider_stats,
+                cost_per_1k_tokens=self.config.ai.routing.cost_per_1k_tokens,
+                min_samples=self.config.ai.routing.min_samples
+            ),
+            local_model_options={
+                'model_path': self.config.ai.models.local.model_path,
+                'n_threads': self.config.ai.models.local.n_threads or None,
+                'n_ctx': self.config.ai.models.local.n_ctx,
+                'max_tokens': self.config.ai.models.local.max_tokens,
+                'max_batch_tokens': self.config.ai.models.local.max_batch_tokens,
+                'max_sequences': self.config.ai.models.local.max_sequences,
+                'kv_cache_tokens': self.config.ai.models.local.kv_cache_tokens or None,
+                'cached_sessions': self.config.ai.models.local.cached_sessions
+            },
+            context_packer=self.context_manager.pack
+        )
+        self.speech_to_text = SpeechToText(
+            engine_order=self.config.voice.stt_engines,
+            models_dir=self.config.storage.models_dir,
+            silence_threshold=self.config.voice.silence_threshold,
+            chunk_size=self.config.voice.chunk_size
+        )
+        self.text_to_speech = TextToSpeech(
+            cache_dir=str(Path(self.config.storage.temp_dir) / "tts_cache")
+        )
+        self.wake_word_detector = WakeWordDetector(
+            silence_threshold=self.config.voice.silence_threshold,
+            sensitivity=self.config.voice.wake_word_sensitivity,
+            sample_rate=self.config.voice.sample_rate,
+            data_dir=self.config.storage.data_dir
+        )
         self.automation_engine = AutomationEngine()
+        self.action_executor = ActionExecutor(
+            self.automation_engine,
+            max_concurrent_per_user=self.config.automation.max_concurrent_per_user,
+            default_timeout=self.config.automation.default_timeout,
+            timeouts=self.config.automation.timeouts
+        )
         self.search_engine = SearchEngine()
         self.did_manager = DIDManager()
         self.user_repository = UserRepository()
+        log_config = self.config.database.conversation_log
+        self.conversation_log = ConversationLog(
+            db,
+            buffer_size=log_config.buffer_size,
+            batch_size=log_config.batch_size,
+            flush_interval=log_config.flush_interval
+        )
+        
+        network = self.config.network
+        http_transport.configure(
+            limit=network.pool_size,
+            limit_per_host=network.pool_size_per_host,
+            keepalive_timeout=network.keepalive_timeout,
+            dns_cache_ttl=network.dns_cache_ttl,
+            timeouts=network.timeouts
+        )
+        
+        # Rarely used or slow-to-load components start on first use
+        self.startup = ComponentStartup()
+        self.startup.register('http_transport', http_transport)
+        self.startup.register('model_manager', self.model_manager, depends_on=['http_transport'])
+        self.startup.register('speech_to_text', self.speech_to_text)
+        self.startup.register('automation_engine', self.automation_engine)
+        self.startup.register('search_engine', self.search_engine, depends_on=['http_transport'])
+        self.startup.register('text_to_speech', self.text_to_speech, lazy=True)
+        self.startup.register('wake_word_detector', self.wake_word_detector, lazy=True)
+        self.startup.register('did_manager', self.did_manager, lazy=True)
+        self.startup.register('conversation_log', self.conversation_log)
         
         self.is_initialized = False
         self.active_sessions: Dict[str, Any] = {}
-        self.command_history = []
+        # Recent commands in memory; the conversation log persists them
+        self.command_history = deque(maxlen=1000)
         
     async def initialize(self):
         """Initialize all core components"""
@@ -53,14 +175,8 @@ class AIAssistantCore:
             
         logger.info("Initializing AI Assistant Core...")
         
-        # Initialize components in order
-        await self.model_manager.initialize()
-        await self.speech_to_text.initialize()
-        await self.text_to_speech.initialize()
-        await self.wake_word_detector.initialize()
-        await self.automation_engine.initialize()
-        await self.search_engine.initialize()
-        await self.did_manager.initialize()
+        # Independent components initialize concurrently
+        await self.startup.start_all()
         
         self.is_initialized = True
         logger.info("AI Assistant Core initialized successfully")
@@ -69,11 +185,8 @@ class AIAssistantCore:
         """Shutdown all components gracefully"""
         logger.info("Shutting down AI Assistant Core...")
         
-        await self.model_manager.shutdown()
-        await self.speech_to_text.shutdown()
-        await self.text_to_speech.shutdown()
-        await self.wake_word_detector.shutdown()
-        await self.automation_engine.shutdown()
+        await self.context_manager.shutdown()
+        await self.startup.shutdown_all()
         
         self.is_initialized = False
         logger.info("AI Assistant Core shutdown complete")
@@ -83,48 +196,45 @@ class AIAssistantCore:
         Process voice command from audio input
         """
         try:
-            # Step 1: Convert speech to text
-            transcript = await self.speech_to_text.transcribe(audio_data, user_id)
-            
-            if not transcript or not transcript.strip():
-                return CommandResult(
-                    text="I didn't catch that. Could you please repeat?",
-                    confidence=0.0
+            with tracer.request('voice_command', user_id=user_id) as timings:
+                # Step 1: Convert speech to text
+                with tracer.span('stt'):
+                    transcript = await self.speech_to_text.transcribe(audio_data, user_id)
+                
+                if not transcript or not transcript.strip():
+                    return CommandResult(
+                        text="I didn't catch that. Could you please repeat?",
+                        confidence=0.0,
+                        timings=timings
+                    )
+                
+                # Step 2: Process command with AI
+                with tracer.span('context'):
+                    context = await self._get_user_context(user_id, session_id)
+                with tracer.span('llm'):
+                    ai_response = await self.model_manager.process_command(transcript, context)
+                
+                # Step 3: Execute actions (independent ones concurrently) while
+                # the response is synthesized; the reply waits for the slower one
+                language = (context.get('preferences') or {}).get('language', 'en')
+                executed_actions, audio_response = await asyncio.gather(
+                    self.action_executor.execute(ai_response.actions, user_id),
+                    self._synthesize_response(ai_response.text, language)
                 )
-            
-            # Step 2: Process command with AI
-            context = await self._get_user_context(user_id, session_id)
-            ai_response = await self.model_manager.process_command(transcript, context)
-            
-            # Step 3: Execute any required actions
-            executed_actions = []
-            if ai_response.actions:
-                for action in ai_response.actions:
-                    result = await self.automation_engine.execute_action(action, user_id)
-                    executed_actions.append({
-                        'action': action,
-                        'result': result
-                    })
-            
-            # Step 4: Generate audio response
-            audio_response = None
-            if ai_response.text:
-                audio_response = await self.text_to_speech.synthesize(
-                    ai_response.text, 
-                    user_id
+                
+                # Step 4: Update command history (persisted in the background)
+                with tracer.span('history'):
+                    await self._update_command_history(user_id, session_id, transcript, ai_response.text)
+                
+                return CommandResult(
+                    text=ai_response.text,
+                    audio_response=audio_response,
+                    actions_executed=executed_actions,
+                    needs_confirmation=ai_response.needs_confirmation,
+                    confidence=ai_response.confidence,
+                    timings=timings
                 )
             
-            # Step 5: Update command history
-            await self._update_command_history(user_id, transcript, ai_response.text)
-            
-            return CommandResult(
-                text=ai_response.text,
-                audio_response=audio_response,
-                actions_executed=executed_actions,
-                needs_confirmation=ai_response.needs_confirmation,
-                confidence=ai_response.confidence
-            )
-            
         except Exception as e:
             logger.error(f"Error processing voice command: {e}")
             return CommandResult(
@@ -132,31 +242,175 @@ class AIAssistantCore:
                 confidence=0.0
             )
     
-    async def process_text_command(self, text: str, user_id: str, session_id: str) -> CommandResult:
+    async def stream_voice_command(self, audio_data: bytes, user_id: str, session_id: str) -> AsyncIterator[Dict[str, Any]]:
         """
-        Process text command directly
+        Process voice command with sentence-pipelined speech output
+        
+        The model's streamed text is split into sentences, and each sentence
+        is synthesized while later text is still being generated. Yields
+        ``transcript``, ``token`` and ``audio`` events, then a final
+        ``complete`` event carrying the CommandResult.
         """
         try:
-            context = await self._get_user_context(user_id, session_id)
-            ai_response = await self.model_manager.process_command(text, context)
+            with tracer.span('stt'):
+                transcript = await self.speech_to_text.transcribe(audio_data, user_id)
             
-            # Execute actions
-            executed_actions = []
-            if ai_response.actions:
-                for action in ai_response.actions:
-                    result = await self.automation_engine.execute_action(action, user_id)
-                    executed_actions.append({
-                        'action': action,
-                        'result': result
-                    })
+            if not transcript or not transcript.strip():
+                yield {
+                    'type': 'complete',
+                    'result': CommandResult(
+                        text="I didn't catch that. Could you please repeat?",
+                        confidence=0.0
+                    )
+                }
+                return
             
-            return CommandResult(
-                text=ai_response.text,
-                actions_executed=executed_actions,
-                needs_confirmation=ai_response.needs_confirmation,
-                confidence=ai_response.confidence
+            yield {'type': 'transcript', 'text': transcript}
+            
+            with tracer.span('context'):
+                context = await self._get_user_context(user_id, session_id)
+            language = (context.get('preferences') or {}).get('language', 'en')
+            
+            events: asyncio.Queue = asyncio.Queue()
+            sentences: asyncio.Queue = asyncio.Queue()
+            generation = asyncio.create_task(
+                self._generate_sentences(transcript, context, sentences, events)
+            )
+            synthesis = asyncio.create_task(
+                self._synthesize_sentences(language, sentences, events)
             )
             
+            # Every stage posts None to the event queue when it finishes;
+            # actions start once the response is complete, alongside the
+            # synthesis of its last sentences
+            ai_response = None
+            executed_actions = []
+            stages = [generation, synthesis]
+            try:
+                finished = 0
+                while finished < len(stages):
+                    event = await events.get()
+                    if event is None:
+                        finished += 1
+                    elif event['type'] == 'done':
+                        ai_response = event['response']
+                        executed_actions = [None] * len(ai_response.actions)
+                        stages.append(asyncio.create_task(
+                            self._execute_actions(ai_response.actions, user_id, executed_actions, events)
+                        ))
+                    else:
+                        yield event
+                
+                # Surface errors raised inside any stage
+                for stage in stages:
+                    await stage
+            finally:
+                for stage in stages:
+                    stage.cancel()
+            
+            await self._update_command_history(user_id, session_id, transcript, ai_response.text)
+            
+            yield {
+                'type': 'complete',
+                'result': CommandResult(
+                    text=ai_response.text,
+                    actions_executed=executed_actions,
+                    needs_confirmation=ai_response.needs_confirmation,
+                    confidence=ai_response.confidence
+                )
+            }
+            
+        except Exception as e:
+            logger.error(f"Error streaming voice command: {e}")
+            yield {
+                'type': 'complete',
+                'result': CommandResult(
+                    text="I encountered an error while processing your request. Please try again.",
+                    confidence=0.0
+                )
+            }
+    
+    async def _execute_actions(self, actions: list, user_id: str, executed: list, events: asyncio.Queue):
+        """Run actions, posting each result as it finishes"""
+        try:
+            async for event in self.action_executor.stream(actions, user_id):
+                executed[event['index']] = {'action': event['action'], 'result': event['result']}
+                await events.put({'type': 'action', **event})
+        finally:
+            await events.put(None)
+    
+    async def _synthesize_response(self, text: str, language: str) -> Optional[bytes]:
+        """Synthesize a whole response, starting TTS on first use"""
+        if not text:
+            return None
+        with tracer.span('tts'):
+            await self.startup.ensure('text_to_speech')
+            return await self.text_to_speech.synthesize(text, language)
+    
+    async def _generate_sentences(self, text: str, context: Dict[str, Any],
+                                  sentences: asyncio.Queue, events: asyncio.Queue):
+        """Stream the model response, forwarding tokens and complete sentences"""
+        splitter = SentenceSplitter()
+        try:
+            async for event in self.model_manager.stream_command(text, context):
+                await events.put(event)
+                if event['type'] == 'token':
+                    for sentence in splitter.feed(event['text']):
+                        await sentences.put(sentence)
+            
+            remainder = splitter.flush()
+            if remainder:
+                await sentences.put(remainder)
+        finally:
+            await sentences.put(None)
+            await events.put(None)
+    
+    async def _synthesize_sentences(self, language: str, sentences: asyncio.Queue, events: asyncio.Queue):
+        """Synthesize sentences in order as they become available"""
+        index = 0
+        try:
+            await self.startup.ensure('text_to_speech')
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    break
+                
+                audio = await self.text_to_speech.synthesize(sentence, language)
+                await events.put({
+                    'type': 'audio',
+                    'index': index,
+                    'text': sentence,
+                    'audio': audio
+                })
+                index += 1
+        finally:
+            await events.put(None)
+    
+    async def process_text_command(self, text: str, user_id: str, session_id: str) -> CommandResult:
+        """
+        Process text command directly
+        """
+        try:
+            with tracer.request('text_command', user_id=user_id) as timings:
+                with tracer.span('context'):
+                    context = await self._get_user_context(user_id, session_id)
+                with tracer.span('llm'):
+                    ai_response = await self.model_manager.process_command(text, context)
+                
+                # Execute actions
+                executed_actions = await self.action_executor.execute(ai_response.actions, user_id)
+                
+                with tracer.span('history'):
+                    await self._update_command_history(user_id, session_id, text, ai_response.text)
+                
+                return CommandResult(
+                    text=ai_response.text,
+                    actions_executed=executed_actions,
+                    needs_confirmation=ai_response.needs_confirmation,
+                    confidence=ai_response.confidence,
+                    timings=timings
+                )
+            
         except Exception as e:
             logger.error(f"Error processing text command: {e}")
             return CommandResult(
@@ -164,6 +418,53 @@ class AIAssistantCore:
                 confidence=0.0
             )
     
+    async def stream_text_command(self, text: str, user_id: str, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process text command, streaming response tokens as they arrive
+        
+        Yields ``{'type': 'token', 'text': ...}`` events while the model is
+        generating, then one ``{'type': 'complete', 'result': CommandResult}``
+        once actions have been executed.
+        """
+        try:
+            with tracer.span('context'):
+                context = await self._get_user_context(user_id, session_id)
+            
+            ai_response = None
+            async for event in self.model_manager.stream_command(text, context):
+                if event['type'] == 'token':
+                    yield event
+                elif event['type'] == 'done':
+                    ai_response = event['response']
+            
+            # Execute actions
+            executed_actions = [None] * len(ai_response.actions)
+            async for event in self.action_executor.stream(ai_response.actions, user_id):
+                executed_actions[event['index']] = {'action': event['action'], 'result': event['result']}
+                yield {'type': 'action', **event}
+            
+            await self._update_command_history(user_id, session_id, text, ai_response.text)
+            
+            yield {
+                'type': 'complete',
+                'result': CommandResult(
+                    text=ai_response.text,
+                    actions_executed=executed_actions,
+                    needs_confirmation=ai_response.needs_confirmation,
+                    confidence=ai_response.confidence
+                )
+            }
+            
+        except Exception as e:
+            logger.error(f"Error streaming text command: {e}")
+            yield {
+                'type': 'complete',
+                'result': CommandResult(
+                    text="I encountered an error while processing your request.",
+                    confidence=0.0
+                )
+            }
+    
     async def start_voice_session(self, user_id: str, session_config: Dict[str, Any]) -> str:
         """
         Start a new voice interaction session
@@ -174,15 +475,17 @@ class AIAssistantCore:
             'user_id': user_id,
             'config': session_config,
             'start_time': asyncio.get_event_loop().time(),
-            'wake_word_detected': False,
-            'conversation_history': []
+            'wake_word_detected': False
         }
         
         # Start wake word detection if configured
         if session_config.get('wake_word_enabled', True):
+            await self.startup.ensure('wake_word_detector')
             await self.wake_word_detector.start_listening(
                 session_id,
-                self._on_wake_word_detected
+                self._on_wake_word_detected,
+                sensitivity=session_config.get('wake_word_sensitivity'),
+                user_id=user_id
             )
         
         return session_id
@@ -190,15 +493,22 @@ class AIAssistantCore:
     async def stop_voice_session(self, session_id: str):
         """Stop a voice interaction session"""
         if session_id in self.active_sessions:
-            await self.wake_word_detector.stop_listening(session_id)
-            del self.active_sessions[session_id]
+            if self.startup.is_started('wake_word_detector'):
+                await self.wake_word_detector.stop_listening(session_id)
+            session = self.active_sessions.pop(session_id)
+            self.context_manager.forget(session['user_id'], session_id)
     
-    async def train_wake_word(self, user_id: str, wake_word: str, audio_samples: list) -> bool:
-        """Train custom wake word for user"""
+    async def train_wake_word(self, user_id: str, wake_word: str, audio_samples: list) -> str:
+        """Start training a custom wake word for user; returns the job id"""
+        await self.startup.ensure('wake_word_detector')
         return await self.wake_word_detector.train_custom_wake_word(
             user_id, wake_word, audio_samples
         )
     
+    def get_wake_word_training_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get status of a wake word training job"""
+        return self.wake_word_detector.get_training_job(job_id)
+    
     async def search_web(self, query: str, user_id: str) -> Dict[str, Any]:
         """Perform web search"""
         return await self.search_engine.search(query, user_id)
@@ -214,13 +524,23 @@ class AIAssistantCore:
         
         return {
             'user_id': user_id,
+            'session_id': session_id,
             'preferences': user_prefs,
-            'conversation_history': session_data.get('conversation_history', []),
+            'conversation_history': self.context_manager.history(user_id, session_id),
             'current_session': session_data
         }
     
-    async def _update_command_history(self, user_id: str, command: str, response: str):
+    async def _summarize_conversation(self, user_id: str, prompt: str) -> Optional[str]:
+        """Fold older turns into a summary under the user's own routing policy"""
+        user_prefs = await self.user_repository.get_user_preferences(user_id)
+        return await self.model_manager.summarize(prompt, {'user_id': user_id, 'preferences': user_prefs})
+    
+    async def _update_command_history(self, user_id: str, session_id: str, command: str, response: str):
         """Update user's command history"""
+        # The model's view of the session must be current for the next command
+        self.context_manager.record_turn(user_id, session_id, command, response)
+        
+        # Bounded: the oldest entry falls off once 1000 are kept
         self.command_history.append({
             'user_id': user_id,
             'timestamp': asyncio.get_event_loop().time(),
@@ -228,9 +548,8 @@ class AIAssistantCore:
             'response': response
         })
         
-        # Keep only last 1000 commands in memory
-        if len(self.command_history) > 1000:
-            self.command_history = self.command_history[-1000:]
+        # Persisted in batches by the conversation log's background flusher
+        self.conversation_log.append(user_id, command, response)
     
     async def _on_wake_word_detected(self, session_id: str, wake_word: str):
         """Callback when wake word is detected"""
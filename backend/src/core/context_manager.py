@@ -0,0 +1,240 @@
+"""
+Conversation context manager - token-budgeted history with rolling summaries
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Awaitable, FrozenSet, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORDS = re.compile(r"\w{4,}")
+
+# Sessions belong to a user; a session id alone is client-supplied
+SessionKey = Tuple[str, str]
+
+class TokenCounter:
+    """Counts tokens with tiktoken when installed, else ~4 characters per token"""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self._encoding = None
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+        except Exception:
+            logger.info("tiktoken not available - estimating token counts")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return max(1, (len(text) + 3) // 4)
+
+@dataclass
+class Turn:
+    """One message; token count and keywords are computed once when recorded"""
+    type: str
+    content: str
+    tokens: int
+    keywords: FrozenSet[str]
+    timestamp: float = field(default_factory=time.time)
+
+    def as_message(self) -> Dict[str, Any]:
+        return {'type': self.type, 'content': self.content, 'timestamp': self.timestamp}
+
+@dataclass
+class _Session:
+    turns: List[Turn] = field(default_factory=list)
+    summary: str = ""
+    summary_tokens: int = 0
+    summarizing: Optional[asyncio.Task] = None
+    last_active: float = field(default_factory=time.time)
+
+class ConversationContextManager:
+    """
+    Tracks per-session history and packs it into each model's token budget.
+
+    Sessions are keyed by ``(user_id, session_id)`` so one user can never
+    read another's history by reusing a session id; turns without a session
+    id are not recorded.
+
+    A packed history is the rolling summary of folded turns, the most recent
+    turns (whose window start only moves in steps, keeping prompt prefixes
+    cacheable), and older turns that share enough keywords with the command,
+    all within the model's budget. The summary takes at most ``summary_share``
+    of the budget; a longer one is cut to its most recent part. Once more than ``summarize_after`` turns
+    precede the recent window, the oldest are folded into the summary by a
+    background task so the request path never waits on summarization.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default_budget: int = 3000,
+                 recent_turns: int = 6, summarize_after: int = 20, relevance_threshold: float = 0.3,
+                 summary_share: float = 0.25, max_sessions: int = 1000,
+                 summarizer: Optional[Callable[[str, str], Awaitable[Optional[str]]]] = None,
+                 token_counter: Optional[TokenCounter] = None):
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.recent_turns = recent_turns
+        self.summarize_after = summarize_after
+        self.relevance_threshold = relevance_threshold
+        self.summary_share = summary_share
+        self.max_sessions = max_sessions
+        self.summarizer = summarizer
+        self.tokens = token_counter or TokenCounter()
+        self.sessions: Dict[SessionKey, _Session] = {}
+
+    def record_turn(self, user_id: str, session_id: str, command: str, response: str):
+        """Append a command/response pair and schedule summarization if due"""
+        if not session_id:
+            return
+        key = (user_id, session_id)
+        session = self._session(key)
+        session.turns.append(self._turn('user', command))
+        if response:
+            session.turns.append(self._turn('assistant', response))
+        session.last_active = time.time()
+
+        if self._recent_start(session.turns) > self.summarize_after and not session.summarizing:
+            session.summarizing = asyncio.create_task(self._summarize(key))
+
+    def history(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        """Unsummarized turns of a session, oldest first"""
+        session = self.sessions.get((user_id, session_id))
+        return [turn.as_message() for turn in session.turns] if session else []
+
+    def summary(self, user_id: str, session_id: str) -> str:
+        session = self.sessions.get((user_id, session_id))
+        return session.summary if session else ""
+
+    def pack(self, command: str, context: Dict[str, Any], model: str) -> Dict[str, Any]:
+        """Return a copy of ``context`` whose history fits ``model``'s budget"""
+        session = self.sessions.get((context.get('user_id'), context.get('session_id')))
+        if session is None:
+            return context
+
+        budget = self.budgets.get(model, self.default_budget)
+        summary, summary_tokens = session.summary, session.summary_tokens
+        summary_limit = int(budget * self.summary_share)
+        if summary_tokens > summary_limit:
+            summary = self._truncate(summary, summary_limit)
+            summary_tokens = self.tokens.count(summary)
+        remaining = budget - self.tokens.count(command) - summary_tokens
+
+        start = self._recent_start(session.turns)
+        recent = session.turns[start:]
+        # Drop the oldest recent turns only if they alone overflow the budget
+        while recent and sum(turn.tokens for turn in recent) > remaining:
+            recent = recent[1:]
+        remaining -= sum(turn.tokens for turn in recent)
+
+        recalled = []
+        command_words = self._keywords(command)
+        if command_words and remaining > 0:
+            scored = []
+            for index, turn in enumerate(session.turns[:start]):
+                overlap = len(command_words & turn.keywords) / len(command_words)
+                if overlap >= self.relevance_threshold:
+                    scored.append((overlap, index, turn))
+            for _, index, turn in sorted(scored, key=lambda item: (item[0], item[1]), reverse=True):
+                if turn.tokens <= remaining:
+                    recalled.append((index, turn))
+                    remaining -= turn.tokens
+            recalled.sort(key=lambda item: item[0])
+
+        packed = dict(context)
+        packed['conversation_history'] = [turn.as_message() for _, turn in recalled] + [
+            turn.as_message() for turn in recent
+        ]
+        packed['conversation_summary'] = summary
+        packed['history_packed'] = True
+        return packed
+
+    def forget(self, user_id: str, session_id: str):
+        self._forget((user_id, session_id))
+
+    async def shutdown(self):
+        for session in self.sessions.values():
+            if session.summarizing:
+                session.summarizing.cancel()
+
+    def _session(self, key: SessionKey) -> _Session:
+        session = self.sessions.get(key)
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                self._forget(min(self.sessions, key=lambda idle: self.sessions[idle].last_active))
+            session = self.sessions[key] = _Session()
+        return session
+
+    def _forget(self, key: SessionKey):
+        session = self.sessions.pop(key, None)
+        if session and session.summarizing:
+            session.summarizing.cancel()
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """The longest ending of ``text`` within ``max_tokens``, cut at line then word boundaries"""
+        lines = text.split("\n")
+        while len(lines) > 1 and self.tokens.count("\n".join(lines)) > max_tokens:
+            lines.pop(0)
+        if len(lines) > 1:
+            return "\n".join(lines)
+        words = lines[0].split(" ")
+        while words and self.tokens.count(" ".join(words)) > max_tokens:
+            words.pop(0)
+        return " ".join(words)
+
+    def _turn(self, turn_type: str, content: str) -> Turn:
+        return Turn(turn_type, content, self.tokens.count(content), self._keywords(content))
+
+    @staticmethod
+    def _keywords(text: str) -> FrozenSet[str]:
+        return frozenset(_WORDS.findall(text.lower()))
+
+    def _recent_start(self, turns: List[Turn]) -> int:
+        """Start of the recent window; moves in steps of ``recent_turns``"""
+        window = self.recent_turns
+        if len(turns) <= window:
+            return 0
+        return (len(turns) - window) // window * window
+
+    async def _summarize(self, key: SessionKey):
+        user_id, session_id = key
+        session = self.sessions.get(key)
+        try:
+            fold = self._recent_start(session.turns)
+            folded = session.turns[:fold]
+            transcript = "\n".join(f"{turn.type}: {turn.content}" for turn in folded)
+
+            summary = None
+            if self.summarizer:
+                try:
+                    summary = await self.summarizer(user_id, self._summary_prompt(session.summary, transcript))
+                except Exception as e:
+                    logger.warning(f"Conversation summarization failed: {e}")
+            if not summary:
+                summary = self._extractive_summary(session.summary, folded)
+
+            # Turns appended meanwhile are after ``fold`` and stay untouched
+            del session.turns[:fold]
+            session.summary = summary
+            session.summary_tokens = self.tokens.count(summary)
+            logger.debug(f"Folded {fold} turns of session {session_id} into a {session.summary_tokens}-token summary")
+        finally:
+            session.summarizing = None
+
+    @staticmethod
+    def _summary_prompt(previous: str, transcript: str) -> str:
+        return (
+            "Update the running summary of this conversation. Keep facts, names, decisions "
+            "and open tasks; drop pleasantries. Reply with the summary only, under 150 words.\n\n"
+            f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"
+        )
+
+    @staticmethod
+    def _extractive_summary(previous: str, turns: List[Turn]) -> str:
+        """Fallback: first sentence of each user message"""
+        points = [turn.content.split('. ')[0][:200] for turn in turns if turn.type == 'user']
+        lines = ([previous] if previous else []) + [f"- {point}" for point in points]
+        return "\n".join(lines[-30:])
@@ -0,0 +1,123 @@
+"""
+Component startup - concurrent, dependency-aware initialization
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Iterable
+
+logger = logging.getLogger(__name__)
+
+class ComponentStartup:
+    """
+    Starts registered components concurrently.
+
+    Each component waits only for the components it declares as
+    dependencies, so independent components initialize in parallel and cold
+    start costs roughly the slowest critical chain instead of the sum of all
+    initializers. Components registered as ``lazy`` are skipped by
+    ``start_all`` and initialized on first ``ensure``.
+
+    A component that fails to initialize does not stop the others: it is
+    recorded in ``failed`` and everything depending on it stays disabled.
+    A later ``ensure`` retries it.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started_order: List[str] = []
+        self.timings: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+
+    def register(self, name: str, component: Any, depends_on: Iterable[str] = (), lazy: bool = False):
+        """Declare a component and what must be running before it starts"""
+        self._components[name] = {
+            'component': component,
+            'depends_on': tuple(depends_on),
+            'lazy': lazy
+        }
+
+    async def start_all(self):
+        """Start every non-lazy component and log a timing report"""
+        wall_start = time.perf_counter()
+
+        eager = [name for name, spec in self._components.items() if not spec['lazy']]
+        # Failures are already logged and recorded by _initialize
+        await asyncio.gather(*(self._start(name) for name in eager), return_exceptions=True)
+
+        self._log_report(time.perf_counter() - wall_start)
+
+    async def ensure(self, name: str) -> Any:
+        """Start a component (and its dependencies) if needed and return it"""
+        await self._start(name)
+        return self._components[name]['component']
+
+    def is_started(self, name: str) -> bool:
+        task = self._tasks.get(name)
+        return bool(task and task.done() and not task.cancelled() and not task.exception())
+
+    async def shutdown_all(self):
+        """Shut down started components in reverse start order"""
+        for name in reversed(self._started_order):
+            component = self._components[name]['component']
+            stop = getattr(component, 'shutdown', None) or getattr(component, 'cleanup', None)
+            if not stop:
+                continue
+            try:
+                await stop()
+            except Exception as e:
+                logger.error(f"Error shutting down {name}: {e}")
+
+        self._tasks.clear()
+        self._started_order.clear()
+
+    def _start(self, name: str) -> asyncio.Task:
+        task = self._tasks.get(name)
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = asyncio.create_task(self._initialize(name))
+            self._tasks[name] = task
+        return task
+
+    async def _initialize(self, name: str):
+        spec = self._components[name]
+        if spec['depends_on']:
+            results = await asyncio.gather(
+                *(self._start(dep) for dep in spec['depends_on']), return_exceptions=True
+            )
+            failed = [dep for dep, result in zip(spec['depends_on'], results) if isinstance(result, BaseException)]
+            if failed:
+                self.failed[name] = f"dependency failed: {', '.join(failed)}"
+                logger.error(f"Not starting {name}: {self.failed[name]}")
+                raise RuntimeError(f"{name} is disabled; {self.failed[name]}")
+
+        started = time.perf_counter()
+        try:
+            await spec['component'].initialize()
+        except Exception as e:
+            self.failed[name] = str(e) or type(e).__name__
+            logger.error(f"Failed to initialize {name}: {e}")
+            raise
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+        self.failed.pop(name, None)
+        self._started_order.append(name)
+        if spec['lazy']:
+            logger.info(f"Lazily initialized {name} in {self.timings[name] * 1000:.0f} ms")
+
+    def _log_report(self, wall_time: float):
+        lines = [
+            f"  {name:<20} {duration * 1000:8.0f} ms"
+            for name, duration in sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+        ]
+        deferred = [name for name, spec in self._components.items() if spec['lazy'] and name not in self.timings]
+        summary = (
+            f"Startup finished in {wall_time * 1000:.0f} ms "
+            f"(sum of component inits {sum(self.timings.values()) * 1000:.0f} ms)"
+        )
+        if deferred:
+            summary += f"; deferred until first use: {', '.join(deferred)}"
+        if self.failed:
+            summary += f"; failed: {', '.join(f'{name} ({reason})' for name, reason in self.failed.items())}"
+        logger.info("\n".join([summary] + lines))
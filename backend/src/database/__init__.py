@@ -1,3 +1,5 @@
-from .models import init_db, User, Conversation, AIConfig
+from .models import init_db, close_db, User, Conversation, AIConfig
+from .connection_pool import SQLitePool
+from .conversation_log import ConversationLog
 
-__all__ = ["init_db", "User", "Conversation", "AIConfig"]
+__all__ = ["init_db", "close_db", "SQLitePool", "ConversationLog", "User", "Conversation", "AIConfig"]
@@ -0,0 +1,143 @@
+"""
+SQLite connection pool - a single writer and a pool of readers over aiosqlite
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Applied to every connection. In WAL mode readers never block the writer
+# and vice versa; synchronous=NORMAL fsyncs at checkpoints instead of every
+# commit, which survives application crashes (an OS crash or power loss can
+# drop the most recent transactions).
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",  # KiB, per connection
+    "PRAGMA mmap_size=268435456"
+)
+
+def sqlite_path(url: str) -> str:
+    """Database file of a ``sqlite://`` or ``sqlite+aiosqlite://`` URL"""
+    _, _, path = url.partition(':///')
+    return path or url
+
+class SQLitePool:
+    """
+    Async access to one SQLite database.
+
+    Each aiosqlite connection runs its statements on a thread of its own,
+    so queries never block the event loop. All writes go through a single
+    connection, serialized by a lock, which matches SQLite's one-writer
+    model without busy retries. Reads use a pool of ``query_only``
+    connections and run concurrently with the writer. Statements are
+    prepared once per connection and reused from its statement cache, so
+    callers should pass constant SQL with parameters.
+    """
+
+    def __init__(self, db_path: str, read_connections: int = 4, busy_timeout: float = 5.0,
+                 cached_statements: int = 256):
+        self.db_path = db_path
+        self.read_connections = read_connections
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: Optional[asyncio.Queue] = None
+        self._all_readers: List[aiosqlite.Connection] = []
+
+    async def initialize(self):
+        if self.db_path != ':memory:':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._writer = await self._connect()
+        # Persistent in the database file; readers opened afterwards use it too
+        await self._writer.execute_fetchall("PRAGMA journal_mode=WAL")
+
+        self._readers = asyncio.Queue()
+        for _ in range(self.read_connections):
+            reader = await self._connect(query_only=True)
+            self._all_readers.append(reader)
+            self._readers.put_nowait(reader)
+        logger.info(f"SQLite pool open on {self.db_path} (1 writer, {self.read_connections} readers, WAL)")
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection"""
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """The writer connection inside one transaction, committed on success"""
+        async with self._write_lock:
+            # IMMEDIATE takes the write lock up front instead of on first write
+            await self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.execute("ROLLBACK")
+                raise
+            await self._writer.execute("COMMIT")
+
+    async def fetch_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        async with self.read() as conn:
+            async with conn.execute(sql, params) as cursor:
+                row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    async def fetch_all(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        async with self.read() as conn:
+            rows = await conn.execute_fetchall(sql, params)
+        return [dict(row) for row in rows]
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run one write statement in its own transaction; returns the row count"""
+        async with self.transaction() as conn:
+            async with conn.execute(sql, params) as cursor:
+                return cursor.rowcount
+
+    async def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        """Run a statement for every row in a single transaction"""
+        async with self.transaction() as conn:
+            async with conn.executemany(sql, rows) as cursor:
+                return cursor.rowcount
+
+    async def close(self):
+        for reader in self._all_readers:
+            await reader.close()
+        self._all_readers.clear()
+        if self._writer is not None:
+            # Fold the WAL back into the database file
+            try:
+                await self._writer.execute_fetchall("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                logger.warning(f"WAL checkpoint on close failed: {e}")
+            await self._writer.close()
+            self._writer = None
+
+    async def _connect(self, query_only: bool = False) -> aiosqlite.Connection:
+        # isolation_level=None: transactions are explicit, see transaction()
+        conn = await aiosqlite.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = aiosqlite.Row
+        try:
+            # Fetching runs each pragma to completion so it holds no lock
+            for pragma in CONNECTION_PRAGMAS + (("PRAGMA query_only=ON",) if query_only else ()):
+                await conn.execute_fetchall(pragma)
+        except Exception:
+            await conn.close()
+            raise
+        return conn
@@ -0,0 +1,125 @@
+"""
+Conversation log - write-behind persistence of conversation messages in batches
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, Deque
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[str, str, str, str, str, str]
+
+class ConversationLog:
+    """
+    Buffers conversation messages and stores them with group commits.
+
+    ``append`` only adds a row to an in-memory ring buffer. A background
+    task writes the buffer in one ``executemany`` transaction whenever
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have
+    passed, so a chatty session costs one commit (and at most one fsync)
+    per batch instead of per message. Rows from a failed flush go back to
+    the front of the buffer for the next attempt. If the database falls so
+    far behind that the buffer fills, the oldest rows are dropped and
+    counted. ``shutdown`` writes whatever is left.
+    """
+
+    def __init__(self, database, buffer_size: int = 4096, batch_size: int = 256,
+                 flush_interval: float = 1.0):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Row] = deque(maxlen=buffer_size)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._failing = False
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    async def initialize(self):
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.create_task(self._run())
+
+    async def shutdown(self):
+        """Stop the background flusher and write the remaining rows"""
+        if self._flusher:
+            # Under the lock the flusher can't be cancelled with a batch in flight
+            async with self._flush_lock:
+                self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"Conversation log closed with {len(self._buffer)} unsaved messages")
+
+    def append(self, user_id: str, message: str, response: str = '', message_type: str = 'text',
+               timestamp: Optional[float] = None):
+        """Queue a message for storage; never waits on the database"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Conversation log buffer full; {self.dropped} messages dropped so far")
+        self._buffer.append((
+            uuid.uuid4().hex,
+            user_id,
+            message,
+            response or '',
+            message_type,
+            # Same format as SQLite's CURRENT_TIMESTAMP, taken when the message happened
+            time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(timestamp or time.time()))
+        ))
+        if len(self._buffer) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write all buffered rows now; returns the number written"""
+        async with self._flush_lock:
+            total = 0
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                try:
+                    await self.database.save_conversations(batch)
+                except Exception as e:
+                    # Retried every interval; report once per outage
+                    if not self._failing:
+                        logger.error(f"Error writing {len(batch)} conversation messages: {e}")
+                        self._failing = True
+                    self._requeue(batch)
+                    break
+                self._failing = False
+                total += len(batch)
+                self.written += len(batch)
+                self.batches += 1
+            return total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self._buffer),
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _requeue(self, batch: List[Row]):
+        """Put a failed batch back in front, dropping its oldest rows if the buffer refilled"""
+        room = self._buffer.maxlen - len(self._buffer)
+        if room < len(batch):
+            self.dropped += len(batch) - room
+            batch = batch[len(batch) - room:] if room else []
+        self._buffer.extendleft(reversed(batch))
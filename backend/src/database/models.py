@@ -1,20 +1,97 @@
-import sqlite3
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from .connection_pool import SQLitePool, sqlite_path
 
 logger = logging.getLogger(__name__)
 
+SCHEMA = (
+    # Users table
+    '''
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            email TEXT UNIQUE,
+            auth_method TEXT,
+            wallet_address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    
+    # AI Configurations table
+    '''
+        CREATE TABLE IF NOT EXISTS ai_configs (
+            id TEXT PRIMARY KEY,
+            user_id TEXT,
+            model_type TEXT,
+            api_key TEXT,
+            model_path TEXT,
+            is_active BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_ai_configs_user_active
+        ON ai_configs (user_id, is_active, created_at)
+    ''',
+    
+    # Conversations table
+    '''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            user_id TEXT,
+            message TEXT,
+            response TEXT,
+            message_type TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_conversations_user_time
+        ON conversations (user_id, timestamp)
+    ''',
+    
+    # User Settings table
+    '''
+        CREATE TABLE IF NOT EXISTS user_settings (
+            user_id TEXT PRIMARY KEY,
+            language TEXT DEFAULT 'en',
+            voice_settings TEXT,
+            privacy_settings TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    '''
+)
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "data/assistant.db"):
+    """
+    Application data access on an async SQLite pool.
+    
+    Reads run on pooled read-only connections and writes on the single
+    writer, so none of these methods block the event loop.
+    """
+    
+    def __init__(self, db_path: str = "data/assistant.db", read_connections: int = 4,
+                 busy_timeout: float = 5.0):
         self.db_path = db_path
-        self.connection = None
+        self.read_connections = read_connections
+        self.busy_timeout = busy_timeout
+        self.pool: Optional[SQLitePool] = None
         
     async def initialize(self):
-        """Initialize database connection"""
+        """Open the connection pool and create tables"""
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
+            self.pool = SQLitePool(
+                self.db_path,
+                read_connections=self.read_connections,
+                busy_timeout=self.busy_timeout
+            )
+            await self.pool.initialize()
             
             # Create tables
             await self._create_tables()
@@ -23,92 +100,39 @@ class DatabaseManager:
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize database: {e}")
+            await self.close()
             return False
     
     async def _create_tables(self):
         """Create database tables"""
-        cursor = self.connection.cursor()
-        
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                email TEXT UNIQUE,
-                auth_method TEXT,
-                wallet_address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # AI Configurations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ai_configs (
-                id TEXT PRIMARY KEY,
-                user_id TEXT,
-                model_type TEXT,
-                api_key TEXT,
-                model_path TEXT,
-                is_active BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Conversations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversations (
-                id TEXT PRIMARY KEY,
-                user_id TEXT,
-                message TEXT,
-                response TEXT,
-                message_type TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # User Settings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_settings (
-                user_id TEXT PRIMARY KEY,
-                language TEXT DEFAULT 'en',
-                voice_settings TEXT,
-                privacy_settings TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        self.connection.commit()
+        async with self.pool.transaction() as conn:
+            for statement in SCHEMA:
+                await conn.execute(statement)
     
     async def create_user(self, user_data: Dict[str, Any]) -> bool:
         """Create new user"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                INSERT INTO users (id, email, auth_method, wallet_address)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                user_data['id'],
-                user_data.get('email'),
-                user_data.get('auth_method'),
-                user_data.get('wallet_address')
-            ))
-            
-            # Create default settings
-            cursor.execute('''
-                INSERT INTO user_settings (user_id, language, voice_settings, privacy_settings)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                user_data['id'],
-                'en',
-                '{}',
-                '{"data_collection": "minimal", "cloud_sync": true}'
-            ))
-            
-            self.connection.commit()
+            async with self.pool.transaction() as conn:
+                await conn.execute('''
+                    INSERT INTO users (id, email, auth_method, wallet_address)
+                    VALUES (?, ?, ?, ?)
+                ''', (
+                    user_data['id'],
+                    user_data.get('email'),
+                    user_data.get('auth_method'),
+                    user_data.get('wallet_address')
+                ))
+                
+                # Create default settings
+                await conn.execute('''
+                    INSERT INTO user_settings (user_id, language, voice_settings, privacy_settings)
+                    VALUES (?, ?, ?, ?)
+                ''', (
+                    user_data['id'],
+                    'en',
+                    '{}',
+                    '{"data_collection": "minimal", "cloud_sync": true}'
+                ))
             return True
             
         except Exception as e:
@@ -118,18 +142,13 @@ class DatabaseManager:
     async def get_user(self, user_id: str) -> Dict[str, Any]:
         """Get user by ID"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            row = await self.pool.fetch_one('''
                 SELECT u.*, us.language, us.voice_settings, us.privacy_settings
                 FROM users u
                 LEFT JOIN user_settings us ON u.id = us.user_id
                 WHERE u.id = ?
             ''', (user_id,))
-            
-            row = cursor.fetchone()
-            if row:
-                return dict(row)
-            return {}
+            return row or {}
             
         except Exception as e:
             logger.error(f"Error getting user: {e}")
@@ -138,8 +157,7 @@ class DatabaseManager:
     async def save_conversation(self, conversation_data: Dict[str, Any]) -> bool:
         """Save conversation message"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self.pool.execute('''
                 INSERT INTO conversations (id, user_id, message, response, message_type)
                 VALUES (?, ?, ?, ?, ?)
             ''', (
@@ -149,28 +167,37 @@ class DatabaseManager:
                 conversation_data.get('response', ''),
                 conversation_data.get('message_type', 'text')
             ))
-            
-            self.connection.commit()
             return True
             
         except Exception as e:
             logger.error(f"Error saving conversation: {e}")
             return False
     
+    async def save_conversations(self, rows: List[tuple]) -> int:
+        """
+        Save many messages in one transaction.
+        
+        Rows are ``(id, user_id, message, response, message_type, timestamp)``.
+        Raises on failure so the caller can retry the batch.
+        """
+        if not self.pool:
+            raise RuntimeError("Database is not initialized")
+        await self.pool.executemany('''
+            INSERT OR IGNORE INTO conversations (id, user_id, message, response, message_type, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows)
+        return len(rows)
+    
     async def get_conversation_history(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get conversation history for user"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            return await self.pool.fetch_all('''
                 SELECT * FROM conversations 
                 WHERE user_id = ? 
                 ORDER BY timestamp DESC 
                 LIMIT ?
             ''', (user_id, limit))
             
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
-            
         except Exception as e:
             logger.error(f"Error getting conversation history: {e}")
             return []
@@ -178,28 +205,25 @@ class DatabaseManager:
     async def save_ai_config(self, config_data: Dict[str, Any]) -> bool:
         """Save AI model configuration"""
         try:
-            cursor = self.connection.cursor()
-            
-            # Deactivate other configs for this user
-            cursor.execute('''
-                UPDATE ai_configs SET is_active = FALSE 
-                WHERE user_id = ?
-            ''', (config_data['user_id'],))
-            
-            # Insert new config
-            cursor.execute('''
-                INSERT INTO ai_configs (id, user_id, model_type, api_key, model_path, is_active)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                config_data['id'],
-                config_data['user_id'],
-                config_data['model_type'],
-                config_data.get('api_key'),
-                config_data.get('model_path'),
-                True
-            ))
-            
-            self.connection.commit()
+            async with self.pool.transaction() as conn:
+                # Deactivate other configs for this user
+                await conn.execute('''
+                    UPDATE ai_configs SET is_active = FALSE 
+                    WHERE user_id = ?
+                ''', (config_data['user_id'],))
+                
+                # Insert new config
+                await conn.execute('''
+                    INSERT INTO ai_configs (id, user_id, model_type, api_key, model_path, is_active)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    config_data['id'],
+                    config_data['user_id'],
+                    config_data['model_type'],
+                    config_data.get('api_key'),
+                    config_data.get('model_path'),
+                    True
+                ))
             return True
             
         except Exception as e:
@@ -209,33 +233,39 @@ class DatabaseManager:
     async def get_active_ai_config(self, user_id: str) -> Dict[str, Any]:
         """Get active AI configuration for user"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            row = await self.pool.fetch_one('''
                 SELECT * FROM ai_configs 
                 WHERE user_id = ? AND is_active = TRUE
                 ORDER BY created_at DESC 
                 LIMIT 1
             ''', (user_id,))
-            
-            row = cursor.fetchone()
-            return dict(row) if row else {}
+            return row or {}
             
         except Exception as e:
             logger.error(f"Error getting AI config: {e}")
             return {}
     
     async def close(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
+        """Close database connections"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
 
 # Global database instance
 db = DatabaseManager()
 
-async def init_db():
-    """Initialize database"""
+async def init_db(url: Optional[str] = None, read_connections: Optional[int] = None):
+    """Initialize database, optionally at a ``sqlite:///`` URL from the config"""
+    if url:
+        db.db_path = sqlite_path(url)
+    if read_connections:
+        db.read_connections = read_connections
     return await db.initialize()
 
+async def close_db():
+    """Close database connections"""
+    await db.close()
+
 # Model classes for type hints
 class User:
     def __init__(self, user_data: Dict[str, Any]):
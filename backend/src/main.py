@@ -13,7 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from core.assistant_core import AIAssistantCore
 from api.fastapi_app import create_app
-from database.models import init_database
+from database.models import init_db, close_db
 from config.config_manager import ConfigManager
 
 logging.basicConfig(
@@ -40,7 +40,10 @@ class AIAssistantBackend:
             logger.info("Starting AI Assistant Backend...")
             
             # Initialize database
-            await init_database()
+            await init_db(
+                self.config.database.url,
+                read_connections=self.config.database.read_connections
+            )
             logger.info("Database initialized")
             
             # Initialize core assistant
@@ -69,6 +72,8 @@ class AIAssistantBackend:
         if self.assistant_core:
             await self.assistant_core.shutdown()
         
+        await close_db()
+        
         logger.info("AI Assistant Backend shutdown complete")
 
 def handle_exception(loop, context):
@@ -0,0 +1,3 @@
+from .http_transport import HTTPTransport, http_transport
+
+__all__ = ["HTTPTransport", "http_transport"]
@@ -0,0 +1,105 @@
+"""
+Shared HTTP transport - one pooled aiohttp session for every outbound client
+"""
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUTS = {
+    'default': {'connect': 5, 'read': 30}
+}
+
+class HTTPTransport:
+    """
+    Process-wide connection pool shared by the AI and web clients.
+
+    Keeping a single connector means warm keep-alive connections (and their
+    TLS sessions) are reused across users and clients instead of every
+    client paying its own handshakes. Each provider gets its own connect/read
+    timeouts from the ``network.timeouts`` config section.
+    """
+
+    def __init__(self):
+        self.limit = 100
+        self.limit_per_host = 20
+        self.keepalive_timeout = 60
+        self.dns_cache_ttl = 300
+        self.timeouts: Dict[str, Dict[str, float]] = dict(DEFAULT_TIMEOUTS)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    def configure(self, limit: int = None, limit_per_host: int = None, keepalive_timeout: float = None,
+                  dns_cache_ttl: int = None, timeouts: Dict[str, Dict[str, float]] = None):
+        """Apply pool settings; takes effect on the next initialize"""
+        if limit is not None:
+            self.limit = limit
+        if limit_per_host is not None:
+            self.limit_per_host = limit_per_host
+        if keepalive_timeout is not None:
+            self.keepalive_timeout = keepalive_timeout
+        if dns_cache_ttl is not None:
+            self.dns_cache_ttl = dns_cache_ttl
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+    async def initialize(self):
+        """Create the pooled session (idempotent)"""
+        async with self._lock:
+            if self._session and not self._session.closed:
+                return
+
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout_for('default')
+            )
+            logger.info(
+                f"HTTP transport ready (pool {self.limit}, {self.limit_per_host}/host, "
+                f"keep-alive {self.keepalive_timeout}s)"
+            )
+
+    async def shutdown(self):
+        """Close the pooled session"""
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP transport is not initialized")
+        return self._session
+
+    def timeout_for(self, provider: str) -> aiohttp.ClientTimeout:
+        """Connect/read timeouts for a provider, falling back to the defaults"""
+        settings = self.timeouts.get(provider, self.timeouts['default'])
+        return aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=settings.get('connect'),
+            sock_read=settings.get('read')
+        )
+
+    def request(self, provider: str, method: str, url: str, **kwargs):
+        """Issue a request with the provider's timeouts; use as ``async with``"""
+        kwargs.setdefault('timeout', self.timeout_for(provider))
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, provider: str, url: str, **kwargs):
+        return self.request(provider, 'GET', url, **kwargs)
+
+    def post(self, provider: str, url: str, **kwargs):
+        return self.request(provider, 'POST', url, **kwargs)
+
+# Global transport instance
+http_transport = HTTPTransport()
@@ -0,0 +1,4 @@
+from .metrics import MetricsRegistry, metrics_registry
+from .tracing import Tracer, tracer
+
+__all__ = ["MetricsRegistry", "metrics_registry", "Tracer", "tracer"]
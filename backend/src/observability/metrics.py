@@ -0,0 +1,100 @@
+"""
+Metrics - in-memory stage latency histograms with Prometheus text exposition
+"""
+import bisect
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Tuple
+
+import numpy as np
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (50, 95, 99)
+
+class LatencyHistogram:
+    """Cumulative bucket counts since start, plus the last ``window`` samples for percentiles"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window: int = 1000):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        return float(np.percentile(self.samples, percentile))
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {'count': self.count, 'sum': self.sum}
+        for quantile in QUANTILES:
+            summary[f'p{quantile}'] = self.percentile(quantile)
+        return summary
+
+class MetricsRegistry:
+    """
+    Latency histograms keyed by pipeline stage.
+
+    Rendered for Prometheus as a histogram over all observations (for
+    server-side aggregation) and a summary with p50/p95/p99 over the recent
+    window.
+    """
+
+    def __init__(self, prefix: str = "assistant", buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 window: int = 1000):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.window = window
+        self._stages: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self._stages[stage] = LatencyHistogram(self.buckets, self.window)
+        histogram.observe(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: histogram.summary() for stage, histogram in sorted(self._stages.items())}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        histogram_name = f"{self.prefix}_stage_duration_seconds"
+        summary_name = f"{self.prefix}_stage_recent_duration_seconds"
+        lines = [
+            f"# HELP {histogram_name} Time spent in each command pipeline stage.",
+            f"# TYPE {histogram_name} histogram"
+        ]
+        for stage, histogram in sorted(self._stages.items()):
+            label = f'stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.bucket_counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{histogram_name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f'{histogram_name}_sum{{{label}}} {histogram.sum}')
+            lines.append(f'{histogram_name}_count{{{label}}} {histogram.count}')
+
+        lines += [
+            f"# HELP {summary_name} Percentiles of the last {self.window} durations of each stage.",
+            f"# TYPE {summary_name} summary"
+        ]
+        for stage, histogram in sorted(self._stages.items()):
+            label = f'stage="{_escape(stage)}"'
+            for quantile in QUANTILES:
+                value = histogram.percentile(quantile)
+                lines.append(f'{summary_name}{{{label},quantile="{quantile / 100}"}} '
+                             f'{"NaN" if value is None else value}')
+            lines.append(f'{summary_name}_sum{{{label}}} {sum(histogram.samples)}')
+            lines.append(f'{summary_name}_count{{{label}}} {len(histogram.samples)}')
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+metrics_registry = MetricsRegistry()
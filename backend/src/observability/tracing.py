@@ -0,0 +1,74 @@
+"""
+Tracing - timed pipeline spans, exported to OpenTelemetry when it is installed
+"""
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterator
+
+from .metrics import MetricsRegistry, metrics_registry
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+
+class Tracer:
+    """
+    Times the stages of command processing.
+
+    Every span records its duration in the stage histograms and, inside
+    ``request()``, in that request's timings. With opentelemetry-api
+    installed spans are also started on the globally configured tracer
+    provider (a no-op until the application installs an SDK and exporter);
+    without it only the timings are kept.
+    """
+
+    def __init__(self, name: str = "ai-assistant", metrics: Optional[MetricsRegistry] = None):
+        self.metrics = metrics or metrics_registry
+        self._tracer = otel_trace.get_tracer(name) if otel_trace else None
+
+    @contextmanager
+    def span(self, stage: str, **attributes: Any) -> Iterator[None]:
+        """Time a block of work as ``stage``"""
+        started = time.perf_counter()
+        otel_span = (
+            self._tracer.start_as_current_span(stage, attributes=attributes)
+            if self._tracer else nullcontext()
+        )
+        with otel_span:
+            try:
+                yield
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+    @contextmanager
+    def request(self, name: str, **attributes: Any) -> Iterator[Dict[str, float]]:
+        """Span for a whole request; yields its per-stage timings in seconds"""
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        try:
+            with self.span(name, **attributes):
+                yield timings
+        finally:
+            _request_timings.reset(token)
+            timings['total'] = timings.pop(name, 0.0)
+
+    def record(self, stage: str, seconds: float):
+        """
+        Record a duration measured elsewhere.
+
+        For work that can't be wrapped in a span, e.g. async generators,
+        whose suspended frames must not hold the current span open.
+        """
+        self.metrics.observe(stage, seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+tracer = Tracer()
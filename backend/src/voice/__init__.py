@@ -1,5 +1,13 @@
 from .speech_to_text import SpeechToText
 from .text_to_speech import TextToSpeech
 from .wake_word_detector import WakeWordDetector
+from .sentence_splitter import SentenceSplitter
+from .tts_cache import TTSCache
+from .streaming_stt import StreamingTranscriber
+from .stt_engines import STTEngine, STTEngineError
 
-__all__ = ["SpeechToText", "TextToSpeech", "WakeWordDetector"]
+__all__ = [
+    "SpeechToText", "TextToSpeech", "WakeWordDetector",
+    "SentenceSplitter", "TTSCache", "StreamingTranscriber",
+    "STTEngine", "STTEngineError"
+]
@@ -0,0 +1,105 @@
+"""
+Vectorized audio front end - framing, energy, silence trimming and resampling
+
+All helpers work on whole NumPy buffers at once. Sample values stay in the
+16-bit PCM scale so thresholds such as ``voice.silence_threshold`` (500) can
+be compared against RMS directly.
+"""
+import numpy as np
+
+TARGET_SAMPLE_RATE = 16000
+
+def pcm16_to_samples(pcm: bytes, channels: int = 1) -> np.ndarray:
+    """Decode little-endian 16-bit PCM into a float32 mono signal"""
+    samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+    return to_mono(samples, channels)
+
+def samples_to_pcm16(samples: np.ndarray) -> bytes:
+    """Encode a signal back to little-endian 16-bit PCM"""
+    return np.clip(np.rint(samples), -32768, 32767).astype('<i2').tobytes()
+
+def to_mono(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Average interleaved channels down to mono"""
+    if channels <= 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+def frame_signal(samples: np.ndarray, frame_size: int, hop_size: int = None) -> np.ndarray:
+    """
+    Split a signal into frames without copying.
+
+    Returns an array of shape ``(n_frames, frame_size)``; a trailing partial
+    frame is dropped.
+    """
+    hop_size = hop_size or frame_size
+    if len(samples) < frame_size:
+        return np.empty((0, frame_size), dtype=samples.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(samples, frame_size)
+    return windows[::hop_size]
+
+def frame_energy(frames: np.ndarray) -> np.ndarray:
+    """Mean energy per frame"""
+    frames = frames.astype(np.float32, copy=False)
+    return np.einsum('ij,ij->i', frames, frames) / max(frames.shape[1], 1)
+
+def frame_rms(frames: np.ndarray) -> np.ndarray:
+    """Root-mean-square amplitude per frame"""
+    return np.sqrt(frame_energy(frames))
+
+def voiced_frames(samples: np.ndarray, frame_size: int, threshold: float) -> np.ndarray:
+    """Boolean mask of frames whose RMS exceeds the silence threshold"""
+    return frame_rms(frame_signal(samples, frame_size)) > threshold
+
+def trim_silence(samples: np.ndarray, frame_size: int, threshold: float,
+                 padding_frames: int = 2) -> np.ndarray:
+    """
+    Cut leading and trailing silence.
+
+    Keeps ``padding_frames`` frames on each side of the voiced region so word
+    onsets and tails are not clipped. Returns an empty array when nothing in
+    the buffer crosses the threshold.
+    """
+    mask = voiced_frames(samples, frame_size, threshold)
+    voiced = np.flatnonzero(mask)
+    if voiced.size == 0:
+        return samples[:0]
+
+    start = max(voiced[0] - padding_frames, 0) * frame_size
+    end = min((voiced[-1] + 1 + padding_frames) * frame_size, len(samples))
+    return samples[start:end]
+
+def resample(samples: np.ndarray, orig_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Band-limited resampling via the FFT.
+
+    Dropping (or zero-padding) the upper spectrum acts as an ideal low-pass
+    filter, so downsampling does not alias. Suitable for utterance-length
+    buffers, which is all the voice pipeline handles.
+    """
+    if orig_rate == target_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+
+    target_length = int(round(len(samples) * target_rate / orig_rate))
+    spectrum = np.fft.rfft(samples)
+    bins = target_length // 2 + 1
+
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.concatenate([spectrum, np.zeros(bins - len(spectrum), dtype=spectrum.dtype)])
+
+    resampled = np.fft.irfft(spectrum, n=target_length) * (target_length / len(samples))
+    return resampled.astype(np.float32)
+
+def prepare_pcm(pcm: bytes, sample_rate: int, channels: int = 1, frame_size: int = 1024,
+                silence_threshold: float = 500) -> bytes:
+    """
+    Normalize raw PCM for recognition: mono, 16 kHz and silence-trimmed.
+
+    Returns empty bytes when the buffer is entirely silence.
+    """
+    samples = pcm16_to_samples(pcm, channels)
+    samples = trim_silence(samples, frame_size, silence_threshold)
+    samples = resample(samples, sample_rate, TARGET_SAMPLE_RATE)
+    return samples_to_pcm16(samples)
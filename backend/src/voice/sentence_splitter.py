@@ -0,0 +1,40 @@
+"""
+Incremental sentence splitting for streamed text
+"""
+import re
+from typing import List
+
+# Sentence-final punctuation followed by whitespace. Requiring the trailing
+# whitespace keeps "3.14" or "v1.2" intact while tokens are still arriving.
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…。！？])\s+|\n+')
+
+class SentenceSplitter:
+    """Turns a stream of text deltas into complete sentences"""
+
+    def __init__(self, min_chars: int = 20):
+        # Very short fragments ("Sure." / "Dr.") are merged into the next
+        # sentence so each TTS chunk is worth the synthesis overhead
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add a text delta and return any sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.start()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """Return whatever text is left once the stream has ended"""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return remainder
@@ -2,15 +2,36 @@
 Speech-to-Text processing using multiple engines
 """
 import asyncio
+import logging
 import speech_recognition as sr
 import io
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+from .stt_engines import ENGINES, STTEngineError, VoskSTTEngine
+from .audio_processing import prepare_pcm, TARGET_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
 
 class SpeechToText:
     """Handles speech recognition in multiple languages"""
     
-    def __init__(self):
+    def __init__(self, engine_order: Optional[List[str]] = None, models_dir: str = "./models",
+                 silence_threshold: float = 500, chunk_size: int = 1024):
         self.recognizer = sr.Recognizer()
+        self.silence_threshold = silence_threshold
+        self.chunk_size = chunk_size
+        
+        # Local engine first: no network round trip and audio never leaves the device
+        self.engine_order = engine_order or [VoskSTTEngine.name, 'google']
+        self.engines = []
+        for name in self.engine_order:
+            if name not in ENGINES:
+                raise ValueError(f"Unknown speech-to-text engine: {name}")
+            engine_class = ENGINES[name]
+            self.engines.append(
+                engine_class(models_dir=models_dir) if engine_class is VoskSTTEngine else engine_class()
+            )
+        
         self.supported_languages = {
             'english': 'en-US',
             'spanish': 'es-ES',
@@ -27,13 +48,24 @@ class SpeechToText:
     async def initialize(self):
         """Initialize speech recognition"""
         logger.info("Initializing Speech-to-Text engine...")
-        # Adjust for ambient noise
-        # Note: This would typically use actual audio input
-        logger.info("Speech-to-Text engine ready")
+        
+        results = await asyncio.gather(
+            *(engine.initialize() for engine in self.engines),
+            return_exceptions=True
+        )
+        for engine, result in zip(self.engines, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to initialize {engine.name} speech engine: {result}")
+        
+        available = [engine.name for engine in self.engines if engine.is_available]
+        if not available:
+            logger.error("No speech-to-text engine available")
+        logger.info(f"Speech-to-Text engine ready (engines: {', '.join(available)})")
     
     async def shutdown(self):
         """Cleanup resources"""
-        pass
+        for engine in self.engines:
+            await engine.shutdown()
     
     async def transcribe(self, audio_data: bytes, user_id: str, language: str = 'english') -> Optional[str]:
         """
@@ -47,28 +79,91 @@ class SpeechToText:
             with sr.AudioFile(audio_file) as source:
                 audio = self.recognizer.record(source)
             
-            # Get language code
-            lang_code = self.supported_languages.get(language, 'en-US')
-            
-            # Try Google Speech Recognition first
-            try:
-                text = self.recognizer.recognize_google(audio, language=lang_code)
-                logger.info(f"Transcribed: {text}")
-                return text
-                
-            except sr.UnknownValueError:
-                logger.warning("Google Speech Recognition could not understand audio")
+            audio = self._prepare_audio(audio.get_raw_data(convert_width=2), audio.sample_rate)
+            if audio is None:
                 return None
+            
+            return await self._recognize(audio, language)
                 
-            except sr.RequestError as e:
-                logger.error(f"Google Speech Recognition error: {e}")
-                # Fallback to other engines could be implemented here
+        except Exception as e:
+            logger.error(f"Speech-to-Text error: {e}")
+            return None
+    
+    async def transcribe_pcm(self, pcm_data: bytes, user_id: str, language: str = 'english',
+                             sample_rate: int = 16000) -> Optional[str]:
+        """
+        Transcribe raw 16-bit mono PCM (as streamed over the audio WebSocket)
+        """
+        try:
+            audio = self._prepare_audio(pcm_data, sample_rate)
+            if audio is None:
                 return None
-                
+            
+            return await self._recognize(audio, language)
         except Exception as e:
             logger.error(f"Speech-to-Text error: {e}")
             return None
     
+    async def open_stream(self, language: str = 'english', sample_rate: int = 16000):
+        """
+        Incremental recognizer for one utterance, or None when the engine that
+        would transcribe it can't stream (e.g. Google, which needs the whole
+        utterance per request)
+        """
+        lang_code = self.supported_languages.get(language, 'en-US')
+        
+        for engine in self.engines:
+            if not engine.is_available:
+                continue
+            if not engine.supports_streaming:
+                return None
+            
+            try:
+                return await asyncio.to_thread(engine.open_stream, lang_code, sample_rate)
+            except STTEngineError as e:
+                logger.warning(f"{engine.name} speech engine can't stream, trying next: {e}")
+        
+        return None
+    
+    def _prepare_audio(self, pcm_data: bytes, sample_rate: int) -> Optional[sr.AudioData]:
+        """Trim silence and resample to 16 kHz mono; None if there is no speech"""
+        pcm = prepare_pcm(
+            pcm_data,
+            sample_rate,
+            frame_size=self.chunk_size,
+            silence_threshold=self.silence_threshold
+        )
+        if not pcm:
+            logger.info("Skipping recognition: audio is silent")
+            return None
+        
+        return sr.AudioData(pcm, TARGET_SAMPLE_RATE, 2)
+    
+    async def _recognize(self, audio: sr.AudioData, language: str) -> Optional[str]:
+        """Run recognition off the event loop, falling back through engines"""
+        # Get language code
+        lang_code = self.supported_languages.get(language, 'en-US')
+        
+        for engine in self.engines:
+            if not engine.is_available:
+                continue
+            
+            try:
+                text = await asyncio.to_thread(engine.recognize, audio, lang_code)
+            except STTEngineError as e:
+                logger.warning(f"{engine.name} speech engine failed, trying next: {e}")
+                continue
+            
+            if text is None:
+                logger.warning(f"{engine.name} speech engine could not understand audio")
+                return None
+            
+            logger.info(f"Transcribed ({engine.name}): {text}")
+            return text
+        
+        logger.error("All speech-to-text engines failed")
+        return None
+    
     async def get_supported_languages(self) -> Dict[str, str]:
         """Get list of supported languages"""
         return self.supported_languages
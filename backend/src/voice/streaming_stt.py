@@ -0,0 +1,192 @@
+"""
+Streaming Speech-to-Text - incremental transcription of live PCM audio
+"""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .audio_processing import pcm16_to_samples, frame_signal, frame_rms
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Utterance:
+    """Audio and recognizer state of one utterance"""
+    id: int
+    audio: bytearray
+    stream: Any = None
+    streaming: Optional[bool] = None  # None until the engine has been asked
+    fed: int = 0
+
+class StreamingTranscriber:
+    """
+    Turns a live stream of 16-bit mono PCM into partial and final transcripts.
+
+    Audio is cut into ``chunk_size`` frames and gated by an energy-based voice
+    activity detector. When the speech engine can stream (Vosk), each
+    utterance gets its own recognition stream: every ``partial_interval_ms``
+    only the audio received since the last step is fed to it for a partial
+    transcript, and once ``end_of_speech_ms`` of silence follows speech the
+    same stream produces the final one. Engines that need the whole utterance
+    per request (Google) emit no partials; the utterance is transcribed once
+    when it ends.
+
+    Events are delivered on ``self.events`` as dicts with a ``type`` of
+    ``speech_start``, ``partial`` or ``final``.
+    """
+
+    def __init__(self, speech_to_text, user_id: str, language: str = 'english',
+                 sample_rate: int = 16000, chunk_size: int = 1024,
+                 silence_threshold: float = 500, end_of_speech_ms: int = 700,
+                 partial_interval_ms: int = 600, preroll_ms: int = 300,
+                 max_utterance_ms: int = 30000):
+        self.speech_to_text = speech_to_text
+        self.user_id = user_id
+        self.language = language
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.silence_threshold = silence_threshold
+        self.end_of_speech_ms = end_of_speech_ms
+        self.partial_interval_ms = partial_interval_ms
+        self.max_utterance_ms = max_utterance_ms
+
+        self.frame_ms = 1000 * chunk_size / sample_rate
+        self.frame_bytes = chunk_size * 2
+
+        self.events: asyncio.Queue = asyncio.Queue()
+
+        self._pending = bytearray()
+        self._preroll = deque(maxlen=max(1, int(preroll_ms / self.frame_ms)))
+        self._utterance: Optional[_Utterance] = None
+        self._utterance_id = 0
+        self._speech_ms = 0.0
+        self._silence_ms = 0.0
+        self._since_partial_ms = 0.0
+        self._partial_task: Optional[asyncio.Task] = None
+        self._final_task: Optional[asyncio.Task] = None
+
+    async def feed(self, pcm: bytes):
+        """Add a chunk of PCM audio from the client"""
+        self._pending.extend(pcm)
+
+        usable = len(self._pending) - len(self._pending) % self.frame_bytes
+        if not usable:
+            return
+
+        chunk = bytes(self._pending[:usable])
+        del self._pending[:usable]
+
+        # Classify every complete frame in one vectorized pass
+        frames = frame_signal(pcm16_to_samples(chunk), self.chunk_size)
+        speech = frame_rms(frames) > self.silence_threshold
+
+        for index, is_speech in enumerate(speech):
+            offset = index * self.frame_bytes
+            self._process_frame(chunk[offset:offset + self.frame_bytes], bool(is_speech))
+
+    async def finish(self):
+        """Finalize any utterance in progress and wait for its transcript"""
+        if self._utterance is not None:
+            self._end_utterance()
+        if self._final_task:
+            await self._final_task
+
+    async def close(self):
+        """Cancel outstanding recognition work"""
+        for task in (self._partial_task, self._final_task):
+            if task and not task.done():
+                task.cancel()
+
+    def _process_frame(self, frame: bytes, is_speech: bool):
+        if self._utterance is None:
+            self._preroll.append(frame)
+            if is_speech:
+                self._start_utterance()
+            return
+
+        utterance = self._utterance
+        utterance.audio.extend(frame)
+        self._speech_ms += self.frame_ms
+        self._since_partial_ms += self.frame_ms
+        self._silence_ms = 0.0 if is_speech else self._silence_ms + self.frame_ms
+
+        if self._silence_ms >= self.end_of_speech_ms or self._speech_ms >= self.max_utterance_ms:
+            self._end_utterance()
+            return
+
+        # Only one partial recognition in flight; newer audio waits for the next slot
+        partial_idle = self._partial_task is None or self._partial_task.done()
+        if (self._since_partial_ms >= self.partial_interval_ms and partial_idle
+                and utterance.streaming is not False):
+            self._since_partial_ms = 0.0
+            self._partial_task = asyncio.create_task(self._transcribe_partial(utterance))
+
+    def _start_utterance(self):
+        self._utterance_id += 1
+        self._utterance = _Utterance(self._utterance_id, bytearray(b"".join(self._preroll)))
+        self._preroll.clear()
+        self._speech_ms = 0.0
+        self._silence_ms = 0.0
+        self._since_partial_ms = 0.0
+        self.events.put_nowait({'type': 'speech_start', 'utterance_id': self._utterance_id})
+
+    def _end_utterance(self):
+        utterance = self._utterance
+        self._utterance = None
+
+        # Chain finals so transcripts are emitted in utterance order. The
+        # partial is not cancelled: its stream step may already be running in
+        # a worker thread, so the final waits for it before touching the stream.
+        self._final_task = asyncio.create_task(
+            self._transcribe_final(utterance, self._partial_task, self._final_task)
+        )
+        self._partial_task = None
+
+    async def _feed_stream(self, utterance: _Utterance) -> Optional[str]:
+        """Feed audio not yet seen by the stream; None if the engine can't stream"""
+        if utterance.streaming is None:
+            utterance.stream = await self.speech_to_text.open_stream(self.language, self.sample_rate)
+            utterance.streaming = utterance.stream is not None
+        if not utterance.streaming:
+            return None
+
+        audio = bytes(utterance.audio[utterance.fed:])
+        utterance.fed += len(audio)
+        return await asyncio.to_thread(utterance.stream.accept, audio)
+
+    async def _transcribe_partial(self, utterance: _Utterance):
+        text = await self._feed_stream(utterance)
+        # Drop partials that arrive after their utterance was finalized
+        if text and utterance is self._utterance:
+            await self.events.put({'type': 'partial', 'utterance_id': utterance.id, 'text': text})
+
+    async def _transcribe_final(self, utterance: _Utterance, partial: Optional[asyncio.Task],
+                                previous: Optional[asyncio.Task]):
+        if partial:
+            try:
+                await partial
+            except Exception as e:
+                logger.warning(f"Partial transcription failed: {e}")
+
+        text = None
+        try:
+            if utterance.streaming is not False:
+                await self._feed_stream(utterance)
+            if utterance.streaming:
+                text = await asyncio.to_thread(utterance.stream.finish)
+        except Exception as e:
+            logger.warning(f"Streaming recognition failed, transcribing whole utterance: {e}")
+            utterance.streaming = False
+
+        if not utterance.streaming:
+            text = await self.speech_to_text.transcribe_pcm(
+                bytes(utterance.audio), self.user_id, self.language, self.sample_rate
+            )
+        if previous:
+            try:
+                await previous
+            except Exception as e:
+                logger.error(f"Previous final transcription failed: {e}")
+        await self.events.put({'type': 'final', 'utterance_id': utterance.id, 'text': text or ''})
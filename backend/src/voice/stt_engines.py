@@ -0,0 +1,180 @@
+"""
+Speech-to-Text engine backends
+"""
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+class STTEngineError(Exception):
+    """Raised when an engine cannot serve a request and the next one should be tried"""
+
+class STTEngine:
+    """
+    Base class for speech recognition engines.
+
+    ``recognize`` is blocking and is always called from a worker thread. It
+    returns the transcript, ``None`` when the audio contained no intelligible
+    speech, or raises STTEngineError when the engine itself failed. Engines
+    with ``supports_streaming`` also recognize incrementally through
+    ``open_stream``.
+    """
+
+    name = "base"
+    is_local = False
+    supports_streaming = False
+
+    def __init__(self):
+        self.is_available = False
+
+    async def initialize(self) -> bool:
+        """Load models / check dependencies; returns availability"""
+        self.is_available = True
+        return True
+
+    def recognize(self, audio: sr.AudioData, lang_code: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def open_stream(self, lang_code: str, sample_rate: int) -> 'RecognitionStream':
+        """Start incremental recognition of one utterance (blocking)"""
+        raise NotImplementedError
+
+    async def shutdown(self):
+        """Release engine resources"""
+        self.is_available = False
+
+class RecognitionStream:
+    """
+    Incremental recognition of one utterance.
+
+    Audio is fed in order as 16-bit mono PCM and each byte only once.
+    ``accept`` returns the transcript so far, ``finish`` the final one
+    (``None`` if nothing was understood). Both are blocking; call them from
+    a worker thread, one at a time.
+    """
+
+    def accept(self, pcm: bytes) -> str:
+        raise NotImplementedError
+
+    def finish(self) -> Optional[str]:
+        raise NotImplementedError
+
+class GoogleSTTEngine(STTEngine):
+    """Google Web Speech API via speech_recognition (network round trip)"""
+
+    name = "google"
+
+    def __init__(self):
+        super().__init__()
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio: sr.AudioData, lang_code: str) -> Optional[str]:
+        try:
+            return self.recognizer.recognize_google(audio, language=lang_code)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise STTEngineError(f"Google Speech Recognition error: {e}")
+
+class VoskSTTEngine(STTEngine):
+    """
+    Offline recognition with Vosk (Kaldi) models.
+
+    Models are expected under ``<models_dir>/vosk/<lang-code>`` (for example
+    ``models/vosk/en-US``). Each model is loaded once and kept in memory; the
+    default language is loaded during initialize so the first command does
+    not pay the load cost.
+    """
+
+    name = "vosk"
+    is_local = True
+    supports_streaming = True
+    sample_rate = 16000
+
+    def __init__(self, models_dir: str = "./models", default_language: str = "en-US"):
+        super().__init__()
+        self.models_root = Path(models_dir) / "vosk"
+        self.default_language = default_language
+        self.models: Dict[str, Any] = {}
+        self._vosk = None
+
+    async def initialize(self) -> bool:
+        try:
+            import vosk
+            vosk.SetLogLevel(-1)
+            self._vosk = vosk
+        except ImportError:
+            logger.warning("Vosk not available, offline speech recognition disabled")
+            return False
+
+        try:
+            await asyncio.to_thread(self._load_model, self.default_language)
+        except STTEngineError as e:
+            logger.warning(f"{e}; offline recognition limited to installed languages")
+
+        self.is_available = True
+        return True
+
+    def recognize(self, audio: sr.AudioData, lang_code: str) -> Optional[str]:
+        model = self._load_model(lang_code)
+
+        recognizer = self._vosk.KaldiRecognizer(model, self.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get('text', '')
+        return text or None
+
+    def open_stream(self, lang_code: str, sample_rate: int) -> RecognitionStream:
+        return VoskRecognitionStream(self._vosk.KaldiRecognizer(self._load_model(lang_code), sample_rate))
+
+    def _load_model(self, lang_code: str):
+        model = self.models.get(lang_code)
+        if model is not None:
+            return model
+
+        model_path = self.models_root / lang_code
+        if not model_path.is_dir():
+            raise STTEngineError(f"No Vosk model installed for {lang_code}")
+
+        model = self._vosk.Model(str(model_path))
+        self.models[lang_code] = model
+        logger.info(f"Loaded Vosk model for {lang_code}")
+        return model
+
+    async def shutdown(self):
+        self.models.clear()
+        await super().shutdown()
+
+class VoskRecognitionStream(RecognitionStream):
+    """Feeds a KaldiRecognizer chunk by chunk instead of re-decoding the utterance"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self._segments = []
+
+    def accept(self, pcm: bytes) -> str:
+        if self.recognizer.AcceptWaveform(pcm):
+            # Vosk closed a segment at a pause; later partials start after it
+            self._add_segment(self.recognizer.Result())
+            partial = ''
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        return " ".join(self._segments + ([partial] if partial else []))
+
+    def finish(self) -> Optional[str]:
+        self._add_segment(self.recognizer.FinalResult())
+        return " ".join(self._segments) or None
+
+    def _add_segment(self, result: str):
+        text = json.loads(result).get('text', '')
+        if text:
+            self._segments.append(text)
+
+ENGINES = {
+    GoogleSTTEngine.name: GoogleSTTEngine,
+    VoskSTTEngine.name: VoskSTTEngine
+}
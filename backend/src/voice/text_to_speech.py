@@ -1,109 +1,98 @@
 import logging
-import pyttsx3
-import io
 from typing import Optional
 
+from .tts_worker import TTSWorker
+from .tts_cache import TTSCache
+
 logger = logging.getLogger(__name__)
 
 class TextToSpeech:
-    def __init__(self):
-        self.engine = None
+    def __init__(self, max_pending: int = 8, cache_dir: Optional[str] = None):
+        self.worker = TTSWorker(max_pending=max_pending)
+        self.cache = TTSCache(disk_dir=cache_dir)
         self.is_initialized = False
         self.voices = {}
-        
+        self.properties = {
+            'rate': 150,  # Speech rate
+            'volume': 0.8,  # Volume level
+            'voice': None
+        }
+
     async def initialize(self):
         """Initialize text-to-speech engine"""
         try:
-            self.engine = pyttsx3.init()
-            
-            # Configure engine settings
-            self.engine.setProperty('rate', 150)  # Speech rate
-            self.engine.setProperty('volume', 0.8)  # Volume level
-            
-            # Get available voices
-            voices = self.engine.getProperty('voices')
-            for voice in voices:
-                self.voices[voice.id] = {
-                    'name': voice.name,
-                    'languages': voice.languages if hasattr(voice, 'languages') else ['en']
-                }
-            
+            # The engine lives on the worker thread; we only get its voices back
+            self.voices = await self.worker.start()
+            await self.cache.initialize()
+
             self.is_initialized = True
             logger.info("✅ Text-to-Speech initialized successfully")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ Failed to initialize Text-to-Speech: {e}")
             return False
-    
+
     async def synthesize(self, text: str, language: str = "en") -> Optional[bytes]:
         """Synthesize text to speech audio"""
         if not self.is_initialized:
             logger.error("Text-to-Speech not initialized")
             return None
-        
+
         try:
-            # Set voice based on language
-            self._set_voice_for_language(language)
-            
-            # For pyttsx3, we need to save to a file and read back
-            import tempfile
-            import os
-            
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_path = temp_file.name
-            
-            self.engine.save_to_file(text, temp_path)
-            self.engine.runAndWait()
-            
-            # Read the generated audio file
-            with open(temp_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
+            properties = dict(self.properties)
+
+            # Set voice based on language unless one was chosen explicitly
+            if properties['voice'] is None:
+                properties['voice'] = self._voice_for_language(language)
+
+            cache_key = TTSCache.make_key(
+                text, properties['voice'], properties['rate'], properties['volume'], language
+            )
+            audio_data = await self.cache.get(cache_key)
+            if audio_data is not None:
+                return audio_data
+
+            audio_data = await self.worker.synthesize(text, properties)
+            await self.cache.put(cache_key, audio_data)
+
             logger.info(f"🔊 Synthesized speech for text: {text[:50]}...")
             return audio_data
-            
+
         except Exception as e:
             logger.error(f"Error synthesizing speech: {e}")
             return None
-    
-    def _set_voice_for_language(self, language: str):
-        """Set appropriate voice for the given language"""
-        try:
-            for voice_id, voice_info in self.voices.items():
-                if language in voice_info['languages']:
-                    self.engine.setProperty('voice', voice_id)
-                    return
-            
-            # Fallback to first available voice
-            if self.voices:
-                first_voice = next(iter(self.voices.keys()))
-                self.engine.setProperty('voice', first_voice)
-                
-        except Exception as e:
-            logger.warning(f"Could not set voice for language {language}: {e}")
-    
+
+    def _voice_for_language(self, language: str) -> Optional[str]:
+        """Find an appropriate voice for the given language"""
+        for voice_id, voice_info in self.voices.items():
+            if language in voice_info['languages']:
+                return voice_id
+
+        # Fallback to first available voice
+        if self.voices:
+            return next(iter(self.voices.keys()))
+
+        logger.warning(f"Could not find a voice for language {language}")
+        return None
+
     def get_available_voices(self) -> dict:
         """Get available voices"""
         return self.voices
-    
+
     def set_voice_properties(self, rate: int = None, volume: float = None, voice_id: str = None):
         """Set TTS voice properties"""
-        try:
-            if rate is not None:
-                self.engine.setProperty('rate', rate)
-            if volume is not None:
-                self.engine.setProperty('volume', volume)
-            if voice_id is not None and voice_id in self.voices:
-                self.engine.setProperty('voice', voice_id)
-        except Exception as e:
-            logger.error(f"Error setting voice properties: {e}")
-    
+        if rate is not None:
+            self.properties['rate'] = rate
+        if volume is not None:
+            self.properties['volume'] = volume
+        if voice_id is not None:
+            if voice_id in self.voices:
+                self.properties['voice'] = voice_id
+            else:
+                logger.error(f"Error setting voice properties: unknown voice {voice_id}")
+
     async def cleanup(self):
         """Cleanup resources"""
-        if self.engine:
-            self.engine.stop()
+        await self.worker.stop()
         self.is_initialized = False
@@ -0,0 +1,172 @@
+"""
+Content-addressed cache for synthesized speech
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTSCache:
+    """
+    Two-tier LRU cache of synthesized audio.
+
+    Entries are keyed by a hash of everything that affects the rendered audio
+    (text, voice, rate, volume, language). The memory tier is checked first;
+    the optional disk tier keeps popular phrases across restarts. Both tiers
+    are bounded by total bytes and evict least recently used entries.
+    """
+
+    def __init__(self, max_memory_bytes: int = 32 * 1024 * 1024,
+                 disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def initialize(self):
+        """Load the disk tier index"""
+        if not self.disk_dir:
+            return
+
+        try:
+            await asyncio.to_thread(self._load_disk_index)
+            logger.info(f"TTS cache loaded {len(self._disk_index)} entries from {self.disk_dir}")
+        except Exception as e:
+            logger.warning(f"TTS disk cache unavailable, using memory only: {e}")
+            self.disk_dir = None
+
+    @staticmethod
+    def make_key(text: str, voice_id: Optional[str], rate: Any, volume: Any, language: str) -> str:
+        """Build the content address for a synthesis request"""
+        material = json.dumps([text, voice_id, rate, volume, language], ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Look up cached audio, promoting disk hits into memory"""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+
+        if self.disk_dir and key in self._disk_index:
+            try:
+                audio = await asyncio.to_thread(self._path_for(key).read_bytes)
+            except OSError:
+                self._forget_disk_entry(key)
+            else:
+                self._disk_index.move_to_end(key)
+                self._store_in_memory(key, audio)
+                self.disk_hits += 1
+                return audio
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, audio: bytes):
+        """Store audio in both tiers"""
+        self._store_in_memory(key, audio)
+
+        if self.disk_dir and key not in self._disk_index and len(audio) <= self.max_disk_bytes:
+            try:
+                await asyncio.to_thread(self._write_disk_entry, key, audio)
+            except OSError as e:
+                logger.warning(f"Could not write TTS cache entry: {e}")
+                return
+
+            # A concurrent put may have indexed the same key while we wrote
+            if key in self._disk_index:
+                return
+
+            self._disk_index[key] = len(audio)
+            self._disk_bytes += len(audio)
+            await self._evict_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_entries': len(self._disk_index),
+            'disk_bytes': self._disk_bytes
+        }
+
+    def _store_in_memory(self, key: str, audio: bytes):
+        """Insert into the memory tier and evict down to the byte budget"""
+        if len(audio) > self.max_memory_bytes:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    async def _evict_disk(self):
+        """Remove least recently used files until under the disk budget"""
+        victims = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            victims.append(self._path_for(key))
+
+        if victims:
+            await asyncio.to_thread(self._unlink_all, victims)
+
+    def _forget_disk_entry(self, key: str):
+        size = self._disk_index.pop(key, 0)
+        self._disk_bytes -= size
+
+    def _path_for(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.wav"
+
+    def _load_disk_index(self):
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.disk_dir.glob("*.wav"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+
+        # Oldest first so the OrderedDict starts in LRU order
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _write_disk_entry(self, key: str, audio: bytes):
+        path = self._path_for(key)
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_bytes(audio)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _unlink_all(paths):
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
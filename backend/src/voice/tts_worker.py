@@ -0,0 +1,126 @@
+"""
+Dedicated Text-to-Speech worker thread
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTSWorker:
+    """
+    Owns the pyttsx3 engine on its own thread.
+
+    pyttsx3 engines must be driven from the thread that created them and
+    ``runAndWait`` blocks, so every synthesis request is handed to this thread
+    and awaited through a future. At most ``max_pending`` requests may be
+    queued or running; further callers wait for a slot (backpressure) instead
+    of piling up behind the engine.
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self.max_pending = max_pending
+        self._jobs: queue.Queue = queue.Queue()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready: concurrent.futures.Future = concurrent.futures.Future()
+        self._stopped = False
+        self.pending = 0
+
+    async def start(self) -> Dict[str, Dict[str, Any]]:
+        """Start the worker thread and return the engine's available voices"""
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+        return await asyncio.wrap_future(self._ready)
+
+    async def synthesize(self, text: str, properties: Dict[str, Any]) -> bytes:
+        """Render text to WAV bytes using the given engine properties"""
+        if self._stopped or not self._thread or not self._thread.is_alive():
+            raise RuntimeError("TTS worker is not running")
+
+        async with self._slots:
+            # stop() may have run while this caller waited for a slot
+            if self._stopped:
+                raise RuntimeError("TTS worker is not running")
+            self.pending += 1
+            try:
+                future: concurrent.futures.Future = concurrent.futures.Future()
+                self._jobs.put((text, properties, future))
+                return await asyncio.wrap_future(future)
+            finally:
+                self.pending -= 1
+
+    async def stop(self):
+        """Stop the worker thread after the current job; queued jobs fail"""
+        self._stopped = True
+        self._fail_pending()
+        if self._thread and self._thread.is_alive():
+            self._jobs.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join, 5)
+
+    def _fail_pending(self):
+        """Fail every queued job so its caller doesn't wait forever"""
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and job[2].set_running_or_notify_cancel():
+                job[2].set_exception(RuntimeError("TTS worker stopped"))
+
+    def _run(self):
+        """Worker thread main loop"""
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            voices = {}
+            for voice in engine.getProperty('voices'):
+                voices[voice.id] = {
+                    'name': voice.name,
+                    'languages': voice.languages if hasattr(voice, 'languages') else ['en']
+                }
+        except Exception as e:
+            self._ready.set_exception(e)
+            return
+
+        self._ready.set_result(voices)
+
+        # pyttsx3 can only render to a path, so the worker reuses one spool
+        # file on a RAM-backed filesystem rather than creating a temp file per
+        # utterance. The bytes are returned in memory to the caller.
+        spool_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        spool_path = os.path.join(spool_dir, f"tts-{uuid.uuid4().hex}.wav")
+
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+
+                text, properties, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    for name, value in properties.items():
+                        if value is not None:
+                            engine.setProperty(name, value)
+
+                    engine.save_to_file(text, spool_path)
+                    engine.runAndWait()
+
+                    with open(spool_path, 'rb') as f:
+                        future.set_result(f.read())
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            engine.stop()
+            if os.path.exists(spool_path):
+                os.unlink(spool_path)
@@ -2,105 +2,349 @@
 Wake Word Detection using Porcupine or similar
 """
 import asyncio
+import logging
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional, List, Tuple
+
 import numpy as np
-from typing import Dict, Any, Callable, Optional
+
+from .audio_processing import frame_rms, resample, TARGET_SAMPLE_RATE
+from .wake_word_training import WakeWordTemplateIndex, WakeWordTrainer, embed_audio
+
+logger = logging.getLogger(__name__)
+
+class AudioRingBuffer:
+    """Fixed-size int16 ring buffer; the oldest audio is overwritten when full"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._start = 0
+        self._size = 0
+        self.dropped_samples = 0
+        self.last_write_time = 0.0
+
+    def write(self, samples: np.ndarray):
+        if len(samples) > self.capacity:
+            self.dropped_samples += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+        count = len(samples)
+        if count == 0:
+            return
+
+        overflow = self._size + count - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._size -= overflow
+            self.dropped_samples += overflow
+
+        end = (self._start + self._size) % self.capacity
+        first = min(count, self.capacity - end)
+        self._data[end:end + first] = samples[:first]
+        self._data[:count - first] = samples[first:]
+        self._size += count
+        self.last_write_time = time.perf_counter()
+
+    def read_frames(self, frame_length: int) -> np.ndarray:
+        """Remove and return all complete frames as an (n, frame_length) array"""
+        n_frames = self._size // frame_length
+        if n_frames == 0:
+            return np.empty((0, frame_length), dtype=np.int16)
+
+        count = n_frames * frame_length
+        indices = (self._start + np.arange(count)) % self.capacity
+        frames = self._data[indices].reshape(n_frames, frame_length)
+        self._start = (self._start + count) % self.capacity
+        self._size -= count
+        return frames
 
 class WakeWordDetector:
-    """Handles wake word detection and training"""
-    
-    def __init__(self):
+    """
+    Handles wake word detection and training
+
+    Audio for every listening session is written into a per-session ring
+    buffer. A single background loop drains all buffers each tick, gates the
+    frames of every session with one vectorized energy pass, runs the keyword
+    detectors for the voiced frames in a worker thread and dispatches
+    callbacks as tasks so slow handlers never stall the audio loop.
+    """
+
+    def __init__(self, silence_threshold: float = 500, sensitivity: float = 0.7,
+                 poll_interval: float = 0.03, buffer_seconds: float = 2.0, sample_rate: int = 16000,
+                 data_dir: Optional[str] = None):
+        self.silence_threshold = silence_threshold
+        self.sensitivity = sensitivity
+        self.poll_interval = poll_interval
+        self.sample_rate = sample_rate
+        self.buffer_capacity = int(buffer_seconds * sample_rate)
+        self.frame_length = 512
         self.is_listening = False
         self.sessions = {}
-        self.custom_wake_words = {}
-        
+        self.porcupine = None
+
+        # Custom wake words: trained off-loop, matched from the in-memory index
+        self.template_index = WakeWordTemplateIndex(
+            str(Path(data_dir) / "wake_words") if data_dir else None
+        )
+        self.trainer = WakeWordTrainer(
+            self.template_index, sample_rate=sample_rate, silence_threshold=silence_threshold
+        )
+
+        self._pvporcupine = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._retired_handles = []
+        self._callback_tasks = set()
+
+        self.frames_processed = 0
+        self.frames_silent = 0
+        self.detections = 0
+        self._throughput = deque(maxlen=100)
+        self._latencies_ms = deque(maxlen=1000)
+
     async def initialize(self):
         """Initialize wake word detection"""
         logger.info("Initializing Wake Word Detector...")
-        
+
         try:
             # Initialize Porcupine for wake word detection
             import pvporcupine
+            self._pvporcupine = pvporcupine
             self.porcupine = pvporcupine.create(
                 keywords=['computer', 'hey computer']  # Default wake words
             )
+            self.frame_length = self.porcupine.frame_length
             logger.info("Wake Word Detector initialized with Porcupine")
         except ImportError:
             logger.warning("Porcupine not available, using simulated wake word detection")
             self.porcupine = None
-    
+
+        await asyncio.to_thread(self.template_index.load)
+
+        self.is_listening = True
+        self._loop_task = asyncio.create_task(self._detection_loop())
+
     async def shutdown(self):
         """Cleanup wake word detection"""
-        if hasattr(self, 'porcupine') and self.porcupine:
+        self.is_listening = False
+        if self._loop_task:
+            # Let the loop finish its batch and exit: cancelling it would leave
+            # the detection thread running on handles deleted below
+            await self._loop_task
+            self._loop_task = None
+
+        for session_id in list(self.sessions):
+            await self.stop_listening(session_id)
+        self._release_retired_handles()
+        await self.trainer.shutdown()
+
+        if self.porcupine:
             self.porcupine.delete()
-    
-    async def start_listening(self, session_id: str, callback: Callable):
+
+    async def start_listening(self, session_id: str, callback: Callable, sensitivity: Optional[float] = None,
+                              user_id: Optional[str] = None):
         """Start listening for wake words in a session"""
+        sensitivity = self.sensitivity if sensitivity is None else sensitivity
+
+        handle = None
+        if self._pvporcupine:
+            # Porcupine keeps state across frames, so each session needs its own handle
+            handle = await asyncio.to_thread(
+                self._pvporcupine.create,
+                keywords=['computer', 'hey computer'],
+                sensitivities=[sensitivity, sensitivity]
+            )
+
         self.sessions[session_id] = {
             'callback': callback,
             'is_active': True,
-            'wake_words': ['assistant', 'hey assistant']  # Default wake words
+            'wake_words': ['assistant', 'hey assistant'],  # Default wake words
+            'sensitivity': sensitivity,
+            'buffer': AudioRingBuffer(self.buffer_capacity),
+            'detector': handle,
+            'user_id': user_id,
+            'history': np.empty(0, dtype=np.int16)
         }
-        
+
         logger.info(f"Started wake word listening for session {session_id}")
-    
+
     async def stop_listening(self, session_id: str):
         """Stop listening for wake words in a session"""
         if session_id in self.sessions:
             self.sessions[session_id]['is_active'] = False
-            del self.sessions[session_id]
+            session = self.sessions.pop(session_id)
+            # The detection thread may still hold the handle; release it between batches
+            if session['detector']:
+                self._retired_handles.append(session['detector'])
             logger.info(f"Stopped wake word listening for session {session_id}")
-    
+
+    def feed_audio(self, session_id: str, samples: np.ndarray):
+        """Queue 16-bit mono samples for a session; detection happens on the engine loop"""
+        session = self.sessions.get(session_id)
+        if session:
+            session['buffer'].write(np.asarray(samples, dtype=np.int16).ravel())
+
     async def process_audio_frame(self, audio_frame: np.ndarray, session_id: str) -> bool:
         """
-        Process audio frame for wake word detection
-        Returns True if wake word detected
+        Queue an audio frame for wake word detection
+        Returns True if the session is listening; detections arrive via the session callback
         """
         if session_id not in self.sessions:
             return False
-        
-        session = self.sessions[session_id]
-        
-        if self.porcupine:
+
+        self.feed_audio(session_id, audio_frame)
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Throughput and latency of the detection loop"""
+        frames_per_second = 0.0
+        if len(self._throughput) >= 2:
+            elapsed = self._throughput[-1][0] - self._throughput[0][0]
+            frames = sum(count for _, count in list(self._throughput)[1:])
+            frames_per_second = frames / elapsed if elapsed > 0 else 0.0
+
+        latencies = np.array(self._latencies_ms) if self._latencies_ms else None
+        return {
+            'active_sessions': len(self.sessions),
+            'frames_processed': self.frames_processed,
+            'frames_silent': self.frames_silent,
+            'frames_per_second': frames_per_second,
+            'detections': self.detections,
+            'detection_latency_ms_p50': float(np.percentile(latencies, 50)) if latencies is not None else None,
+            'detection_latency_ms_p95': float(np.percentile(latencies, 95)) if latencies is not None else None,
+            'dropped_samples': sum(s['buffer'].dropped_samples for s in self.sessions.values())
+        }
+
+    async def _detection_loop(self):
+        """Drain every session's buffer and run detection in batches"""
+        while self.is_listening:
+            tick_start = time.perf_counter()
+
+            try:
+                self._release_retired_handles()
+                batch = self._collect_batch()
+
+                if batch:
+                    detections = await asyncio.to_thread(self._detect_batch, batch)
+                    self._dispatch(detections)
+                    self._throughput.append((time.perf_counter(), sum(len(b[1]) for b in batch)))
+            except Exception as e:
+                logger.error(f"Wake word detection loop error: {e}")
+
+            elapsed = time.perf_counter() - tick_start
+            await asyncio.sleep(max(self.poll_interval - elapsed, 0))
+
+    def _collect_batch(self) -> List[Tuple[str, np.ndarray, Dict[str, Any], float]]:
+        batch = []
+        for session_id, session in self.sessions.items():
+            if not session['is_active']:
+                continue
+            frames = session['buffer'].read_frames(self.frame_length)
+            if len(frames):
+                batch.append((session_id, frames, session, session['buffer'].last_write_time))
+        return batch
+
+    def _detect_batch(self, batch: List[Tuple[str, np.ndarray, Dict[str, Any], float]]) -> List[Tuple[str, str, float]]:
+        """Runs in a worker thread; returns (session_id, wake_word, arrival_time) per detection"""
+        all_frames = np.concatenate([frames for _, frames, _, _ in batch])
+        voiced = frame_rms(all_frames) > self.silence_threshold
+
+        self.frames_processed += len(all_frames)
+        self.frames_silent += int(len(all_frames) - voiced.sum())
+
+        detections = []
+        offset = 0
+        for session_id, frames, session, arrival_time in batch:
+            session_voiced = np.flatnonzero(voiced[offset:offset + len(frames)])
+            offset += len(frames)
+
+            wake_word = (
+                self._match_custom(session, frames, session_voiced)
+                or self._detect_session(frames, session_voiced, session['detector'])
+            )
+            if wake_word:
+                detections.append((session_id, wake_word, arrival_time))
+
+        return detections
+
+    def _match_custom(self, session: Dict[str, Any], frames: np.ndarray, voiced_indices: np.ndarray) -> Optional[str]:
+        """Compare the session's recent audio against the user's trained templates"""
+        user_id = session['user_id']
+        if not self.template_index.has_templates(user_id):
+            return None
+
+        window = int(self.template_index.window_samples(user_id) * self.sample_rate / TARGET_SAMPLE_RATE)
+        session['history'] = np.concatenate([session['history'], frames.ravel()])[-window:]
+        if voiced_indices.size == 0 or len(session['history']) < window:
+            return None
+
+        samples = resample(session['history'].astype(np.float32), self.sample_rate)
+        embedding = embed_audio(samples, self.silence_threshold)
+        if embedding is None:
+            return None
+
+        wake_word = self.template_index.match(user_id, embedding)
+        if wake_word:
+            # Start from fresh audio so one utterance triggers once
+            session['history'] = session['history'][:0]
+        return wake_word
+
+    def _detect_session(self, frames: np.ndarray, voiced_indices: np.ndarray, detector) -> Optional[str]:
+        if voiced_indices.size == 0:
+            return None
+
+        if detector:
             # Use Porcupine for detection
-            keyword_index = self.porcupine.process(audio_frame)
-            if keyword_index >= 0:
-                wake_word = self.porcupine.keywords[keyword_index]
-                await session['callback'](session_id, wake_word)
-                return True
-        else:
-            # Simulated detection for development
-            # In production, this would use proper wake word detection
-            if np.random.random() < 0.001:  # 0.1% chance for simulation
-                wake_word = "assistant"
-                await session['callback'](session_id, wake_word)
-                return True
-        
-        return False
-    
-    async def train_custom_wake_word(self, user_id: str, wake_word: str, audio_samples: list) -> bool:
-        """Train custom wake word from audio samples"""
-        try:
-            logger.info(f"Training custom wake word '{wake_word}' for user {user_id}")
-            
-            # In production, this would use proper wake word training
-            # For now, simulate training process
-            await asyncio.sleep(2)  # Simulate training time
-            
-            # Store the custom wake word
-            if user_id not in self.custom_wake_words:
-                self.custom_wake_words[user_id] = []
-            
-            self.custom_wake_words[user_id].append(wake_word)
-            
-            logger.info(f"Custom wake word '{wake_word}' trained successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to train custom wake word: {e}")
-            return False
-    
+            for index in voiced_indices:
+                keyword_index = detector.process(frames[index])
+                if keyword_index >= 0:
+                    return ['computer', 'hey computer'][keyword_index]
+            return None
+
+        # Simulated detection for development
+        # In production, this would use proper wake word detection
+        if (np.random.random(voiced_indices.size) < 0.001).any():  # 0.1% chance per frame
+            return "assistant"
+        return None
+
+    def _dispatch(self, detections: List[Tuple[str, str, float]]):
+        now = time.perf_counter()
+        for session_id, wake_word, arrival_time in detections:
+            session = self.sessions.get(session_id)
+            if not session:
+                continue
+
+            self.detections += 1
+            self._latencies_ms.append((now - arrival_time) * 1000)
+
+            task = asyncio.create_task(session['callback'](session_id, wake_word))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._on_callback_done)
+
+    def _on_callback_done(self, task: asyncio.Task):
+        self._callback_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Wake word callback failed: {task.exception()}")
+
+    def _release_retired_handles(self):
+        while self._retired_handles:
+            self._retired_handles.pop().delete()
+
+    async def train_custom_wake_word(self, user_id: str, wake_word: str, audio_samples: List[bytes]) -> str:
+        """
+        Start training a custom wake word from 16-bit PCM samples
+        Returns a job id; poll get_training_job for the outcome
+        """
+        logger.info(f"Training custom wake word '{wake_word}' for user {user_id}")
+        return self.trainer.submit(user_id, wake_word, audio_samples)
+
+    def get_training_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a wake word training job"""
+        return self.trainer.get_job(job_id)
+
     async def get_wake_words(self, user_id: str) -> list:
         """Get available wake words for user"""
         default_words = ['assistant', 'hey assistant']
-        custom_words = self.custom_wake_words.get(user_id, [])
+        custom_words = self.template_index.words(user_id)
         return default_words + custom_words
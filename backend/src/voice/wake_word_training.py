@@ -0,0 +1,272 @@
+"""
+Custom wake word training - MFCC templates and the in-memory template index
+
+Training runs in a process pool: each submitted sample is trimmed, resampled
+to 16 kHz and turned into a fixed-length, L2-normalized MFCC embedding. The
+detector compares live audio against these embeddings with a single
+matrix-vector product per user.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .audio_processing import (
+    TARGET_SAMPLE_RATE, frame_signal, pcm16_to_samples, resample, trim_silence
+)
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_FRAMES = 32
+MIN_TRAINING_SAMPLES = 3
+
+@lru_cache(maxsize=4)
+def _mel_filterbank(n_mels: int, n_fft: int, sample_rate: int) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filters = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, shape (n_mfcc, n_mels)"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis
+
+def compute_mfcc(samples: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE, n_mfcc: int = 13,
+                 n_mels: int = 26, n_fft: int = 512) -> np.ndarray:
+    """MFCCs with cepstral mean normalization, shape (n_frames, n_mfcc)"""
+    frame_size = int(sample_rate * 0.025)
+    hop_size = int(sample_rate * 0.010)
+
+    samples = samples.astype(np.float32)
+    if len(samples) < frame_size:
+        samples = np.pad(samples, (0, frame_size - len(samples)))
+
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    frames = frame_signal(emphasized, frame_size, hop_size) * np.hamming(frame_size)
+
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    log_mel = np.log(power @ _mel_filterbank(n_mels, n_fft, sample_rate).T + 1e-10)
+    mfcc = log_mel @ _dct_matrix(n_mfcc, n_mels).T
+    return mfcc - mfcc.mean(axis=0)
+
+def embed(mfcc: np.ndarray, n_frames: int = EMBEDDING_FRAMES) -> np.ndarray:
+    """Linearly time-normalize an MFCC sequence and flatten it to a unit vector"""
+    positions = np.linspace(0, len(mfcc) - 1, n_frames)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, len(mfcc) - 1)
+    weight = (positions - lower)[:, None]
+
+    vector = (mfcc[lower] * (1 - weight) + mfcc[upper] * weight).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def embed_audio(samples: np.ndarray, silence_threshold: float) -> Optional[np.ndarray]:
+    """Trim a 16 kHz signal and embed it; None if it is silent"""
+    trimmed = trim_silence(samples, 160, silence_threshold, padding_frames=5)
+    if len(trimmed) == 0:
+        return None
+    return embed(compute_mfcc(trimmed))
+
+def build_wake_word_model(audio_samples: List[bytes], sample_rate: int,
+                          silence_threshold: float) -> Dict[str, Any]:
+    """
+    Build templates from recorded samples. Runs in a worker process.
+
+    ``audio_samples`` are 16-bit mono PCM recordings of the wake word.
+    The acceptance threshold is derived from how similar the user's own
+    recordings are to each other.
+    """
+    vectors = []
+    durations = []
+    for pcm in audio_samples:
+        samples = resample(pcm16_to_samples(pcm), sample_rate, TARGET_SAMPLE_RATE)
+        trimmed = trim_silence(samples, 160, silence_threshold, padding_frames=5)
+        if len(trimmed) == 0:
+            continue
+        vectors.append(embed(compute_mfcc(trimmed)))
+        durations.append(len(trimmed))
+
+    if len(vectors) < MIN_TRAINING_SAMPLES:
+        raise ValueError(
+            f"Need at least {MIN_TRAINING_SAMPLES} non-silent samples, got {len(vectors)}"
+        )
+
+    vectors = np.stack(vectors)
+    similarities = vectors @ vectors.T
+    pairwise = similarities[np.triu_indices(len(vectors), k=1)]
+    threshold = float(np.clip(pairwise.min() - 0.05, 0.6, 0.95))
+
+    return {
+        'vectors': vectors.astype(np.float32),
+        'threshold': threshold,
+        'window_samples': int(max(durations) * 1.2)
+    }
+
+class WakeWordTemplateIndex:
+    """Per-user wake word templates held in memory and persisted under data_dir"""
+
+    def __init__(self, storage_dir: Optional[str] = None):
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        self._models: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def add(self, user_id: str, wake_word: str, model: Dict[str, Any]):
+        # Copy-on-write: the detection thread may be iterating the current dict
+        self._models[user_id] = {**self._models.get(user_id, {}), wake_word: model}
+
+    def words(self, user_id: str) -> List[str]:
+        return list(self._models.get(user_id, {}))
+
+    def has_templates(self, user_id: Optional[str]) -> bool:
+        return bool(user_id and self._models.get(user_id))
+
+    def window_samples(self, user_id: str) -> int:
+        """Audio history needed to match this user's longest wake word"""
+        return max((m['window_samples'] for m in self._models.get(user_id, {}).values()), default=0)
+
+    def match(self, user_id: str, embedding: np.ndarray) -> Optional[str]:
+        """Return the best wake word whose templates accept the embedding"""
+        best_word, best_score = None, 0.0
+        for wake_word, model in self._models.get(user_id, {}).items():
+            score = float((model['vectors'] @ embedding).max())
+            if score >= model['threshold'] and score > best_score:
+                best_word, best_score = wake_word, score
+        return best_word
+
+    def save(self, user_id: str, wake_word: str):
+        """Persist one model (blocking; call from a worker thread)"""
+        if not self.storage_dir:
+            return
+        model = self._models[user_id][wake_word]
+        user_dir = self.storage_dir / hashlib.sha1(user_id.encode()).hexdigest()
+        user_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            user_dir / f"{hashlib.sha1(wake_word.encode()).hexdigest()}.npz",
+            user_id=np.array(user_id),
+            wake_word=np.array(wake_word),
+            vectors=model['vectors'],
+            threshold=np.array(model['threshold']),
+            window_samples=np.array(model['window_samples'])
+        )
+
+    def load(self):
+        """Load every persisted model (blocking; call from a worker thread)"""
+        if not self.storage_dir or not self.storage_dir.exists():
+            return
+        for path in self.storage_dir.glob("*/*.npz"):
+            try:
+                with np.load(path) as data:
+                    self.add(str(data['user_id']), str(data['wake_word']), {
+                        'vectors': data['vectors'],
+                        'threshold': float(data['threshold']),
+                        'window_samples': int(data['window_samples'])
+                    })
+            except Exception as e:
+                logger.warning(f"Skipping unreadable wake word model {path}: {e}")
+
+class WakeWordTrainer:
+    """
+    Runs training jobs in a process pool and publishes results to the index.
+    Finished jobs stay pollable for ``job_ttl`` seconds.
+    """
+
+    def __init__(self, index: WakeWordTemplateIndex, sample_rate: int = 16000,
+                 silence_threshold: float = 500, max_workers: int = 1, job_ttl: float = 3600):
+        self.index = index
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks = set()
+
+    def submit(self, user_id: str, wake_word: str, audio_samples: List[bytes]) -> str:
+        """Queue a training job and return its id immediately"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        self._prune_jobs()
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'wake_word': wake_word,
+            'status': 'pending',
+            'error': None,
+            'submitted_at': time.time(),
+            'completed_at': None
+        }
+
+        task = asyncio.create_task(self._run(job_id, audio_samples))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._prune_jobs()
+        return self.jobs.get(job_id)
+
+    def _prune_jobs(self):
+        """Forget jobs that finished more than ``job_ttl`` seconds ago"""
+        cutoff = time.time() - self.job_ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job['completed_at'] is not None and job['completed_at'] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    async def _run(self, job_id: str, audio_samples: List[bytes]):
+        job = self.jobs[job_id]
+        job['status'] = 'running'
+        loop = asyncio.get_running_loop()
+
+        try:
+            model = await loop.run_in_executor(
+                self.executor, build_wake_word_model,
+                audio_samples, self.sample_rate, self.silence_threshold
+            )
+            self.index.add(job['user_id'], job['wake_word'], model)
+            await asyncio.to_thread(self.index.save, job['user_id'], job['wake_word'])
+
+            job['status'] = 'completed'
+            logger.info(f"Custom wake word '{job['wake_word']}' trained for user {job['user_id']}")
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            logger.error(f"Failed to train custom wake word: {e}")
+        finally:
+            job['completed_at'] = time.time()
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
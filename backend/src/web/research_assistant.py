@@ -4,16 +4,20 @@ from typing import Dict, Any, List
 logger = logging.getLogger(__name__)
 
 class ResearchAssistant:
-    def __init__(self):
-        self.search_engine = None
+    def __init__(self, search_engine=None):
+        # Reuse the assistant's search engine when one is provided
+        self.search_engine = search_engine
+        self._owns_search_engine = search_engine is None
         self.is_initialized = False
         
     async def initialize(self):
         """Initialize research assistant"""
         try:
-            from .search_engine import SearchEngine
-            self.search_engine = SearchEngine()
-            await self.search_engine.initialize()
+            if self.search_engine is None:
+                from .search_engine import SearchEngine
+                self.search_engine = SearchEngine()
+            if not self.search_engine.is_initialized:
+                await self.search_engine.initialize()
             
             self.is_initialized = True
             logger.info("✅ Research Assistant initialized successfully")
@@ -103,6 +107,6 @@ class ResearchAssistant:
     
     async def cleanup(self):
         """Cleanup resources"""
-        if self.search_engine:
+        if self.search_engine and self._owns_search_engine:
             await self.search_engine.cleanup()
         self.is_initialized = False
@@ -1,19 +1,20 @@
 import logging
-import aiohttp
 import asyncio
 from typing import Dict, Any, List, Optional
 
+from network.http_transport import http_transport
+
 logger = logging.getLogger(__name__)
 
 class SearchEngine:
     def __init__(self):
-        self.session = None
+        self.transport = http_transport
         self.is_initialized = False
         
     async def initialize(self):
         """Initialize search engine"""
         try:
-            self.session = aiohttp.ClientSession()
+            await self.transport.initialize()
             self.is_initialized = True
             logger.info("✅ Search Engine initialized successfully")
             return True
@@ -113,7 +114,5 @@ class SearchEngine:
             return {'success': False, 'error': str(e)}
     
     async def cleanup(self):
-        """Cleanup resources"""
-        if self.session:
-            await self.session.close()
+        """Cleanup resources (the shared transport is closed by its owner)"""
         self.is_initialized = False
@@ -0,0 +1,77 @@
+"""
+Tests for the dependency-graph action executor
+"""
+import asyncio
+
+from core.action_executor import ActionExecutor
+
+class FakeEngine:
+    """Records execution order; actions may sleep, fail or raise"""
+
+    def __init__(self):
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    async def execute_action(self, action, user_id):
+        self.started.append(action.get('name'))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(action.get('delay', 0.01))
+            if action.get('raise'):
+                raise NameError("name 'logger' is not defined")
+            return {'success': not action.get('fail', False)}
+        finally:
+            self.running -= 1
+
+def run(coro, timeout=5):
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+def test_raising_action_does_not_hang_request_or_dependents():
+    actions = [
+        {'id': 'a', 'type': 'system_info', 'raise': True},
+        {'type': 'system_info', 'depends_on': ['a']},
+        {'type': 'system_info'}
+    ]
+    results = run(ActionExecutor(FakeEngine()).execute(actions, 'user'))
+
+    assert results[0]['result'] == {'success': False, 'error': "name 'logger' is not defined"}
+    assert results[1]['result']['error'] == 'Skipped: action 0 failed'
+    assert results[2]['result'] == {'success': True}
+
+def test_independent_actions_run_concurrently_within_user_limit():
+    engine = FakeEngine()
+    actions = [{'type': 'system_info', 'delay': 0.05} for _ in range(6)]
+    run(ActionExecutor(engine, max_concurrent_per_user=3).execute(actions, 'user'))
+
+    assert engine.max_running == 3
+
+def test_conflicting_actions_run_in_order():
+    engine = FakeEngine()
+    actions = [
+        {'name': 'open', 'type': 'open_app', 'parameters': {'name': 'Chrome'}, 'delay': 0.05},
+        {'name': 'close', 'type': 'close_app', 'parameters': {'name': 'chrome'}},
+        {'name': 'cmd', 'type': 'run_command'}
+    ]
+    dependencies, _ = ActionExecutor(engine).build_graph(actions)
+    run(ActionExecutor(engine).execute(actions, 'user'))
+
+    assert dependencies == [set(), {0}, {0, 1}]
+    assert engine.started == ['open', 'close', 'cmd']
+
+def test_action_timeout_is_reported():
+    actions = [{'type': 'system_info', 'delay': 1, 'timeout': 0.05}]
+    results = run(ActionExecutor(FakeEngine()).execute(actions, 'user'))
+
+    assert results[0]['result'] == {'success': False, 'error': 'Timed out after 0.05s'}
+
+def test_cyclic_dependencies_fall_back_to_list_order():
+    actions = [
+        {'id': 'a', 'type': 'system_info', 'depends_on': ['b']},
+        {'id': 'b', 'type': 'system_info', 'depends_on': ['a']}
+    ]
+    dependencies, required = ActionExecutor(FakeEngine()).build_graph(actions)
+
+    assert dependencies == [set(), {0}]
+    assert required == [set(), set()]
@@ -0,0 +1,104 @@
+"""
+Tests for token-budgeted conversation context
+"""
+import asyncio
+
+from core.context_manager import ConversationContextManager
+
+class WordCounter:
+    """One token per word keeps budgets easy to reason about"""
+
+    def count(self, text):
+        return len(text.split())
+
+def make_manager(**kwargs):
+    return ConversationContextManager(token_counter=WordCounter(), **kwargs)
+
+def test_sessions_are_scoped_to_their_user():
+    manager = make_manager()
+    manager.record_turn('alice', 'shared', 'my password hint is blue', 'Noted')
+
+    assert manager.history('bob', 'shared') == []
+    packed = manager.pack('what is my hint', {'user_id': 'bob', 'session_id': 'shared'}, 'openai')
+    assert 'conversation_history' not in packed
+    assert [m['content'] for m in manager.history('alice', 'shared')] == ['my password hint is blue', 'Noted']
+
+def test_turns_without_session_id_are_not_recorded():
+    manager = make_manager()
+    manager.record_turn('alice', '', 'hello there', 'Hi')
+    manager.record_turn('bob', '', 'what did alice say', '')
+
+    assert manager.sessions == {}
+    assert manager.pack('anything', {'user_id': 'bob', 'session_id': ''}, 'openai') == {
+        'user_id': 'bob', 'session_id': ''
+    }
+
+def test_pack_keeps_recent_turns_and_recalls_relevant_older_ones():
+    manager = make_manager(recent_turns=2, summarize_after=100)
+    manager.record_turn('u', 's', 'remember the printer password', 'okay')
+    for i in range(3):
+        manager.record_turn('u', 's', f'filler question {i}', f'filler answer {i}')
+
+    packed = manager.pack('what was the printer password', {'user_id': 'u', 'session_id': 's'}, 'openai')
+
+    contents = [m['content'] for m in packed['conversation_history']]
+    assert contents[0] == 'remember the printer password'
+    assert contents[-2:] == ['filler question 2', 'filler answer 2']
+    assert packed['history_packed']
+
+def test_pack_respects_model_budget():
+    manager = make_manager(budgets={'local': 6}, recent_turns=4)
+    manager.record_turn('u', 's', 'one two three four', 'five six seven eight')
+
+    packed = manager.pack('hi', {'user_id': 'u', 'session_id': 's'}, 'local')
+
+    assert [m['content'] for m in packed['conversation_history']] == ['five six seven eight']
+
+def test_old_turns_are_folded_into_summary():
+    async def summarizer(user_id, prompt):
+        assert user_id == 'u'
+        return 'talked about filler'
+
+    async def scenario():
+        manager = make_manager(recent_turns=2, summarize_after=2, summarizer=summarizer)
+        for i in range(3):
+            manager.record_turn('u', 's', f'question {i}', f'answer {i}')
+        await manager.sessions[('u', 's')].summarizing
+        return manager
+
+    manager = asyncio.run(scenario())
+
+    assert manager.summary('u', 's') == 'talked about filler'
+    assert [m['content'] for m in manager.history('u', 's')] == ['question 2', 'answer 2']
+
+def test_least_recently_active_session_is_evicted():
+    manager = make_manager(max_sessions=2)
+    manager.record_turn('u', 'a', 'first', '')
+    manager.record_turn('u', 'b', 'second', '')
+    manager.sessions[('u', 'a')].last_active = 0
+    manager.record_turn('u', 'c', 'third', '')
+
+    assert set(manager.sessions) == {('u', 'b'), ('u', 'c')}
+
+def test_long_summary_is_cut_to_its_share_of_the_budget():
+    manager = make_manager(budgets={'local': 40}, summary_share=0.25)
+    manager.record_turn('u', 's', 'latest question here', 'latest answer')
+    session = manager.sessions[('u', 's')]
+    session.summary = "\n".join(f"- point number {i} discussed" for i in range(50))
+    session.summary_tokens = WordCounter().count(session.summary)
+
+    packed = manager.pack('and now', {'user_id': 'u', 'session_id': 's'}, 'local')
+
+    assert packed['conversation_summary'] == "- point number 48 discussed\n- point number 49 discussed"
+    assert [m['content'] for m in packed['conversation_history']] == ['latest question here', 'latest answer']
+
+def test_single_line_summary_keeps_its_last_words():
+    manager = make_manager(budgets={'local': 12}, summary_share=0.25)
+    manager.record_turn('u', 's', 'hello', '')
+    session = manager.sessions[('u', 's')]
+    session.summary = "one two three four five six"
+    session.summary_tokens = 6
+
+    packed = manager.pack('hi', {'user_id': 'u', 'session_id': 's'}, 'local')
+
+    assert packed['conversation_summary'] == "four five six"
@@ -0,0 +1,182 @@
+"""
+Tests for the continuous batching scheduler against a fake llama.cpp backend
+"""
+import asyncio
+
+import numpy as np
+
+from ai.local_scheduler import ContinuousBatchScheduler, KVCacheFullError, _Prefix, _Sequence
+
+class FakeBackend:
+    """
+    Tracks KV cells like llama.cpp: each cell belongs to a set of sequences,
+    copying a sequence shares its cells and a decode that doesn't fit fails.
+    Every step predicts token 1, which detokenizes to 'x'.
+    """
+
+    def __init__(self, n_ctx=64):
+        self.n_ctx = n_ctx
+        self.n_vocab = 8
+        self.eos_token = 0
+        self.cells = []
+        self.decodes = 0
+
+    def detokenize(self, token):
+        return b'x'
+
+    def decode(self, entries):
+        self.decodes += 1
+        if self.decodes > 10000:
+            raise AssertionError("scheduler is not making progress")
+        if len(self.cells) + len(entries) > self.n_ctx:
+            raise KVCacheFullError()
+        for _, pos, seq_id, _ in entries:
+            self.cells.append(({seq_id}, pos))
+        logits = np.zeros(self.n_vocab)
+        logits[1] = 1.0
+        return {i: logits for i, entry in enumerate(entries) if entry[3]}
+
+    def copy_sequence(self, src_seq_id, dst_seq_id, length):
+        for seqs, pos in self.cells:
+            if src_seq_id in seqs and pos < length:
+                seqs.add(dst_seq_id)
+
+    def remove_sequence(self, seq_id):
+        for seqs, _ in self.cells:
+            seqs.discard(seq_id)
+        self.cells = [cell for cell in self.cells if cell[0]]
+
+    def close(self):
+        pass
+
+def tokens(start, count):
+    return list(range(start, start + count))
+
+def run_scheduler(scheduler, coro, timeout=5):
+    scheduler.start()
+    try:
+        return asyncio.run(asyncio.wait_for(coro, timeout))
+    finally:
+        scheduler.stop()
+
+async def collect(scheduler, prompt, **kwargs):
+    return ''.join([delta async for delta in scheduler.generate(prompt, temperature=0, **kwargs)])
+
+def test_lone_sequence_next_to_pinned_prefix_finishes_instead_of_livelocking():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend, min_prefix_tokens=4)
+
+    outcome = {}
+
+    async def scenario():
+        await scheduler.pin_prefix('pin:system', tokens(100, 20))
+        return await collect(scheduler, tokens(200, 30), max_tokens=100, outcome=outcome)
+
+    text = run_scheduler(scheduler, scenario())
+
+    # 64 cells - 20 pinned - 30 prompt leaves room for the sampled tokens that get cached
+    assert text == 'x' * 15
+    assert scheduler.preemptions == 0
+    # Out of context is reported, not a silent success
+    assert outcome == {'finish_reason': 'length'}
+    assert scheduler.stats()['truncations'] == 1
+
+def test_prompt_that_only_fits_without_pinned_prefix_is_rejected():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend, min_prefix_tokens=4)
+
+    async def scenario():
+        await scheduler.pin_prefix('pin:system', tokens(100, 20))
+        try:
+            await collect(scheduler, tokens(200, 50), max_tokens=10)
+        except ValueError as e:
+            return str(e)
+
+    assert run_scheduler(scheduler, scenario()) == "Prompt is longer than the local model's context"
+    assert backend.decodes == 1  # only the pin's prefill
+
+def test_prompt_sharing_pinned_prefix_only_needs_room_for_the_rest():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend, min_prefix_tokens=4)
+
+    async def scenario():
+        await scheduler.pin_prefix('pin:system', tokens(100, 20))
+        return await collect(scheduler, tokens(100, 20) + tokens(200, 30), max_tokens=5)
+
+    assert run_scheduler(scheduler, scenario()) == 'x' * 5
+    assert scheduler.reused_prefix_tokens == 20
+
+def test_kv_room_evicts_every_cached_prefix_a_lone_step_needs():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend)
+    for key in ('a', 'b'):
+        scheduler._prefixes[key] = _Prefix(key, scheduler._free_seq_ids.pop(), tokens(100, 20))
+    sequence = _Sequence(0, tokens(200, 50), 10, 0.0, (), None, None, seq_id=scheduler._free_seq_ids.pop())
+    sequence.pending = list(sequence.prompt_tokens)
+    scheduler._running.append(sequence)
+
+    scheduler._make_kv_room()
+
+    assert scheduler._running == [sequence]
+    assert not scheduler._prefixes
+    assert scheduler.preemptions == 0
+
+def test_sequences_share_steps_and_preempt_when_cache_is_full():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend)
+
+    async def scenario():
+        return await asyncio.gather(
+            collect(scheduler, tokens(100, 10), max_tokens=30),
+            collect(scheduler, tokens(200, 10), max_tokens=30)
+        )
+
+    assert run_scheduler(scheduler, scenario()) == ['x' * 30, 'x' * 30]
+    assert scheduler.preemptions > 0
+    assert scheduler.stats()['average_batch_tokens'] > 1
+
+def test_cancelled_request_frees_its_cells():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend)
+
+    async def scenario():
+        stream = scheduler.generate(tokens(100, 10), max_tokens=40, temperature=0)
+        assert await stream.__anext__() == 'x'
+        await stream.aclose()
+        # Another request drives the worker past the cancelled one
+        return await collect(scheduler, tokens(200, 10), max_tokens=2)
+
+    assert run_scheduler(scheduler, scenario()) == 'xx'
+    assert backend.cells == []
+
+def test_session_never_replaces_a_pinned_prefix():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend, min_prefix_tokens=4)
+    outcome = {}
+
+    async def scenario():
+        await scheduler.pin_prefix('pin:system', tokens(100, 20))
+        text = await collect(scheduler, tokens(200, 10), max_tokens=3, session='pin:system', outcome=outcome)
+        return text, scheduler._prefixes['pin:system'], len(backend.cells)
+
+    text, prefix, cells = run_scheduler(scheduler, scenario())
+
+    assert text == 'xxx'
+    assert outcome == {'finish_reason': 'length'}
+    assert prefix.pinned and prefix.tokens == tokens(100, 20)
+    # The session's own cells were freed rather than cached
+    assert cells == 20
+
+def test_stats_report_worker_state_published_between_steps():
+    backend = FakeBackend(n_ctx=64)
+    scheduler = ContinuousBatchScheduler(backend)
+
+    async def scenario():
+        await collect(scheduler, tokens(100, 10), max_tokens=3, session='session:u1')
+        return scheduler.stats()
+
+    stats = run_scheduler(scheduler, scenario())
+
+    assert stats['running'] == 0
+    assert stats['cached_prefixes'] == 1
+    assert stats['kv_tokens_in_use'] == 12
@@ -0,0 +1,56 @@
+"""
+Tests for ModelManager routing with fake provider clients
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from ai.model_manager import ModelManager, ModelType
+
+class FakeClient:
+    def __init__(self, name, configured=True):
+        self.name = name
+        self.is_configured = configured
+        self.prompts = []
+
+    async def process_command(self, command, context):
+        self.prompts.append(command)
+        return {'text': f'{self.name} summary'}
+
+PRIVATE = {'routing': {'privacy_requires_local': True}, 'language': 'de'}
+
+def make_manager(local_configured):
+    manager = ModelManager()
+    remote, local = FakeClient('remote'), FakeClient('local', configured=local_configured)
+    manager.clients = {ModelType.OPENAI: remote, ModelType.LOCAL_LLAMA: local}
+    manager.active_models['u'] = {'type': ModelType.OPENAI, 'client': remote}
+    return manager, remote, local
+
+def test_private_summary_is_skipped_without_a_local_model():
+    manager, remote, _ = make_manager(local_configured=False)
+
+    summary = asyncio.run(manager.summarize('transcript', {'user_id': 'u', 'preferences': PRIVATE}))
+
+    assert summary is None
+    assert remote.prompts == []
+
+def test_private_summary_runs_on_the_local_model():
+    manager, remote, local = make_manager(local_configured=True)
+
+    summary = asyncio.run(manager.summarize('transcript', {'user_id': 'u', 'preferences': PRIVATE}))
+
+    assert summary == 'local summary'
+    assert local.prompts == ['transcript']
+    assert remote.prompts == []
+
+def test_summary_bypasses_cache_and_uses_the_users_model():
+    manager, remote, _ = make_manager(local_configured=False)
+
+    async def scenario():
+        await manager.summarize('transcript', {'user_id': 'u', 'preferences': {}})
+        return await manager.summarize('transcript', {'user_id': 'u', 'preferences': {}})
+
+    assert asyncio.run(scenario()) == 'remote summary'
+    assert remote.prompts == ['transcript', 'transcript']
@@ -0,0 +1,135 @@
+"""
+Tests for provider circuit breakers, retries and rate limits
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from ai.resilience import CircuitBreaker, CircuitOpenError, ProviderError, ProviderResilience, RetryPolicy
+
+def make_resilience(**kwargs):
+    # No backoff so retry tests run instantly
+    return ProviderResilience(retry_policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0), **kwargs)
+
+def open_breaker(resilience, provider):
+    breaker = resilience.breaker(provider)
+    for _ in range(resilience.failure_threshold):
+        breaker.record_failure()
+    # Let the recovery timeout elapse
+    breaker.opened_at -= resilience.recovery_timeout
+    return breaker
+
+def test_breaker_opens_after_threshold_and_half_opens_for_one_probe():
+    breaker = CircuitBreaker('p', failure_threshold=2, recovery_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+    breaker.opened_at -= 30
+    assert breaker.allow_request()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow_request()
+
+def test_failed_probe_reopens_circuit():
+    resilience = ProviderResilience(retry_policy=RetryPolicy(max_attempts=1), failure_threshold=1)
+    open_breaker(resilience, 'p')
+
+    async def fail():
+        raise ProviderError('p', 503, 'unavailable')
+
+    with pytest.raises(ProviderError):
+        asyncio.run(resilience.call('p', None, fail))
+    assert resilience.breaker('p').state == 'open'
+
+def test_cancelled_probe_frees_half_open_slot():
+    resilience = make_resilience(failure_threshold=1)
+    breaker = open_breaker(resilience, 'p')
+
+    async def scenario():
+        task = asyncio.create_task(resilience.call('p', None, lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        assert breaker.state == 'half_open' and breaker.is_open
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert not breaker.is_open
+    assert resilience.is_available('p')
+
+def test_unexpected_exception_in_probe_frees_half_open_slot():
+    resilience = make_resilience(failure_threshold=1)
+    breaker = open_breaker(resilience, 'p')
+
+    async def broken():
+        raise ValueError('bad payload')
+
+    with pytest.raises(ValueError):
+        asyncio.run(resilience.call('p', None, broken))
+    assert breaker.allow_request()
+
+def test_retryable_errors_are_retried_until_success():
+    resilience = make_resilience()
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ProviderError('p', 429, 'slow down', retry_after=0)
+        return 'ok'
+
+    assert asyncio.run(resilience.call('p', None, flaky)) == 'ok'
+    assert len(calls) == 3
+    assert resilience.breaker('p').failures == 0
+
+def test_client_errors_are_not_retried_or_counted():
+    resilience = make_resilience()
+    calls = []
+
+    async def bad_request():
+        calls.append(1)
+        raise ProviderError('p', 400, 'bad request')
+
+    with pytest.raises(ProviderError):
+        asyncio.run(resilience.call('p', None, bad_request))
+    assert len(calls) == 1
+    assert resilience.breaker('p').state == 'closed'
+
+def test_open_circuit_rejects_calls():
+    resilience = make_resilience(failure_threshold=1)
+    resilience.breaker('p').record_failure()
+
+    async def never():
+        raise AssertionError('should not be called')
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilience.call('p', None, never))
+
+def test_call_cancelled_while_waiting_for_rate_limit_keeps_probe_free():
+    resilience = ProviderResilience(rate_limits={'p': {'rate': 0.1, 'burst': 1}}, failure_threshold=1)
+
+    async def scenario():
+        # Use up the burst so the next call waits on the bucket
+        await resilience.acquire('p', None)
+        breaker = open_breaker(resilience, 'p')
+        task = asyncio.create_task(resilience.call('p', None, lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return breaker
+
+    breaker = asyncio.run(scenario())
+
+    assert not breaker.is_open
+    assert breaker.allow_request()
@@ -0,0 +1,108 @@
+"""
+Tests for the exact-match response cache and its use in ModelManager
+"""
+import asyncio
+
+import pytest
+
+from ai.response_cache import ResponseCache
+
+def context(user_id='u', history=(), summary='', language='en'):
+    return {
+        'user_id': user_id,
+        'preferences': {'language': language},
+        'conversation_summary': summary,
+        'conversation_history': [{'type': 'user', 'content': content} for content in history]
+    }
+
+def test_normalized_commands_hit_the_same_entry():
+    cache = ResponseCache()
+    asyncio.run(cache.put("What's the weather?", 'openai', context(), 'sunny'))
+
+    assert asyncio.run(cache.get('whats   the WEATHER', 'openai', context())) == 'sunny'
+    assert cache.stats()['exact_hits'] == 1
+
+def test_entries_are_scoped_to_user():
+    cache = ResponseCache()
+    asyncio.run(cache.put('what is my name', 'openai', context('alice'), 'Alice'))
+
+    assert asyncio.run(cache.get('what is my name', 'openai', context('bob'))) is None
+
+@pytest.mark.parametrize('other', [
+    context(history=['earlier question'], summary='we talked about Paris'),
+    context(history=['recalled turn', 'earlier question']),
+    context(history=['earlier question'], language='de')
+])
+def test_any_difference_in_sent_context_misses(other):
+    cache = ResponseCache()
+    asyncio.run(cache.put('tell me more', 'openai', context(history=['earlier question']), 'cached'))
+
+    assert asyncio.run(cache.get('tell me more', 'openai', other)) is None
+
+def test_model_is_part_of_the_key():
+    cache = ResponseCache()
+    asyncio.run(cache.put('hello', 'openai', context(), 'hi'))
+
+    assert asyncio.run(cache.get('hello', 'deepseek', context())) is None
+
+def test_expired_entries_are_dropped():
+    cache = ResponseCache(ttl_seconds=-1)
+    asyncio.run(cache.put('hello', 'openai', context(), 'hi'))
+
+    assert asyncio.run(cache.get('hello', 'openai', context())) is None
+    assert cache.stats()['entries'] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+
+    async def scenario():
+        await cache.put('one', 'openai', context(), 1)
+        await cache.put('two', 'openai', context(), 2)
+        await cache.get('one', 'openai', context())
+        await cache.put('three', 'openai', context(), 3)
+        return [await cache.get(command, 'openai', context()) for command in ('one', 'two', 'three')]
+
+    assert asyncio.run(scenario()) == [1, None, 3]
+
+def test_users_can_opt_out():
+    cache = ResponseCache()
+
+    assert not cache.is_enabled_for({'preferences': {'cache_responses': False}})
+    assert cache.stats()['bypassed'] == 1
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+        self.api_key = 'key'
+
+    async def process_command(self, command, context):
+        from ai.resilience import ProviderError
+
+        self.calls += 1
+        if self.fail:
+            raise ProviderError('fake', 401, 'bad key')
+        return {'text': f'answer to {command}'}
+
+def test_failover_answer_is_found_under_the_routed_model():
+    pytest.importorskip("aiohttp")
+    from ai.model_manager import ModelManager, ModelType
+
+    manager = ModelManager(context_packer=lambda command, ctx, model: {**ctx, 'conversation_summary': 'packed'})
+    primary, fallback = FakeClient(fail=True), FakeClient()
+    manager.clients = {ModelType.OPENAI: primary, ModelType.DEEPSEEK: fallback}
+    manager.active_models['u'] = {'type': ModelType.OPENAI, 'client': primary}
+    manager._select_best_model = lambda command, ctx, current: current
+    ctx = {'user_id': 'u', 'preferences': {'hedge_requests': False}}
+
+    async def scenario():
+        first = await manager.process_command('hello', ctx)
+        second = await manager.process_command('hello', ctx)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.model_used == 'deepseek'
+    assert second is first
+    assert fallback.calls == 1
+    assert manager.response_cache.stats()['exact_hits'] == 1
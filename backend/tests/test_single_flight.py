@@ -0,0 +1,92 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+
+import pytest
+
+from ai.single_flight import SingleFlight
+
+class Upstream:
+    def __init__(self, result='answer', error=None, delay=0.05):
+        self.result = result
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do('k', upstream) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ['answer'] * 5
+    assert upstream.calls == 1
+    assert flight.stats() == {'in_flight': 0, 'upstream_calls': 1, 'coalesced_calls': 4}
+
+def test_different_keys_are_not_coalesced():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def scenario():
+        return await asyncio.gather(flight.do('a', upstream), flight.do('b', upstream))
+
+    asyncio.run(scenario())
+    assert upstream.calls == 2
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flight, upstream = SingleFlight(), Upstream(error=RuntimeError('boom'))
+
+    async def scenario():
+        results = await asyncio.gather(flight.do('k', upstream), flight.do('k', upstream), return_exceptions=True)
+        upstream.error = None
+        return results, await flight.do('k', upstream)
+
+    results, retry = asyncio.run(scenario())
+    assert [str(result) for result in results] == ['boom', 'boom']
+    assert retry == 'answer'
+    assert upstream.calls == 2
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def scenario():
+        first = asyncio.create_task(flight.do('k', upstream))
+        second = asyncio.create_task(flight.do('k', upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == 'answer'
+    assert not upstream.cancelled
+
+def test_upstream_call_is_cancelled_when_every_waiter_leaves():
+    flight, upstream = SingleFlight(), Upstream(delay=10)
+
+    async def scenario():
+        waiter = asyncio.create_task(flight.do('k', upstream))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        # The key is free again for a fresh call
+        upstream.delay = 0
+        return await flight.do('k', upstream)
+
+    assert asyncio.run(scenario()) == 'answer'
+    assert upstream.cancelled
+    assert upstream.calls == 2
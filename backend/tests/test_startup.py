@@ -0,0 +1,85 @@
+"""
+Tests for dependency-aware concurrent component startup
+"""
+import asyncio
+
+from core.startup import ComponentStartup
+
+class Component:
+    def __init__(self, log, name, delay=0.01, error=None):
+        self.log = log
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.initialized = False
+
+    async def initialize(self):
+        self.log.append(f'start {self.name}')
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.initialized = True
+        self.log.append(f'ready {self.name}')
+
+    async def shutdown(self):
+        self.log.append(f'stop {self.name}')
+
+def test_components_start_after_their_dependencies_and_stop_in_reverse():
+    log = []
+    startup = ComponentStartup()
+    startup.register('transport', Component(log, 'transport'))
+    startup.register('models', Component(log, 'models'), depends_on=['transport'])
+    startup.register('stt', Component(log, 'stt'))
+
+    async def scenario():
+        await startup.start_all()
+        await startup.shutdown_all()
+
+    asyncio.run(scenario())
+
+    assert log.index('ready transport') < log.index('start models')
+    assert log.index('start stt') < log.index('ready transport')
+    assert log.index('stop models') < log.index('stop transport')
+
+def test_failed_component_disables_dependents_without_stopping_the_rest():
+    log = []
+    startup = ComponentStartup()
+    transport = Component(log, 'transport', error=OSError('no network'))
+    models = Component(log, 'models')
+    stt = Component(log, 'stt', delay=0.05)
+    startup.register('transport', transport)
+    startup.register('models', models, depends_on=['transport'])
+    startup.register('stt', stt)
+
+    asyncio.run(startup.start_all())
+
+    assert stt.initialized and startup.is_started('stt')
+    assert not models.initialized and 'start models' not in log
+    assert not startup.is_started('transport') and not startup.is_started('models')
+    assert startup.failed == {'transport': 'no network', 'models': 'dependency failed: transport'}
+
+def test_ensure_retries_a_failed_component():
+    log = []
+    startup = ComponentStartup()
+    flaky = Component(log, 'tts', error=RuntimeError('device busy'))
+    startup.register('tts', flaky)
+
+    async def scenario():
+        await startup.start_all()
+        flaky.error = None
+        return await startup.ensure('tts')
+
+    assert asyncio.run(scenario()) is flaky
+    assert flaky.initialized
+    assert startup.failed == {}
+
+def test_lazy_components_wait_for_first_use():
+    log = []
+    startup = ComponentStartup()
+    lazy = Component(log, 'wake_word')
+    startup.register('wake_word', lazy, lazy=True)
+
+    asyncio.run(startup.start_all())
+
+    assert log == []
+    assert not startup.is_started('wake_word')
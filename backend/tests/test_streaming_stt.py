@@ -0,0 +1,79 @@
+"""
+Tests for live transcription against fake speech engines
+"""
+import asyncio
+
+from voice.streaming_stt import StreamingTranscriber
+
+CHUNK = 160  # 10 ms frames at 16 kHz
+SPEECH = (2000).to_bytes(2, 'little', signed=True) * CHUNK
+SILENCE = bytes(CHUNK * 2)
+
+class FakeStream:
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+
+    def accept(self, pcm):
+        self.chunks.append(pcm)
+        return f"heard {len(self.chunks)}"
+
+    def finish(self):
+        self.finished = True
+        return "hello world"
+
+class FakeSpeechToText:
+    def __init__(self, streaming):
+        self.streaming = streaming
+        self.streams = []
+        self.transcribed = []
+
+    async def open_stream(self, language, sample_rate):
+        if not self.streaming:
+            return None
+        self.streams.append(FakeStream())
+        return self.streams[-1]
+
+    async def transcribe_pcm(self, pcm, user_id, language, sample_rate):
+        self.transcribed.append(pcm)
+        return "whole utterance"
+
+def run(speech_to_text, frames):
+    transcriber = StreamingTranscriber(
+        speech_to_text, 'u1', chunk_size=CHUNK, end_of_speech_ms=50,
+        partial_interval_ms=30, preroll_ms=20
+    )
+
+    async def scenario():
+        for frame in frames:
+            await transcriber.feed(frame)
+            await asyncio.sleep(0.001)
+        await transcriber.finish()
+        events = []
+        while not transcriber.events.empty():
+            events.append(transcriber.events.get_nowait())
+        return events
+
+    return asyncio.run(asyncio.wait_for(scenario(), 5))
+
+def test_streaming_engine_sees_each_byte_once():
+    speech_to_text = FakeSpeechToText(streaming=True)
+    events = run(speech_to_text, [SILENCE] * 3 + [SPEECH] * 20 + [SILENCE] * 6)
+
+    [stream] = speech_to_text.streams
+    partials = [e for e in events if e['type'] == 'partial']
+    assert partials and all(e['text'].startswith('heard') for e in partials)
+    assert events[-1] == {'type': 'final', 'utterance_id': 1, 'text': 'hello world'}
+    assert stream.finished
+    # Preroll + speech + the trailing silence that ended the utterance, no re-decoding
+    assert b"".join(stream.chunks) == SILENCE + SPEECH * 20 + SILENCE * 5
+    assert len(stream.chunks) > 1
+    assert speech_to_text.transcribed == []
+
+def test_non_streaming_engine_transcribes_once_without_partials():
+    speech_to_text = FakeSpeechToText(streaming=False)
+    events = run(speech_to_text, [SPEECH] * 20 + [SILENCE] * 6)
+
+    assert [e['type'] for e in events] == ['speech_start', 'final']
+    assert events[-1]['text'] == 'whole utterance'
+    assert len(speech_to_text.transcribed) == 1
@@ -0,0 +1,79 @@
+"""
+Tests for the two-tier synthesized speech cache
+"""
+import asyncio
+
+from voice.tts_cache import TTSCache
+
+def test_key_covers_everything_that_changes_the_audio():
+    key = TTSCache.make_key('hello', 'voice-1', 150, 0.9, 'en')
+
+    assert key == TTSCache.make_key('hello', 'voice-1', 150, 0.9, 'en')
+    assert len({
+        key,
+        TTSCache.make_key('hello!', 'voice-1', 150, 0.9, 'en'),
+        TTSCache.make_key('hello', 'voice-2', 150, 0.9, 'en'),
+        TTSCache.make_key('hello', 'voice-1', 200, 0.9, 'en'),
+        TTSCache.make_key('hello', 'voice-1', 150, 0.5, 'en'),
+        TTSCache.make_key('hello', 'voice-1', 150, 0.9, 'de')
+    }) == 6
+
+def test_memory_tier_evicts_least_recently_used_by_bytes():
+    cache = TTSCache(max_memory_bytes=10)
+
+    async def scenario():
+        await cache.put('a', b'aaaa')
+        await cache.put('b', b'bbbb')
+        await cache.get('a')
+        await cache.put('c', b'cccc')
+        return [await cache.get(key) for key in ('a', 'b', 'c')]
+
+    assert asyncio.run(scenario()) == [b'aaaa', None, b'cccc']
+    assert cache.stats()['memory_bytes'] == 8
+
+def test_audio_larger_than_memory_budget_is_not_kept_in_memory():
+    cache = TTSCache(max_memory_bytes=4)
+    asyncio.run(cache.put('big', b'x' * 5))
+
+    assert cache.stats()['memory_entries'] == 0
+
+def test_disk_tier_survives_restart_and_promotes_hits(tmp_path):
+    async def scenario():
+        first = TTSCache(disk_dir=str(tmp_path))
+        await first.initialize()
+        await first.put('k', b'audio')
+
+        second = TTSCache(disk_dir=str(tmp_path))
+        await second.initialize()
+        return second, await second.get('k'), await second.get('k')
+
+    cache, from_disk, from_memory = asyncio.run(scenario())
+
+    assert from_disk == from_memory == b'audio'
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+def test_disk_tier_evicts_files_beyond_its_budget(tmp_path):
+    cache = TTSCache(disk_dir=str(tmp_path), max_disk_bytes=8)
+
+    async def scenario():
+        await cache.initialize()
+        for key in ('a', 'b', 'c'):
+            await cache.put(key, b'1234')
+
+    asyncio.run(scenario())
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['b.wav', 'c.wav']
+    assert cache.stats()['disk_bytes'] == 8
+
+def test_missing_disk_file_counts_as_miss(tmp_path):
+    cache = TTSCache(max_memory_bytes=0, disk_dir=str(tmp_path))
+
+    async def scenario():
+        await cache.initialize()
+        await cache.put('k', b'audio')
+        (tmp_path / 'k.wav').unlink()
+        return await cache.get('k')
+
+    assert asyncio.run(scenario()) is None
+    assert cache.stats()['disk_entries'] == 0
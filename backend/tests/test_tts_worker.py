@@ -0,0 +1,81 @@
+"""
+Tests for the dedicated TTS worker thread against a fake pyttsx3 engine
+"""
+import asyncio
+import sys
+import threading
+import types
+
+import pytest
+
+from voice.tts_worker import TTSWorker
+
+class FakeEngine:
+    """Renders text as its UTF-8 bytes; the first job blocks until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.jobs = []
+
+    def getProperty(self, name):
+        return []
+
+    def setProperty(self, name, value):
+        pass
+
+    def save_to_file(self, text, path):
+        self.jobs.append((text, path))
+
+    def runAndWait(self):
+        text, path = self.jobs[-1]
+        self.started.set()
+        self.release.wait(5)
+        with open(path, 'wb') as f:
+            f.write(text.encode())
+
+    def stop(self):
+        pass
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setitem(sys.modules, 'pyttsx3', types.SimpleNamespace(init=lambda: engine))
+    return engine
+
+def test_synthesize_returns_rendered_audio(engine):
+    engine.release.set()
+    worker = TTSWorker()
+
+    async def scenario():
+        await worker.start()
+        try:
+            return await worker.synthesize('hello', {'rate': 150})
+        finally:
+            await worker.stop()
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) == b'hello'
+
+def test_stop_fails_queued_jobs_and_rejects_new_ones(engine):
+    worker = TTSWorker()
+
+    async def scenario():
+        await worker.start()
+        jobs = [asyncio.create_task(worker.synthesize(text, {})) for text in ('first', 'second', 'third')]
+        await asyncio.to_thread(engine.started.wait, 2)
+
+        stopping = asyncio.create_task(worker.stop())
+        await asyncio.sleep(0.05)
+        engine.release.set()
+        await stopping
+
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await worker.synthesize('late', {})
+        return results
+
+    first, second, third = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    assert first == b'first'
+    assert isinstance(second, RuntimeError) and isinstance(third, RuntimeError)
+    assert [text for text, _ in engine.jobs] == ['first']
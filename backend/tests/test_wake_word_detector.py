@@ -0,0 +1,48 @@
+"""
+Tests for the batched wake word detection loop
+"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from voice.wake_word_detector import WakeWordDetector
+
+class SlowHandle:
+    """Porcupine-like handle that takes a while per frame and must outlive its use"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.deleted = False
+        self.used_after_delete = False
+
+    def process(self, frame):
+        self.started.set()
+        time.sleep(0.05)
+        if self.deleted:
+            self.used_after_delete = True
+        return -1
+
+    def delete(self):
+        self.deleted = True
+
+def test_shutdown_waits_for_in_flight_batch_before_deleting_handles():
+    detector = WakeWordDetector(poll_interval=0.01)
+    handle = SlowHandle()
+
+    async def scenario():
+        await detector.initialize()
+        await detector.start_listening('s', callback=None)
+        detector.sessions['s']['detector'] = handle
+        loud = np.full(detector.frame_length * 4, 5000, dtype=np.int16)
+        detector.feed_audio('s', loud)
+
+        await asyncio.to_thread(handle.started.wait, 2)
+        await detector.shutdown()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    assert handle.deleted
+    assert not handle.used_after_delete
+    assert detector.frames_processed == 4
@@ -0,0 +1,43 @@
+"""
+Tests for the custom wake word template index and training job bookkeeping
+"""
+import time
+
+import numpy as np
+
+from voice.wake_word_training import WakeWordTemplateIndex, WakeWordTrainer
+
+def model(vector, threshold=0.8):
+    return {'vectors': np.array([vector], dtype=np.float32), 'threshold': threshold, 'window_samples': 16000}
+
+def test_add_replaces_user_templates_instead_of_mutating_them():
+    index = WakeWordTemplateIndex()
+    index.add('u', 'jarvis', model([1.0, 0.0]))
+    snapshot = index._models['u']
+
+    index.add('u', 'friday', model([0.0, 1.0]))
+
+    # A reader iterating the old dict never sees it change size
+    assert list(snapshot) == ['jarvis']
+    assert index.words('u') == ['jarvis', 'friday']
+
+def test_match_picks_best_accepted_word():
+    index = WakeWordTemplateIndex()
+    index.add('u', 'jarvis', model([1.0, 0.0]))
+    index.add('u', 'friday', model([0.6, 0.8]))
+
+    assert index.match('u', np.array([0.96, 0.28], dtype=np.float32)) == 'jarvis'
+    assert index.match('u', np.array([0.0, -1.0], dtype=np.float32)) is None
+    assert index.match('other', np.array([1.0, 0.0], dtype=np.float32)) is None
+
+def test_finished_jobs_expire_after_ttl():
+    trainer = WakeWordTrainer(WakeWordTemplateIndex(), job_ttl=60)
+    now = time.time()
+    trainer.jobs = {
+        'old': {'status': 'completed', 'completed_at': now - 120},
+        'recent': {'status': 'failed', 'completed_at': now - 10},
+        'running': {'status': 'running', 'completed_at': None}
+    }
+
+    assert trainer.get_job('old') is None
+    assert set(trainer.jobs) == {'recent', 'running'}